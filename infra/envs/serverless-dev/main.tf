@@ -69,6 +69,7 @@ module "lambda_run_api" {
   runs_table_arn            = module.dynamodb_tables.runs_table_arn
   api_gateway_execution_arn = module.api_gateway_lambda_iot.api_execution_arn
   grafana_url               = local.grafana_url
+  run_retention_days        = var.run_retention_days
   tags                      = local.common_tags
 }
 
@@ -78,12 +79,35 @@ module "lambda_run_api" {
 module "lambda_sensor_api" {
   source = "../../modules/serverless/lambda_sensor_api"
 
-  project                   = var.project
-  environment               = var.env
-  sensor_data_table_name    = module.dynamodb_tables.sensor_data_table_name
-  sensor_data_table_arn     = module.dynamodb_tables.sensor_data_table_arn
-  api_gateway_execution_arn = module.api_gateway_lambda_iot.api_execution_arn
-  tags                      = local.common_tags
+  project                    = var.project
+  environment                = var.env
+  sensor_data_table_name     = module.dynamodb_tables.sensor_data_table_name
+  sensor_data_table_arn      = module.dynamodb_tables.sensor_data_table_arn
+  compact_table_name         = module.dynamodb_tables.sensor_data_compact_table_name
+  compact_table_arn          = module.dynamodb_tables.sensor_data_compact_table_arn
+  rollups_table_name         = module.dynamodb_tables.sensor_rollups_table_name
+  rollups_table_arn          = module.dynamodb_tables.sensor_rollups_table_arn
+  runs_table_name            = module.dynamodb_tables.runs_table_name
+  runs_table_arn             = module.dynamodb_tables.runs_table_arn
+  sensor_data_retention_days = var.sensor_data_retention_days
+  ingest_mode                = var.sensor_ingest_mode
+  api_gateway_execution_arn  = module.api_gateway_lambda_iot.api_execution_arn
+  tags                       = local.common_tags
+}
+
+# ===========================
+# Module Lambda Sensor Rollup (stream SensorData -> rollups par minute)
+# ===========================
+module "lambda_sensor_rollup" {
+  source = "../../modules/serverless/lambda_sensor_rollup"
+
+  project                = var.project
+  environment            = var.env
+  sensor_data_stream_arn = module.dynamodb_tables.sensor_data_stream_arn
+  compact_stream_arn     = module.dynamodb_tables.sensor_data_compact_stream_arn
+  rollups_table_name     = module.dynamodb_tables.sensor_rollups_table_name
+  rollups_table_arn      = module.dynamodb_tables.sensor_rollups_table_arn
+  tags                   = local.common_tags
 }
 
 # ===========================
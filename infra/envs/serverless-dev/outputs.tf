@@ -52,6 +52,11 @@ output "lambda_sensor_api_function_name" {
   value       = module.lambda_sensor_api.function_name
 }
 
+output "sensor_ingest_queue_url" {
+  description = "URL de la file SQS d'ingestion asynchrone des mesures"
+  value       = module.lambda_sensor_api.ingest_queue_url
+}
+
 # ===========================
 # Outputs Grafana (si activé)
 # ===========================
@@ -28,6 +28,35 @@ variable "lambda_api_domain_name" {
   default     = ""
 }
 
+# ===========================
+# Variables Rétention DynamoDB (TTL)
+# ===========================
+
+# Désactivée par défaut : le TTL supprime des données existantes,
+# l'activer explicitement dans terraform.tfvars de l'environnement
+
+variable "sensor_data_retention_days" {
+  description = "Rétention par défaut des données capteur en jours (0 = illimitée)"
+  type        = number
+  default     = 0
+}
+
+variable "run_retention_days" {
+  description = "Rétention par défaut des runs en jours (0 = illimitée)"
+  type        = number
+  default     = 0
+}
+
+# ===========================
+# Variables Ingestion capteurs
+# ===========================
+
+variable "sensor_ingest_mode" {
+  description = "Mode d'ingestion des mesures : sync (écriture DynamoDB dans la requête) ou async (file SQS + Lambda consommatrice)"
+  type        = string
+  default     = "sync"
+}
+
 # ===========================
 # Variables Grafana ECS
 # ===========================
@@ -18,14 +18,37 @@ resource "aws_iam_role_policy_attachment" "lambda_logs" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# Sources de la Lambda + module partagé shared (décodage des logs CloudWatch)
+data "archive_file" "notify" {
+  type        = "zip"
+  output_path = "${path.module}/lambda_notify.zip"
+
+  source {
+    content  = file("${path.module}/files/handler.py")
+    filename = "handler.py"
+  }
+
+  source {
+    content  = file("${path.module}/../shared/log_events.py")
+    filename = "log_events.py"
+  }
+}
+
 resource "aws_lambda_function" "notify" {
   function_name = "${var.project}-${var.environment}-lambda-notify"
-  filename      = "${path.module}/files/handler.zip"
-  source_code_hash = filebase64sha256("${path.module}/files/handler.zip")
+  filename      = data.archive_file.notify.output_path
+  source_code_hash = data.archive_file.notify.output_base64sha256
   role          = aws_iam_role.lambda_role.arn
   handler       = "handler.lambda_handler"
   runtime       = "python3.12"
   timeout       = 5
+
+  environment {
+    variables = {
+      # Niveau de log (DEBUG : chaque message reçu est journalisé)
+      LOG_LEVEL = var.log_level
+    }
+  }
 }
 
 # Log group for the Lambda
@@ -7,3 +7,9 @@ variable "environment" {
   type        = string
   description = "Environment name (e.g. dev, prod)"
 }
+
+variable "log_level" {
+  type        = string
+  description = "Log level of the Lambda (DEBUG logs every received message)"
+  default     = "INFO"
+}
@@ -1,83 +1,155 @@
-
 import json
 import boto3
+from botocore.config import Config
 import os
+import base64
 from io import BytesIO
 import zipfile
 from datetime import datetime
+from report_listing import list_reports, list_reports_from_catalog, parse_filters
+from zip_archive import add_object, archive_exists, archive_key, build_archive, prefetch_objects
+
+# Téléchargements parallèles des rapports et nombre maximum d'objets en cours / en attente
+PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', '8'))
+PREFETCH_IN_FLIGHT = int(os.environ.get('PREFETCH_IN_FLIGHT', '16'))
+
+# Client partagé par les workers du prefetch, pool HTTP dimensionné en conséquence
+s3 = boto3.client('s3', config=Config(max_pool_connections=max(10, PREFETCH_WORKERS)))
+
+# Modes de réponse : ZIP inline (base64), URL présignée (JSON) ou redirection 302
+DOWNLOAD_MODES = ('inline', 'url', 'redirect')
+DOWNLOAD_MODE = os.environ.get('DOWNLOAD_MODE', 'inline')
+# Au-delà, le ZIP inline (+33 % en base64) dépasserait la limite de 6 Mo de Lambda :
+# le mode inline bascule alors en redirection vers l'archive S3
+INLINE_MAX_BYTES = int(os.environ.get('INLINE_MAX_BYTES', str(4 * 1024 * 1024)))
+# Archives construites dans le bucket, réutilisées tant que le listing ne change pas
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'archives/')
+# Préfixe des rapports (reports/{date}/run_{id}...) : seul préfixe listé
+REPORTS_PREFIX = os.environ.get('REPORTS_PREFIX', 'reports/')
+# Catalogue tenu par lambda_generate_report (vide = désactivé), utilisé pour les
+# plages de dates d'au plus CATALOG_MAX_DAYS jours. Une date cataloguée n'est plus
+# listée : scripts/backfill_report_catalog.py doit avoir été lancé avant l'activation
+CATALOG_PREFIX = os.environ.get('CATALOG_PREFIX', 'catalog/')
+CATALOG_MAX_DAYS = int(os.environ.get('CATALOG_MAX_DAYS', '31'))
+PRESIGNED_URL_EXPIRES = int(os.environ.get('PRESIGNED_URL_EXPIRES', '900'))
+
+
+def json_response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps(body)
+    }
 
-s3 = boto3.client('s3')
 
 def lambda_handler(event, context):
     """
-    Lambda handler to download all reports from S3 bucket as a zip file
+    Lambda handler to download reports from S3 bucket as a zip file
+    - ?mode=inline|url|redirect (défaut DOWNLOAD_MODE)
+    - ?from=YYYY-MM-DD&to=YYYY-MM-DD&runIds=id1,id2&max=N (tous les rapports par défaut)
     """
     bucket_name = os.environ.get('REPORTS_BUCKET')
-    
+
     if not bucket_name:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({'error': 'REPORTS_BUCKET not configured'})
-        }
-    
+        return json_response(500, {'error': 'REPORTS_BUCKET not configured'})
+
+    params = event.get('queryStringParameters') or {}
+    mode = params.get('mode', DOWNLOAD_MODE)
+    if mode not in DOWNLOAD_MODES:
+        return json_response(400, {'error': f"Invalid mode '{mode}', expected one of {', '.join(DOWNLOAD_MODES)}"})
+
+    try:
+        filters = parse_filters(params)
+    except ValueError as e:
+        return json_response(400, {'error': str(e)})
+
     try:
-        # Liste tous les objets du bucket
-        response = s3.list_objects_v2(Bucket=bucket_name)
-        
-        if 'Contents' not in response or len(response['Contents']) == 0:
+        # Catalogue (un GET par date) si possible, sinon listing paginé limité au
+        # préfixe des rapports et aux dates demandées
+        objects = None
+        if CATALOG_PREFIX:
+            objects = list_reports_from_catalog(s3, bucket_name, REPORTS_PREFIX, CATALOG_PREFIX, filters, CATALOG_MAX_DAYS)
+        source = 'catalog' if objects is not None else 'listing'
+        if objects is None:
+            objects = list_reports(s3, bucket_name, REPORTS_PREFIX, filters)
+        print(f"{len(objects)} report files selected ({source})")
+
+        if not objects:
+            return json_response(404, {'message': 'No reports found'})
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"reports_{timestamp}.zip"
+
+        if mode == 'inline':
+            total_size = sum(obj['Size'] for obj in objects)
+            if total_size <= INLINE_MAX_BYTES:
+                return inline_response(bucket_name, objects, filename)
+            print(f"Reports too large for an inline response ({total_size} bytes), redirecting to archive")
+            mode = 'redirect'
+
+        # Archive streamée vers S3 (multipart), réutilisée si le listing est inchangé
+        key = archive_key(objects, ARCHIVE_PREFIX)
+        cached = archive_exists(s3, bucket_name, key)
+        if cached:
+            print(f"Reusing cached archive s3://{bucket_name}/{key}")
+        else:
+            entries = prefetch_objects(s3, bucket_name, objects, PREFETCH_WORKERS, PREFETCH_IN_FLIGHT)
+            build_archive(s3, bucket_name, entries, key)
+
+        url = s3.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': bucket_name,
+                'Key': key,
+                'ResponseContentDisposition': f'attachment; filename="{filename}"'
+            },
+            ExpiresIn=PRESIGNED_URL_EXPIRES
+        )
+
+        if mode == 'redirect':
             return {
-                'statusCode': 404,
+                'statusCode': 302,
                 'headers': {
-                    'Content-Type': 'application/json'
+                    'Location': url
                 },
-                'body': json.dumps({'message': 'No reports found'})
+                'body': ''
             }
-        
-        # Créer un fichier ZIP en mémoire
-        zip_buffer = BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for obj in response['Contents']:
-                key = obj['Key']
-                print(f"Adding {key} to zip...")
-                
-                # Télécharger l'objet
-                file_obj = s3.get_object(Bucket=bucket_name, Key=key)
-                file_content = file_obj['Body'].read()
-                
-                # Ajouter au ZIP
-                zip_file.writestr(key, file_content)
-        
-        # Récupérer le contenu du ZIP
-        zip_buffer.seek(0)
-        zip_content = zip_buffer.read()
-        
-        # Encoder en base64 pour API Gateway
-        import base64
-        zip_base64 = base64.b64encode(zip_content).decode('utf-8')
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/zip',
-                'Content-Disposition': f'attachment; filename="reports_{timestamp}.zip"'
-            },
-            'body': zip_base64,
-            'isBase64Encoded': True
-        }
-        
+
+        return json_response(200, {
+            'url': url,
+            'expiresIn': PRESIGNED_URL_EXPIRES,
+            'filename': filename,
+            'reports': len(objects),
+            'cached': cached
+        })
+
     except Exception as e:
         print(f"Error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return json_response(500, {'error': str(e)})
+
+
+def inline_response(bucket_name, objects, filename):
+    """ZIP construit en mémoire et renvoyé en base64 dans la réponse API Gateway (petits volumes)"""
+    zip_buffer = BytesIO()
+
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for obj, content in prefetch_objects(s3, bucket_name, objects, PREFETCH_WORKERS, PREFETCH_IN_FLIGHT):
+            if content is None:
+                continue
+            print(f"Adding {obj['Key']} to zip...")
+            add_object(zip_file, obj, content)
+
+    # Encoder en base64 pour API Gateway
+    zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode('utf-8')
 
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/zip',
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        },
+        'body': zip_base64,
+        'isBase64Encoded': True
+    }
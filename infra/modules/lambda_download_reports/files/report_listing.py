@@ -0,0 +1,119 @@
+import re
+from datetime import date, datetime, timedelta
+from report_catalog import read_shard, shard_key
+
+# Clés écrites par lambda_generate_report : reports/{date}/run_{id}.csv[.gz], run_{id}_stats.{parquet,csv}
+REPORT_KEY = re.compile(r"(\d{4}-\d{2}-\d{2})/run_([0-9a-zA-Z\-]+?)(?:_stats)?\.[a-z.]+$")
+MAX_RUN_IDS = 100
+
+
+def parse_filters(params):
+    """
+    Paramètres de requête -> filtres de listing. ValueError si un paramètre est invalide.
+    - from / to : dates incluses (YYYY-MM-DD)
+    - runIds : identifiants de runs séparés par des virgules
+    - max : nombre maximum de runs (les plus récents)
+    """
+    filters = {'from': None, 'to': None, 'run_ids': None, 'max': None}
+
+    for name in ('from', 'to'):
+        value = params.get(name)
+        if value:
+            try:
+                filters[name] = date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Invalid '{name}' date '{value}', expected YYYY-MM-DD")
+    if filters['from'] and filters['to'] and filters['from'] > filters['to']:
+        raise ValueError("'from' must be before or equal to 'to'")
+
+    run_ids = params.get('runIds')
+    if run_ids:
+        filters['run_ids'] = {run_id.strip().lower() for run_id in run_ids.split(',') if run_id.strip()}
+        if len(filters['run_ids']) > MAX_RUN_IDS:
+            raise ValueError(f"Too many runIds (max {MAX_RUN_IDS})")
+
+    max_count = params.get('max')
+    if max_count:
+        if not max_count.isdigit() or int(max_count) < 1:
+            raise ValueError(f"Invalid 'max' value '{max_count}', expected a positive integer")
+        filters['max'] = int(max_count)
+
+    return filters
+
+
+def list_reports(s3, bucket, prefix, filters):
+    """
+    Objets de rapport correspondant aux filtres, listing paginé sous prefix.
+    Les dates ISO se trient comme les clés : le listing démarre directement à la
+    date 'from' (StartAfter) et s'arrête dès qu'une clé dépasse la date 'to'.
+    """
+    kwargs = {'Bucket': bucket, 'Prefix': prefix}
+    if filters['from']:
+        kwargs['StartAfter'] = f"{prefix}{filters['from'].isoformat()}"
+    last_date = filters['to'].isoformat() if filters['to'] else None
+
+    objects = []
+    for page in s3.get_paginator('list_objects_v2').paginate(**kwargs):
+        for obj in page.get('Contents', []):
+            match = REPORT_KEY.match(obj['Key'], len(prefix))
+            if not match:
+                continue
+            report_date, run_id = match.groups()
+            if last_date and report_date > last_date:
+                return limit_runs(objects, filters['max'])
+            if filters['run_ids'] is not None and run_id.lower() not in filters['run_ids']:
+                continue
+            obj['RunId'] = run_id.lower()
+            obj['ReportDate'] = report_date
+            objects.append(obj)
+
+    return limit_runs(objects, filters['max'])
+
+
+def list_reports_from_catalog(s3, bucket, prefix, catalog_prefix, filters, max_days):
+    """
+    Objets de rapport d'une plage de dates lus dans le catalogue tenu par
+    lambda_generate_report : un GET par date au lieu d'un listing du bucket.
+    Une date sans fichier de catalogue (rapports antérieurs au catalogue) est listée.
+    None si aucune plage de dates n'est demandée ou si elle dépasse max_days.
+    """
+    if not filters['from']:
+        return None
+    last = filters['to'] or date.today()
+    days = (last - filters['from']).days + 1
+    if days > max_days:
+        return None
+
+    objects = []
+    for offset in range(days):
+        day = filters['from'] + timedelta(days=offset)
+        entries, _ = read_shard(s3, bucket, shard_key(catalog_prefix, day.isoformat()))
+        if entries is None:
+            objects += list_reports(s3, bucket, prefix, dict(filters, max=None, **{'from': day, 'to': day}))
+            continue
+        for entry in entries:
+            if filters['run_ids'] is not None and entry['runId'] not in filters['run_ids']:
+                continue
+            objects.append({
+                'Key': entry['key'],
+                'Size': entry['size'],
+                'ETag': entry['etag'],
+                'LastModified': datetime.fromisoformat(entry['lastModified']),
+                'RunId': entry['runId'],
+                'ReportDate': entry['date']
+            })
+
+    return limit_runs(objects, filters['max'])
+
+
+def limit_runs(objects, max_count):
+    """Garde les fichiers des max_count runs les plus récents (date du rapport, puis LastModified)"""
+    if not max_count:
+        return objects
+    latest = {}
+    for obj in objects:
+        order = (obj['ReportDate'], obj['LastModified'])
+        if obj['RunId'] not in latest or order > latest[obj['RunId']]:
+            latest[obj['RunId']] = order
+    kept = set(sorted(latest, key=latest.get, reverse=True)[:max_count])
+    return [obj for obj in objects if obj['RunId'] in kept]
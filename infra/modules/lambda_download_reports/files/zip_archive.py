@@ -0,0 +1,120 @@
+import hashlib
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from botocore.exceptions import ClientError
+from s3_stream import S3StreamWriter
+
+# Taille des blocs lus depuis S3 et écrits dans le ZIP
+COPY_CHUNK_SIZE = 1024 * 1024
+# Déjà compressés : stockés tels quels dans le ZIP (deflate n'y gagne rien)
+STORED_EXTENSIONS = ('.gz', '.zip', '.parquet')
+# Objets lus entièrement par le prefetch ; au-delà, seul le get_object est anticipé
+# et le contenu est streamé par le writer (mémoire bornée à in_flight x cette taille)
+PREFETCH_MAX_OBJECT_BYTES = 8 * 1024 * 1024
+
+
+def archive_key(objects, prefix):
+    """
+    Clé de l'archive en cache : empreinte des (Key, ETag) listés.
+    Un rapport ajouté, modifié ou supprimé change la clé et force une reconstruction.
+    """
+    digest = hashlib.sha256()
+    for obj in sorted(objects, key=lambda o: o['Key']):
+        digest.update(f"{obj['Key']}\0{obj['ETag']}\n".encode('utf-8'))
+    return f"{prefix}{digest.hexdigest()}.zip"
+
+
+def archive_exists(s3, bucket, key):
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+def fetch_object(s3, bucket, obj):
+    """
+    get_object d'un rapport : contenu complet si l'objet est petit, sinon flux à lire par le writer.
+    None si l'objet n'existe plus (supprimé ou expiré depuis le listing ou le catalogue).
+    """
+    try:
+        body = s3.get_object(Bucket=bucket, Key=obj['Key'])['Body']
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            raise
+        print(f"Report {obj['Key']} no longer exists, skipped")
+        return None
+    if obj['Size'] <= PREFETCH_MAX_OBJECT_BYTES:
+        return body.read()
+    return body
+
+
+def prefetch_objects(s3, bucket, objects, workers, in_flight):
+    """
+    Itère sur les (objet, contenu) dans l'ordre de objects (contenu None pour un
+    objet disparu, à ignorer), téléchargés en parallèle
+    par un pool de workers pendant que l'appelant compresse l'objet courant.
+    Au plus in_flight objets sont téléchargés ou en attente à la fois : le
+    suivant n'est demandé que lorsque l'appelant consomme un résultat.
+    """
+    if workers <= 1:
+        for obj in objects:
+            yield obj, fetch_object(s3, bucket, obj)
+        return
+
+    remaining = iter(objects)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            (obj, executor.submit(fetch_object, s3, bucket, obj))
+            for obj in islice(remaining, max(in_flight, 1))
+        )
+        try:
+            while pending:
+                obj, future = pending.popleft()
+                content = future.result()
+                # Relance avant de rendre la main : le téléchargement suivant recouvre la compression
+                next_obj = next(remaining, None)
+                if next_obj is not None:
+                    pending.append((next_obj, executor.submit(fetch_object, s3, bucket, next_obj)))
+                yield obj, content
+        finally:
+            # Arrêt anticipé (erreur du writer) : les téléchargements non démarrés sont annulés
+            for _, future in pending:
+                future.cancel()
+
+
+def add_object(zip_file, obj, content):
+    """Ajoute un objet au ZIP ; un contenu streamé est copié par blocs de COPY_CHUNK_SIZE"""
+    key = obj['Key']
+    info = zipfile.ZipInfo(key, date_time=obj['LastModified'].timetuple()[:6])
+    info.compress_type = zipfile.ZIP_STORED if key.endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+    # Taille annoncée : zipfile choisit ZIP64 pour les objets de plus de ~2 Go
+    info.file_size = obj['Size']
+
+    with zip_file.open(info, 'w') as entry:
+        if isinstance(content, bytes):
+            entry.write(content)
+        else:
+            for chunk in content.iter_chunks(COPY_CHUNK_SIZE):
+                entry.write(chunk)
+
+
+def build_archive(s3, bucket, entries, key):
+    """
+    Construit l'archive ZIP directement dans S3 (multipart upload streamé)
+    à partir des (objet, contenu) fournis par prefetch_objects
+    """
+    # Upload multipart annulé si la construction échoue
+    with S3StreamWriter(s3, bucket, key, 'application/zip') as sink:
+        with zipfile.ZipFile(sink, 'w') as zip_file:
+            for obj, content in entries:
+                if content is None:
+                    continue
+                print(f"Adding {obj['Key']} to zip...")
+                add_object(zip_file, obj, content)
+    print(f"Archive uploaded: s3://{bucket}/{key} ({sink.bytes_written} bytes)")
+    return sink.bytes_written
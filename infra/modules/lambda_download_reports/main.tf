@@ -41,6 +41,14 @@ resource "aws_iam_role_policy" "lambda_s3_policy" {
           "s3:GetObject"
         ]
         Resource = "arn:aws:s3:::${var.reports_bucket}/*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:AbortMultipartUpload"
+        ]
+        Resource = "arn:aws:s3:::${var.reports_bucket}/${var.archive_prefix}*"
       }
     ]
   })
@@ -52,13 +60,37 @@ resource "aws_iam_role_policy_attachment" "lambda_logs" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# Sources de la Lambda + modules partagés shared (lecture du catalogue, écriture S3 en streaming)
+locals {
+  lambda_sources = merge(
+    { for f in fileset("${path.module}/files", "*.py") : f => "${path.module}/files/${f}" },
+    {
+      "report_catalog.py" = "${path.module}/../shared/report_catalog.py"
+      "s3_stream.py"      = "${path.module}/../shared/s3_stream.py"
+    }
+  )
+}
+
+data "archive_file" "download_reports" {
+  type        = "zip"
+  output_path = "${path.module}/download_reports.zip"
+
+  dynamic "source" {
+    for_each = local.lambda_sources
+    content {
+      content  = file(source.value)
+      filename = source.key
+    }
+  }
+}
+
 # Lambda Function
 resource "aws_lambda_function" "download_reports" {
-  filename         = "${path.module}/files/handler.zip"
+  filename         = data.archive_file.download_reports.output_path
   function_name    = "${var.project}-download-reports-${var.environment}"
   role            = aws_iam_role.lambda_role.arn
   handler         = "handler.lambda_handler"
-  source_code_hash = filebase64sha256("${path.module}/files/handler.zip")
+  source_code_hash = data.archive_file.download_reports.output_base64sha256
   runtime         = "python3.11"
   timeout         = 60
   memory_size     = 512
@@ -66,6 +98,18 @@ resource "aws_lambda_function" "download_reports" {
   environment {
     variables = {
       REPORTS_BUCKET = var.reports_bucket
+
+      # Mode de téléchargement (inline, url, redirect) et archives en cache
+      DOWNLOAD_MODE         = var.download_mode
+      ARCHIVE_PREFIX        = var.archive_prefix
+      REPORTS_PREFIX        = var.reports_prefix
+      CATALOG_PREFIX        = var.catalog_prefix
+      CATALOG_MAX_DAYS      = tostring(var.catalog_max_days)
+      PRESIGNED_URL_EXPIRES = tostring(var.presigned_url_expires)
+
+      # Téléchargements S3 parallèles pendant la construction du ZIP
+      PREFETCH_WORKERS   = tostring(var.prefetch_workers)
+      PREFETCH_IN_FLIGHT = tostring(var.prefetch_in_flight)
     }
   }
 }
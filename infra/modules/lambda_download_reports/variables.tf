@@ -42,3 +42,56 @@ variable "certificate_arn" {
   type        = string
   default     = ""
 }
+
+variable "download_mode" {
+  description = "Default download mode: inline (base64 ZIP, switches to redirect above ~4 MB), url (JSON with a presigned URL) or redirect (302 to the presigned URL)"
+  type        = string
+  default     = "inline"
+
+  validation {
+    condition     = contains(["inline", "url", "redirect"], var.download_mode)
+    error_message = "download_mode must be inline, url or redirect."
+  }
+}
+
+variable "archive_prefix" {
+  description = "S3 prefix of the cached ZIP archives (excluded from downloads, expired by the s3_reports lifecycle rule)"
+  type        = string
+  default     = "archives/"
+}
+
+variable "presigned_url_expires" {
+  description = "Validity of the archive presigned URLs (seconds)"
+  type        = number
+  default     = 900
+}
+
+variable "reports_prefix" {
+  description = "S3 prefix of the reports written by lambda_generate_report (reports/{date}/run_{id}...)"
+  type        = string
+  default     = "reports/"
+}
+
+variable "prefetch_workers" {
+  description = "Number of threads downloading report objects while the ZIP is written (1 disables prefetching)"
+  type        = number
+  default     = 8
+}
+
+variable "prefetch_in_flight" {
+  description = "Maximum number of report objects downloading or buffered ahead of the ZIP writer (caps memory)"
+  type        = number
+  default     = 16
+}
+
+variable "catalog_prefix" {
+  description = "S3 prefix of the report catalog maintained by lambda_generate_report (empty disables it, every request lists the bucket). Run scripts/backfill_report_catalog.py before enabling it: a day with a catalog file is not listed"
+  type        = string
+  default     = "catalog/"
+}
+
+variable "catalog_max_days" {
+  description = "Longest date range (days) answered from the catalog, one GET per day; wider ranges list the bucket"
+  type        = number
+  default     = 31
+}
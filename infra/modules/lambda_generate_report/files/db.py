@@ -0,0 +1,133 @@
+import os
+import queue
+import time
+from contextlib import contextmanager
+import pg8000.native
+from pg8000.exceptions import InterfaceError
+
+# Au-delà de cette durée d'inactivité, la connexion en cache est vérifiée (SELECT 1)
+HEALTH_CHECK_INTERVAL_SECONDS = int(os.environ.get("DB_HEALTH_CHECK_INTERVAL_SECONDS", "30"))
+CONNECT_TIMEOUT_SECONDS = int(os.environ.get("DB_CONNECT_TIMEOUT_SECONDS", "5"))
+
+
+def parse_db_url(db_url):
+    """
+    URL JDBC (jdbc:postgresql://host:port/database) -> paramètres de connexion pg8000.
+    Port 5432 et base postgres par défaut.
+    """
+    clean_url = db_url.replace("jdbc:postgresql://", "")
+    host_port, _, database = clean_url.partition("/")
+    host, _, port = host_port.partition(":")
+    return {
+        "host": host,
+        "port": int(port) if port else 5432,
+        "database": database.split("?", 1)[0] or "postgres"
+    }
+
+
+class ConnectionCache:
+    """
+    Connexion pg8000 unique, réutilisée entre log events et entre invocations
+    à chaud (le container Lambda garde l'objet au niveau module).
+    - vérification (SELECT 1) si la connexion est restée inactive plus de
+      HEALTH_CHECK_INTERVAL_SECONDS (RDS / NAT coupent les connexions inactives)
+    - reconnexion et nouvel essai si la connexion est cassée pendant une requête
+    """
+
+    def __init__(self, **connect_params):
+        self.connect_params = connect_params
+        self._conn = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        self._conn = pg8000.native.Connection(timeout=CONNECT_TIMEOUT_SECONDS, **self.connect_params)
+        print(f"🔌 Connected to {self.connect_params['host']}/{self.connect_params['database']}")
+
+    def get(self):
+        """Connexion en cache, vérifiée si inactive depuis longtemps, recréée si besoin"""
+        if self._conn is not None and time.monotonic() - self._last_used > HEALTH_CHECK_INTERVAL_SECONDS:
+            try:
+                self._conn.run("SELECT 1")
+            except Exception as e:
+                print(f"⚠️ Cached connection unusable ({e}), reconnecting")
+                self.reset()
+        if self._conn is None:
+            self._connect()
+        self._last_used = time.monotonic()
+        return self._conn
+
+    def reset(self):
+        """Ferme (sans erreur) et oublie la connexion en cache"""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    def run(self, sql, **params):
+        """
+        Exécute une requête en lecture et retourne (rows, noms de colonnes).
+        Une connexion cassée (InterfaceError) est recréée et la requête rejouée une fois.
+        """
+        for attempt in range(2):
+            conn = self.get()
+            try:
+                rows = conn.run(sql, **params)
+                self._last_used = time.monotonic()
+                return rows, [column["name"] for column in conn.columns or []]
+            except InterfaceError as e:
+                self.reset()
+                if attempt:
+                    raise
+                print(f"⚠️ Connection lost ({e}), retrying query")
+
+    def stream(self, sql, chunk_size=1000, **params):
+        """
+        Itère sur le résultat d'une requête par paquets de chunk_size lignes via un
+        curseur serveur (DECLARE / FETCH) : la mémoire reste bornée quel que soit
+        le volume. Générateur de (noms de colonnes, lignes).
+        """
+        conn = self.get()
+        conn.run("START TRANSACTION")
+        try:
+            conn.run(f"DECLARE report_cursor NO SCROLL CURSOR FOR {sql}", **params)
+            while True:
+                rows = conn.run(f"FETCH FORWARD {int(chunk_size)} FROM report_cursor")
+                if not rows:
+                    break
+                self._last_used = time.monotonic()
+                yield [column["name"] for column in conn.columns], rows
+            conn.run("CLOSE report_cursor")
+            conn.run("COMMIT")
+        except BaseException:
+            # Erreur ou itération interrompue (GeneratorExit) : ROLLBACK ferme le curseur
+            try:
+                conn.run("ROLLBACK")
+            except Exception:
+                self.reset()
+            raise
+
+
+class ConnectionPool:
+    """
+    Pool borné de ConnectionCache pour les workers parallèles : une connexion
+    pg8000 n'est pas thread-safe, chaque worker emprunte donc la sienne et la
+    rend après usage. Les connexions restent ouvertes entre invocations à chaud ;
+    la dernière rendue est réutilisée en premier (LIFO, la plus souvent chaude).
+    """
+
+    def __init__(self, size, **connect_params):
+        self.connect_params = connect_params
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(ConnectionCache(**connect_params))
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion (bloquant si toutes sont utilisées)"""
+        cache = self._idle.get()
+        try:
+            yield cache
+        finally:
+            self._idle.put(cache)
@@ -1,13 +1,16 @@
 import os
-import json
-import gzip
-import base64
-import re
-import csv
-import pg8000.native
+import queue
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
-from urllib.parse import urlparse
+from itertools import groupby
+from db import ConnectionPool, parse_db_url
+from log_events import RUN_FINISHED, iter_matches
+from report_catalog import catalog_entry, update_catalog
+from report_writer import encode_csv
+from s3_stream import S3StreamWriter
+from report_stats import encode_stats, fetch_sensor_stats
 
 # AWS X-Ray
 from aws_xray_sdk.core import xray_recorder
@@ -16,94 +19,69 @@ from aws_xray_sdk.core import patch_all
 # Patch automatique des bibliothèques AWS (boto3, etc.)
 patch_all()
 
-s3 = boto3.client("s3")
+REPORTS_BUCKET = os.environ["REPORTS_BUCKET"]
+# Rapports compressés (.csv.gz) et taille des paquets lus par le curseur serveur
+REPORT_GZIP = os.environ.get("REPORT_GZIP", "false").lower() == "true"
+REPORT_FETCH_SIZE = int(os.environ.get("REPORT_FETCH_SIZE", "1000"))
+# Table Postgres des mesures capteurs (statistiques par capteur, vide = désactivé)
+REPORT_SENSOR_TABLE = os.environ.get("REPORT_SENSOR_TABLE", "sensor_data")
+# Nombre de runs d'un même batch de logs encodés / uploadés en parallèle
+REPORT_WORKERS = max(1, int(os.environ.get("REPORT_WORKERS", "4")))
+# Paquets de lignes en attente par run entre la requête et son worker d'upload
+REPORT_QUEUE_CHUNKS = 4
+# Catalogue NDJSON des rapports ({prefix}{date}.ndjson), vide = désactivé
+REPORT_CATALOG_PREFIX = os.environ.get("REPORT_CATALOG_PREFIX", "catalog/")
+
+# Client S3 partagé par les workers (thread-safe), pool HTTP dimensionné en conséquence
+s3 = boto3.client("s3", config=Config(max_pool_connections=max(10, REPORT_WORKERS)))
+
+# Pool de connexions Postgres au niveau module, réutilisées entre invocations à chaud
+# (URL JDBC parsée une seule fois) : une pour la requête des rapports du batch,
+# une pour la requête des statistiques exécutée en parallèle
+db_pool = ConnectionPool(
+    2,
+    user=os.environ["DB_USERNAME"],
+    password=os.environ["DB_PASSWORD"],
+    **parse_db_url(os.environ["DB_URL"])
+)
 
 @xray_recorder.capture('lambda_handler')
 def lambda_handler(event, context):
     try:
-        # --- 1. Décodage CloudWatch ---
+        # --- 1. Décodage CloudWatch : runs terminés présents dans le batch (dédoublonnés, ordre conservé) ---
+        run_ids = []
         with xray_recorder.capture('decode_cloudwatch_logs'):
-            cw_data = event["awslogs"]["data"]
-            decoded = gzip.decompress(base64.b64decode(cw_data)).decode("utf-8")
-            payload = json.loads(decoded)
-
-        for log_event in payload["logEvents"]:
-            message = log_event["message"]
-            match = re.search(r"Run ([0-9a-fA-F\-]{36}) finished SUCCESS", message)
-            if not match:
-                continue
+            for _, match in iter_matches(event, RUN_FINISHED):
+                run_id = match.group(1)
+                if run_id not in run_ids:
+                    print(f"✅ Run detected: {run_id}")
+                    run_ids.append(run_id)
 
-            run_id = match.group(1)
-            print(f"✅ Run detected: {run_id}")
-
-            # Ajouter le run_id comme annotation X-Ray
-            xray_recorder.put_annotation('run_id', run_id)
-
-            # --- 2. Parser l'URL de la base de données ---
-            with xray_recorder.capture('parse_db_url'):
-                # URL format: jdbc:postgresql://host:port/database
-                db_url = os.environ["DB_URL"]
-                # Retirer le préfixe jdbc:postgresql://
-                clean_url = db_url.replace("jdbc:postgresql://", "")
-                # Parser host:port/database
-                if "/" in clean_url:
-                    host_port, database = clean_url.split("/", 1)
-                    if ":" in host_port:
-                        host, port = host_port.split(":")
-                        port = int(port)
-                    else:
-                        host = host_port
-                        port = 5432
-                else:
-                    host = clean_url
-                    port = 5432
-                    database = "postgres"
-
-            # --- 3. Connexion à la base avec pg8000 ---
-            with xray_recorder.capture('database_connection'):
-                conn = pg8000.native.Connection(
-                    host=host,
-                    database=database,
-                    user=os.environ["DB_USERNAME"],
-                    password=os.environ["DB_PASSWORD"],
-                    port=port
-                )
-                xray_recorder.put_metadata('database', 'host', host)
-                xray_recorder.put_metadata('database', 'database', database)
-
-            # --- 4. Requête ---
-            with xray_recorder.capture('database_query'):
-                rows = conn.run("SELECT * FROM runs WHERE id = :run_id", run_id=run_id)
-                xray_recorder.put_metadata('query', 'rows_count', len(rows))
-
-                if not rows:
-                    print(f"No rows found for run {run_id}")
-                    conn.close()
-                    continue
+        if not run_ids:
+            return {"statusCode": 200}
 
-                # Récupérer les noms de colonnes
-                columns = conn.columns
-                colnames = [col["name"] for col in columns]
+        # Ajouter les run_id comme annotation X-Ray
+        xray_recorder.put_annotation('run_id', ",".join(run_ids))
 
-            # --- 5. Génération du CSV ---
-            with xray_recorder.capture('generate_csv'):
-                local_path = f"/tmp/run_{run_id}.csv"
-                with open(local_path, "w", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(colnames)
-                    writer.writerows(rows)
+        # --- 2. Rapports des runs en parallèle (pool de workers borné) ---
+        with xray_recorder.capture('generate_reports'):
+            xray_recorder.put_metadata('database', 'host', db_pool.connect_params["host"])
+            xray_recorder.put_metadata('database', 'database', db_pool.connect_params["database"])
+            written, entries, failed = process_runs(run_ids)
+            xray_recorder.put_metadata('query', 'rows_count', sum(written.values()))
 
-            # --- 6. Upload vers S3 ---
-            with xray_recorder.capture('upload_to_s3'):
-                s3_bucket = os.environ["REPORTS_BUCKET"]
-                s3_path = f"reports/{date.today()}/run_{run_id}.csv"
-                s3.upload_file(local_path, s3_bucket, s3_path)
-                print(f"📤 Uploaded: s3://{s3_bucket}/{s3_path}")
+        # --- 3. Catalogue des rapports : une mise à jour par date pour tout le batch ---
+        if REPORT_CATALOG_PREFIX and entries:
+            with xray_recorder.capture('update_catalog'):
+                update_catalog(s3, REPORTS_BUCKET, REPORT_CATALOG_PREFIX, entries)
+                print(f"📒 Catalog updated: {len(entries)} objects")
 
-                xray_recorder.put_metadata('s3', 'bucket', s3_bucket)
-                xray_recorder.put_metadata('s3', 'key', s3_path)
-
-            conn.close()
+        # Un run en échec n'entraîne pas le rejeu du batch ; seul l'échec de
+        # tous les runs (base indisponible...) remonte pour que Lambda réessaie
+        if failed:
+            xray_recorder.put_annotation('failed_runs', ",".join(failed))
+            if len(failed) == len(run_ids):
+                raise RuntimeError(f"All {len(failed)} run reports failed")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -111,3 +89,191 @@ def lambda_handler(event, context):
         raise e
 
     return {"statusCode": 200}
+
+
+def process_runs(run_ids):
+    """
+    Génère les rapports des runs du batch :
+    - une seule requête WHERE id = ANY(:ids) streamée sur une connexion, dont les
+      lignes sont réparties par run vers un worker qui encode et uploade son CSV
+      (au plus REPORT_WORKERS runs en cours d'upload) ;
+    - une seule requête groupée pour les statistiques de tous les runs, sur une
+      seconde connexion en parallèle, puis un upload par run dans le pool.
+    Chaque run est isolé : l'échec de son upload est journalisé sans interrompre les autres.
+    Retourne ({run_id: nombre de lignes}, [entrées du catalogue], [run_ids en échec]).
+    """
+    # Le contexte X-Ray est local au thread : les workers s'attachent au segment courant
+    parent = xray_recorder.get_trace_entity()
+
+    def in_segment(func):
+        def worker(*args):
+            xray_recorder.set_trace_entity(parent)
+            try:
+                return func(*args)
+            finally:
+                xray_recorder.clear_trace_entities()
+        return worker
+
+    ids = [run_id.lower() for run_id in run_ids]
+    written, entries, failed = {}, [], []
+    with ThreadPoolExecutor(max_workers=REPORT_WORKERS + 1) as executor:
+        stats_future = executor.submit(in_segment(fetch_batch_stats), ids) if REPORT_SENSOR_TABLE else None
+        uploads, error = stream_reports(executor, in_segment(upload_report), ids)
+
+        for run_id in run_ids:
+            future = uploads.get(run_id.lower())
+            if future is None:
+                if error:
+                    print(f"❌ Report failed for run {run_id}: {error}")
+                    failed.append(run_id)
+                else:
+                    print(f"No rows found for run {run_id}")
+                continue
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"❌ Report failed for run {run_id}: {e}")
+                failed.append(run_id)
+                continue
+            written[run_id.lower()] = entry["rows"]
+            entries.append(entry)
+
+        # --- Statistiques par capteur ---
+        # Optionnelles : un échec est loggé sans perdre les rapports déjà uploadés
+        if stats_future and written:
+            entries += write_sensor_stats(executor, in_segment(upload_stats), stats_future, list(written))
+    return written, entries, failed
+
+
+def stream_reports(executor, upload, run_ids):
+    """
+    Streame les lignes des runs (curseur serveur, paquets de REPORT_FETCH_SIZE, triées
+    par id) et transmet celles de chaque run à son worker d'upload par une file bornée :
+    ni fichier /tmp ni résultat complet en mémoire.
+    Retourne ({run_id: future de l'entrée du catalogue du rapport}, erreur de la requête ou None).
+    """
+    uploads = {}
+    chunks = None
+    try:
+        with db_pool.connection() as db:
+            for colnames, rows in db.stream(
+                "SELECT * FROM runs WHERE id = ANY(:ids) ORDER BY id",
+                chunk_size=REPORT_FETCH_SIZE,
+                ids=run_ids
+            ):
+                id_index = colnames.index("id")
+                for run_id, run_rows in groupby(rows, key=lambda row: str(row[id_index]).lower()):
+                    if run_id not in uploads:
+                        if chunks:
+                            chunks.put(None)
+                        chunks = queue.Queue(maxsize=REPORT_QUEUE_CHUNKS)
+                        uploads[run_id] = executor.submit(upload, run_id, colnames, chunks)
+                    chunks.put(list(run_rows))
+        if chunks:
+            chunks.put(None)
+        return uploads, None
+    except Exception as e:
+        # Le run en cours est abandonné, les runs déjà transmis terminent leur upload
+        if chunks:
+            chunks.put(e)
+        return uploads, e
+
+
+def upload_report(run_id, colnames, chunks):
+    """
+    Worker d'un run : écrit dans son CSV S3 les paquets de lignes reçus jusqu'à la
+    fin du run (None) ou l'échec de la requête (exception). En cas d'erreur, la file
+    est vidée jusqu'au bout pour ne pas bloquer la requête, puis l'upload est annulé.
+    Retourne l'entrée du catalogue du rapport.
+    """
+    with xray_recorder.capture('run_report'):
+        xray_recorder.put_annotation('run_id', run_id)
+        writer = open_report(run_id, colnames)
+        rows_count = 0
+        error = None
+        while True:
+            rows = chunks.get()
+            if rows is None:
+                break
+            if isinstance(rows, Exception):
+                error = error or rows
+                break
+            if error:
+                continue
+            try:
+                writer.write(encode_csv(rows))
+                rows_count += len(rows)
+            except Exception as e:
+                error = e
+        if error:
+            writer.abort()
+            raise error
+        return finish_report(writer, run_id, rows_count)
+
+
+def open_report(run_id, colnames):
+    """Writer S3 du rapport d'un run, en-tête CSV écrit"""
+    extension = "csv.gz" if REPORT_GZIP else "csv"
+    writer = S3StreamWriter(s3, REPORTS_BUCKET, f"reports/{date.today()}/run_{run_id}.{extension}", "text/csv", compress=REPORT_GZIP)
+    writer.write(encode_csv([colnames]))
+    return writer
+
+
+def finish_report(writer, run_id, rows_count):
+    """Termine l'upload du rapport et retourne son entrée du catalogue"""
+    with xray_recorder.capture('upload_to_s3'):
+        writer.close()
+        print(f"📤 Uploaded: s3://{writer.bucket}/{writer.key} ({writer.bytes_written} bytes)")
+        xray_recorder.put_metadata('s3', 'bucket', writer.bucket)
+        xray_recorder.put_metadata('s3', 'key', writer.key)
+    return catalog_entry(writer.key, run_id, "report", writer.bytes_written, rows_count, writer.etag)
+
+
+def fetch_batch_stats(run_ids):
+    """Statistiques par capteur de tous les runs du batch, en une requête groupée"""
+    with db_pool.connection() as db, xray_recorder.capture('sensor_stats_query'):
+        return fetch_sensor_stats(db, REPORT_SENSOR_TABLE, run_ids)
+
+
+def write_sensor_stats(executor, upload, stats_future, run_ids):
+    """
+    Statistiques par capteur des runs (count, min, max, moyenne, écart-type,
+    percentiles) calculées dans Postgres, écrites à côté du CSV :
+    reports/{date}/run_{id}_stats.parquet (.csv si REPORT_STATS_FORMAT=csv), un upload par run
+    dans le pool. Les échecs sont journalisés (et annotés X-Ray) sans interrompre les rapports.
+    Retourne les entrées du catalogue des fichiers écrits.
+    """
+    entries = []
+    try:
+        stats = stats_future.result()
+    except Exception as e:
+        print(f"⚠️ Sensor statistics failed for runs {', '.join(run_ids)}: {e}")
+        xray_recorder.put_annotation('stats_error', type(e).__name__)
+        return entries
+    if stats is None:
+        return entries
+
+    uploads = {}
+    for run_id in run_ids:
+        rows = stats.get(run_id)
+        if not rows:
+            print(f"No sensor readings found for run {run_id}")
+            continue
+        uploads[run_id] = executor.submit(upload, run_id, rows)
+    for run_id, future in uploads.items():
+        try:
+            entries.append(future.result())
+        except Exception as e:
+            print(f"⚠️ Sensor statistics failed for run {run_id}: {e}")
+            xray_recorder.put_annotation('stats_error', type(e).__name__)
+    return entries
+
+
+def upload_stats(run_id, rows):
+    """Encode et uploade les statistiques d'un run, retourne leur entrée du catalogue"""
+    body, extension, content_type = encode_stats(rows)
+    key = f"reports/{date.today()}/run_{run_id}_stats.{extension}"
+    with xray_recorder.capture('upload_to_s3'):
+        result = s3.put_object(Bucket=REPORTS_BUCKET, Key=key, Body=body, ContentType=content_type)
+        print(f"📤 Uploaded: s3://{REPORTS_BUCKET}/{key} ({len(rows)} sensors)")
+    return catalog_entry(key, run_id, "stats", len(body), len(rows), result["ETag"])
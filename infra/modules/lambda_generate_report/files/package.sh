@@ -0,0 +1,16 @@
+#!/bin/bash
+# Script pour packager la Lambda generate-report (dépendances + modules partagés log_events, report_catalog, s3_stream)
+
+echo "Packaging Lambda generate-report..."
+
+cd "$(dirname "$0")"
+
+rm -rf build handler.zip
+mkdir build
+pip install -r requirements.txt -t build --quiet --platform manylinux2014_x86_64 --python-version 3.11 --only-binary=:all:
+cp *.py build/
+cp ../../shared/log_events.py ../../shared/report_catalog.py ../../shared/s3_stream.py build/
+(cd build && zip -qr ../handler.zip .)
+rm -rf build
+
+echo "OK handler.zip created"
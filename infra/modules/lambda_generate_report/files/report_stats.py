@@ -0,0 +1,99 @@
+import io
+import os
+from itertools import groupby
+from pg8000.exceptions import DatabaseError
+from pg8000.native import identifier
+from report_writer import encode_csv
+
+# pyarrow est fourni par la couche AWS SDK for pandas, attachée par défaut
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Format des fichiers de statistiques : parquet (défaut) ou csv (opt-out explicite)
+STATS_FORMAT = os.environ.get("REPORT_STATS_FORMAT", "parquet").lower()
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+UNDEFINED_TABLE = "42P01"
+
+STATS_COLUMNS = [
+    "run_id", "sensor_id", "type", "count", "min", "max", "mean", "stddev",
+    "p50", "p90", "p95", "p99", "first_ts", "last_ts"
+]
+STRING_COLUMNS = {"run_id", "sensor_id", "type"}
+FLOAT_COLUMNS = {"min", "max", "mean", "stddev", "p50", "p90", "p95", "p99"}
+
+
+def sensor_stats_query(table):
+    """
+    Statistiques par (run, capteur, type) calculées dans Postgres en une requête
+    pour tous les runs du batch : les mesures brutes ne quittent pas la base.
+    Les percentiles partagent un seul tri par groupe (percentile_cont sur tableau).
+    """
+    percentiles = ", ".join(str(p) for p in PERCENTILES)
+    return f"""
+        SELECT run_id, sensor_id, type, count, min, max, mean, stddev,
+               p[1] AS p50, p[2] AS p90, p[3] AS p95, p[4] AS p99, first_ts, last_ts
+        FROM (
+            SELECT run_id::text AS run_id, sensor_id, type,
+                   COUNT(*) AS count,
+                   MIN(reading) AS min,
+                   MAX(reading) AS max,
+                   AVG(reading) AS mean,
+                   STDDEV_POP(reading) AS stddev,
+                   PERCENTILE_CONT(ARRAY[{percentiles}]) WITHIN GROUP (ORDER BY reading) AS p,
+                   MIN({identifier("timestamp")}) AS first_ts,
+                   MAX({identifier("timestamp")}) AS last_ts
+            FROM {identifier(table)}
+            WHERE run_id = ANY(:ids)
+            GROUP BY run_id, sensor_id, type
+        ) stats
+        ORDER BY run_id, sensor_id, type
+    """
+
+
+def fetch_sensor_stats(db, table, run_ids):
+    """
+    {run_id: [lignes de STATS_COLUMNS]} pour les runs du batch.
+    None si la table des mesures n'existe pas dans cette base.
+    """
+    try:
+        rows, _ = db.run(sensor_stats_query(table), ids=run_ids)
+    except DatabaseError as e:
+        details = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+        if details.get("C") != UNDEFINED_TABLE:
+            raise
+        print(f"ℹ️ Table {table} not found, sensor statistics skipped")
+        return None
+    return {run_id.lower(): list(run_rows) for run_id, run_rows in groupby(rows, key=lambda row: row[0])}
+
+
+def encode_stats(rows):
+    """
+    Encode les statistiques d'un run : Parquet, ou CSV si REPORT_STATS_FORMAT=csv.
+    Sans pyarrow en format parquet, l'échec est explicite (pas de repli CSV silencieux).
+    Retourne (contenu, extension, content type).
+    """
+    if STATS_FORMAT == "csv":
+        return encode_csv([STATS_COLUMNS] + rows), "csv", "text/csv"
+    if pa is None:
+        raise RuntimeError("pyarrow unavailable: attach the AWS SDK for pandas layer or set REPORT_STATS_FORMAT=csv")
+
+    columns = {}
+    for index, name in enumerate(STATS_COLUMNS):
+        values = [row[index] for row in rows]
+        if name in STRING_COLUMNS:
+            columns[name] = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        elif name in FLOAT_COLUMNS:
+            columns[name] = pa.array([None if v is None else float(v) for v in values], type=pa.float64())
+        elif name == "count":
+            columns[name] = pa.array(values, type=pa.int64())
+        else:
+            # Horodatages : type déduit de la colonne source (timestamp ou texte ISO8601)
+            columns[name] = pa.array(values)
+
+    buffer = io.BytesIO()
+    pq.write_table(pa.table(columns), buffer, compression="snappy")
+    return buffer.getvalue(), "parquet", "application/vnd.apache.parquet"
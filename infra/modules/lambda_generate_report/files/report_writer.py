@@ -0,0 +1,9 @@
+import csv
+import io
+
+
+def encode_csv(rows):
+    """Encode un paquet de lignes CSV (même format que csv.writer sur fichier)"""
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue().encode("utf-8")
@@ -7,8 +7,15 @@ data "aws_secretsmanager_secret_version" "db_credentials" {
   secret_id = var.db_secret_arn
 }
 
+# ARN de la couche AWS SDK for pandas (pyarrow) pour la région, publié par AWS dans SSM
+data "aws_ssm_parameter" "pandas_layer" {
+  count = var.stats_format == "parquet" ? 1 : 0
+  name  = "/aws/service/aws-sdk-pandas/${var.pandas_layer_version}/py3.11/x86_64/layer-arn"
+}
+
 locals {
   db_credentials = jsondecode(data.aws_secretsmanager_secret_version.db_credentials.secret_string)
+  pandas_layers  = [for layer in data.aws_ssm_parameter.pandas_layer : nonsensitive(layer.value)]
 }
 
 # Security Group pour Lambda
@@ -66,9 +73,20 @@ resource "aws_iam_policy" "lambda_policy" {
     Statement = [
       {
         Effect   = "Allow"
-        Action   = ["s3:PutObject"]
+        Action   = ["s3:PutObject", "s3:AbortMultipartUpload"]
         Resource = "arn:aws:s3:::${var.reports_bucket}/*"
       },
+      {
+        # Lecture du catalogue avant sa mise à jour (ListBucket : NoSuchKey plutôt que 403)
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = "arn:aws:s3:::${var.reports_bucket}/${var.catalog_prefix}*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = "arn:aws:s3:::${var.reports_bucket}"
+      },
       {
         Effect   = "Allow"
         Action   = ["secretsmanager:GetSecretValue"]
@@ -131,6 +149,9 @@ resource "aws_lambda_function" "generate_report" {
   runtime          = "python3.11"
   timeout          = 30
 
+  # Couche AWS SDK for pandas (pyarrow : statistiques en Parquet) + couches additionnelles
+  layers = concat(local.pandas_layers, var.layer_arns)
+
   # Activation du tracing X-Ray
   tracing_config {
     mode = "Active"
@@ -143,8 +164,23 @@ resource "aws_lambda_function" "generate_report" {
 
   environment {
     variables = {
-      # S3
-      REPORTS_BUCKET = var.reports_bucket
+      # S3 (rapports streamés : multipart upload, gzip optionnel)
+      REPORTS_BUCKET    = var.reports_bucket
+      REPORT_GZIP       = tostring(var.report_gzip)
+      REPORT_FETCH_SIZE = tostring(var.report_fetch_size)
+
+      # Statistiques par capteur (table Postgres des mesures, vide = désactivé)
+      REPORT_SENSOR_TABLE = var.report_sensor_table
+      REPORT_STATS_FORMAT = var.stats_format
+
+      # Runs d'un même batch de logs encodés et uploadés en parallèle (une requête DB par batch)
+      REPORT_WORKERS = tostring(var.report_workers)
+
+      # Niveau de log du décodage des logs CloudWatch (DEBUG : chaque message reçu)
+      LOG_LEVEL = var.log_level
+
+      # Catalogue NDJSON des rapports (un fichier par date), vide = désactivé
+      REPORT_CATALOG_PREFIX = var.catalog_prefix
 
       # Credentials DB depuis Secret Manager (URL complète)
       DB_URL         = local.db_credentials["url"]
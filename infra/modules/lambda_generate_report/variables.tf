@@ -29,3 +29,62 @@ variable "db_security_group_id" {
   type        = string
   description = "Security group ID de la base de données"
 }
+
+variable "report_gzip" {
+  type        = bool
+  description = "Compresser les rapports CSV (reports/{date}/run_{id}.csv.gz)"
+  default     = false
+}
+
+variable "report_fetch_size" {
+  type        = number
+  description = "Nombre de lignes lues par FETCH sur le curseur serveur Postgres"
+  default     = 1000
+}
+
+variable "report_sensor_table" {
+  type        = string
+  description = "Table Postgres des mesures capteurs (run_id, sensor_id, type, reading, timestamp) pour les statistiques par capteur, vide pour désactiver"
+  default     = "sensor_data"
+}
+
+variable "stats_format" {
+  type        = string
+  description = "Format des statistiques par capteur : parquet (couche AWS SDK for pandas attachée pour pyarrow) ou csv (opt-out, sans couche)"
+  default     = "parquet"
+
+  validation {
+    condition     = contains(["parquet", "csv"], var.stats_format)
+    error_message = "stats_format must be parquet or csv."
+  }
+}
+
+variable "pandas_layer_version" {
+  type        = string
+  description = "Version de la couche publique AWS SDK for pandas (ARN résolu pour la région via SSM) attachée en format parquet"
+  default     = "3.9.0"
+}
+
+variable "layer_arns" {
+  type        = list(string)
+  description = "Couches Lambda additionnelles"
+  default     = []
+}
+
+variable "report_workers" {
+  type        = number
+  description = "Nombre de runs d'un même batch de logs encodés et uploadés en parallèle (une seule requête Postgres pour tout le batch)"
+  default     = 4
+}
+
+variable "log_level" {
+  type        = string
+  description = "Niveau de log de la Lambda (DEBUG journalise chaque message de log reçu)"
+  default     = "INFO"
+}
+
+variable "catalog_prefix" {
+  type        = string
+  description = "Préfixe S3 du catalogue NDJSON des rapports ({prefix}{date}.ndjson), lu par lambda_download_reports ; vide pour désactiver"
+  default     = "catalog/"
+}
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 import boto3
 import urllib3
 from datetime import datetime
@@ -16,36 +17,111 @@ DEPLOYMENTS_TABLE = os.environ.get('DEPLOYMENTS_TABLE')
 GITHUB_TOKEN_SECRET = os.environ.get('GITHUB_TOKEN_SECRET')
 GITHUB_REPO_OWNER = os.environ.get('GITHUB_REPO_OWNER')
 GITHUB_REPO_NAME = os.environ.get('GITHUB_REPO_NAME')
+# Durée de conservation du token GitHub entre invocations à chaud
+GITHUB_TOKEN_CACHE_SECONDS = int(os.environ.get('GITHUB_TOKEN_CACHE_SECONDS', '900'))
 
 # Table DynamoDB
 table = dynamodb.Table(DEPLOYMENTS_TABLE)
 http = urllib3.PoolManager()
 
+# Caches conservés entre invocations à chaud (une invocation par minute) :
+# token GitHub, et réponses GitHub avec leur ETag pour les requêtes conditionnelles
+_token_cache = {'value': None, 'expires_at': 0}
+_etag_cache = {}  # url -> (etag, données décodées)
+
+RUNS_PAGE_SIZE = 100
+TERMINAL_STATUSES = ('SUCCESS', 'FAILED', 'CANCELLED')
+
+
 def get_github_token():
-    """Récupérer le GitHub token depuis Secrets Manager"""
-    response = secretsmanager.get_secret_value(SecretId=GITHUB_TOKEN_SECRET)
-    return json.loads(response['SecretString'])['token']
+    """Récupérer le GitHub token depuis Secrets Manager (en cache GITHUB_TOKEN_CACHE_SECONDS)"""
+    if _token_cache['value'] is None or time.monotonic() >= _token_cache['expires_at']:
+        response = secretsmanager.get_secret_value(SecretId=GITHUB_TOKEN_SECRET)
+        _token_cache['value'] = json.loads(response['SecretString'])['token']
+        _token_cache['expires_at'] = time.monotonic() + GITHUB_TOKEN_CACHE_SECONDS
+    return _token_cache['value']
 
-def update_deployment_status(deployment_id, workflow_run_id, github_token):
-    """Mettre à jour le statut d'un déploiement en interrogeant GitHub"""
-    try:
-        # Interroger l'API GitHub
-        url = f'https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/actions/runs/{workflow_run_id}'
 
+def invalidate_github_token():
+    """Oublie le token en cache (révoqué ou renouvelé dans Secrets Manager)"""
+    _token_cache['value'] = None
+
+
+def github_get(url):
+    """
+    GET sur l'API GitHub avec If-None-Match : une réponse 304 (inchangée) ne compte
+    pas dans la limite de requêtes et la réponse précédente en cache est réutilisée.
+    Sur 401, le token en cache est relu dans Secrets Manager et la requête rejouée une fois.
+    Retourne les données JSON décodées, None en cas d'erreur HTTP.
+    """
+    cached = _etag_cache.get(url)
+    for attempt in range(2):
         headers = {
-            'Authorization': f'token {github_token}',
+            'Authorization': f'token {get_github_token()}',
             'Accept': 'application/vnd.github.v3+json',
             'User-Agent': 'Lambda-Status-Updater'
         }
+        if cached:
+            headers['If-None-Match'] = cached[0]
 
         response = http.request('GET', url, headers=headers)
+        if response.status != 401 or attempt == 1:
+            break
+        print("🔑 GitHub token rejected (HTTP 401), reloading it from Secrets Manager")
+        invalidate_github_token()
+
+    if response.status == 304 and cached:
+        return cached[1]
+    if response.status != 200:
+        print(f"⚠️ GitHub request failed: {url} HTTP {response.status}")
+        return None
+
+    data = json.loads(response.data.decode('utf-8'))
+    etag = response.headers.get('ETag')
+    if etag:
+        _etag_cache[url] = (etag, data)
+    return data
+
+
+def fetch_workflow_runs(workflow_run_ids):
+    """
+    Runs GitHub Actions des déploiements actifs : une seule requête
+    GET /actions/runs?per_page=100 par cycle, runs retrouvés localement par ID.
+    Seuls les runs absents des 100 plus récents sont demandés un par un.
+    Retourne {workflow_run_id (str): run}.
+    """
+    base_url = f'https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/actions/runs'
+    runs = {}
 
-        if response.status != 200:
-            print(f"⚠️ Failed to fetch workflow {workflow_run_id}: HTTP {response.status}")
-            return False
+    listing = github_get(f'{base_url}?per_page={RUNS_PAGE_SIZE}')
+    if listing is not None:
+        for run in listing.get('workflow_runs', []):
+            if str(run['id']) in workflow_run_ids:
+                runs[str(run['id'])] = run
 
-        run = json.loads(response.data.decode('utf-8'))
+    missing = [run_id for run_id in workflow_run_ids if run_id not in runs]
 
+    # Cache borné aux runs encore suivis individuellement
+    for url in [url for url in _etag_cache if url.startswith(f'{base_url}/')]:
+        if url.rsplit('/', 1)[1] not in missing:
+            del _etag_cache[url]
+
+    if missing:
+        print(f"🔎 {len(missing)} run(s) not in the {RUNS_PAGE_SIZE} most recent, fetching individually")
+    for run_id in missing:
+        run = github_get(f'{base_url}/{run_id}')
+        if run is not None:
+            runs[run_id] = run
+
+    return runs
+
+
+def update_deployment_status(deployment_id, run, current_status):
+    """
+    Mettre à jour le statut d'un déploiement à partir de son run GitHub Actions.
+    Retourne le statut écrit dans DynamoDB, None si rien n'a été écrit.
+    """
+    try:
         current_github_status = run['status']
         conclusion = run.get('conclusion')
 
@@ -72,9 +148,12 @@ def update_deployment_status(deployment_id, workflow_run_id, github_token):
                     ':completed': int(datetime.utcnow().timestamp())
                 }
             )
-            return True
+            return new_status
 
         elif current_github_status == 'in_progress':
+            if current_status == 'IN_PROGRESS':
+                return None  # Déjà à jour, pas d'écriture DynamoDB
+
             # Mettre à jour vers IN_PROGRESS
             print(f"  🔄 Updating to IN_PROGRESS")
             table.update_item(
@@ -86,13 +165,13 @@ def update_deployment_status(deployment_id, workflow_run_id, github_token):
                     ':timestamp': int(datetime.utcnow().timestamp())
                 }
             )
-            return False  # Pas encore terminé
+            return 'IN_PROGRESS'  # Pas encore terminé
 
-        return False  # Toujours en cours
+        return None  # Toujours en attente (queued, ...)
 
     except Exception as e:
         print(f"❌ Error updating deployment {deployment_id}: {str(e)}")
-        return False
+        return None
 
 def lambda_handler(event, context):
     """
@@ -102,9 +181,9 @@ def lambda_handler(event, context):
     try:
         print("🔄 Starting periodic status update...")
 
-        # Récupérer le GitHub token
+        # Récupérer le GitHub token (en cache, relu sur 401)
         try:
-            github_token = get_github_token()
+            get_github_token()
         except Exception as e:
             print(f"❌ Failed to get GitHub token: {str(e)}")
             return {
@@ -118,11 +197,14 @@ def lambda_handler(event, context):
         # Scanner DynamoDB pour tous les déploiements actifs
         active_statuses = ['TRIGGERING', 'TRIGGERED', 'IN_PROGRESS']
 
-        response = table.scan(
-            FilterExpression=Attr('status').is_in(active_statuses)
-        )
-
-        active_deployments = response.get('Items', [])
+        scan_kwargs = {'FilterExpression': Attr('status').is_in(active_statuses)}
+        active_deployments = []
+        while True:
+            response = table.scan(**scan_kwargs)
+            active_deployments.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
         print(f"📊 Found {len(active_deployments)} active deployment(s)")
 
@@ -136,6 +218,14 @@ def lambda_handler(event, context):
                 })
             }
 
+        # Runs GitHub de tous les déploiements actifs en une requête (conditionnelle)
+        workflow_run_ids = {
+            str(deployment['workflow_run_id'])
+            for deployment in active_deployments
+            if deployment.get('workflow_run_id')
+        }
+        runs = fetch_workflow_runs(workflow_run_ids) if workflow_run_ids else {}
+
         updated_count = 0
         completed_count = 0
 
@@ -152,11 +242,17 @@ def lambda_handler(event, context):
                 print(f"  ⚠️ No workflow_run_id, skipping")
                 continue
 
-            # Mettre à jour le statut
-            is_completed = update_deployment_status(deployment_id, workflow_run_id, github_token)
+            run = runs.get(str(workflow_run_id))
+            if run is None:
+                print(f"  ⚠️ Workflow run {workflow_run_id} not found on GitHub, skipping")
+                continue
+
+            # Mettre à jour le statut (seules les écritures effectives sont comptées)
+            new_status = update_deployment_status(deployment_id, run, current_status)
 
-            updated_count += 1
-            if is_completed:
+            if new_status:
+                updated_count += 1
+            if new_status in TERMINAL_STATUSES:
                 completed_count += 1
 
         print(f"\n✅ Status update complete: {updated_count} updated, {completed_count} completed")
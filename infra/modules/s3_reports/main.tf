@@ -21,3 +21,36 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "encryption" {
 output "bucket_name" {
   value = aws_s3_bucket.reports.bucket
 }
+
+# Archives ZIP de téléchargement (cache) : expirées, ainsi que les uploads multipart abandonnés
+resource "aws_s3_bucket_lifecycle_configuration" "archives" {
+  bucket = aws_s3_bucket.reports.id
+
+  rule {
+    id     = "expire-download-archives"
+    status = "Enabled"
+
+    filter {
+      prefix = var.archive_prefix
+    }
+
+    expiration {
+      days = var.archive_expiration_days
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
@@ -4,3 +4,11 @@ variable "project" {
 variable "environment" {
   type = string
 }
+variable "archive_prefix" {
+  type    = string
+  default = "archives/"
+}
+variable "archive_expiration_days" {
+  type    = number
+  default = 7
+}
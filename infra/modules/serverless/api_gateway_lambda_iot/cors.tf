@@ -4,7 +4,7 @@
 
 locals {
   cors_headers = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-User,X-Run-Id'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-User,X-Run-Id,Idempotency-Key'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,PUT,DELETE,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -487,3 +487,161 @@ resource "aws_api_gateway_integration_response" "sensors_data_options" {
   ]
 }
 
+# ===========================
+# OPTIONS /api/sensors/data/batch
+# ===========================
+
+resource "aws_api_gateway_method" "sensors_data_batch_options" {
+  rest_api_id   = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id   = aws_api_gateway_resource.sensors_data_batch.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "sensors_data_batch_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_batch.id
+  http_method = aws_api_gateway_method.sensors_data_batch_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "sensors_data_batch_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_batch.id
+  http_method = aws_api_gateway_method.sensors_data_batch_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+}
+
+resource "aws_api_gateway_integration_response" "sensors_data_batch_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_batch.id
+  http_method = aws_api_gateway_method.sensors_data_batch_options.http_method
+  status_code = "200"
+
+  response_parameters = local.cors_headers
+
+  depends_on = [
+    aws_api_gateway_integration.sensors_data_batch_options,
+    aws_api_gateway_method_response.sensors_data_batch_options
+  ]
+}
+
+# ===========================
+# OPTIONS /api/sensors/data/export
+# ===========================
+
+resource "aws_api_gateway_method" "sensors_data_export_options" {
+  rest_api_id   = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id   = aws_api_gateway_resource.sensors_data_export.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "sensors_data_export_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_export.id
+  http_method = aws_api_gateway_method.sensors_data_export_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "sensors_data_export_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_export.id
+  http_method = aws_api_gateway_method.sensors_data_export_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+}
+
+resource "aws_api_gateway_integration_response" "sensors_data_export_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_export.id
+  http_method = aws_api_gateway_method.sensors_data_export_options.http_method
+  status_code = "200"
+
+  response_parameters = local.cors_headers
+
+  depends_on = [
+    aws_api_gateway_integration.sensors_data_export_options,
+    aws_api_gateway_method_response.sensors_data_export_options
+  ]
+}
+
+# ===========================
+# OPTIONS /api/sensors/rollups
+# ===========================
+
+resource "aws_api_gateway_method" "sensors_rollups_options" {
+  rest_api_id   = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id   = aws_api_gateway_resource.sensors_rollups.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "sensors_rollups_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_rollups.id
+  http_method = aws_api_gateway_method.sensors_rollups_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "sensors_rollups_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_rollups.id
+  http_method = aws_api_gateway_method.sensors_rollups_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+}
+
+resource "aws_api_gateway_integration_response" "sensors_rollups_options" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_rollups.id
+  http_method = aws_api_gateway_method.sensors_rollups_options.http_method
+  status_code = "200"
+
+  response_parameters = local.cors_headers
+
+  depends_on = [
+    aws_api_gateway_integration.sensors_rollups_options,
+    aws_api_gateway_method_response.sensors_rollups_options
+  ]
+}
@@ -278,6 +278,81 @@ resource "aws_api_gateway_integration" "sensors_data_get" {
   uri                     = var.lambda_sensor_api_invoke_arn
 }
 
+# /api/sensors/data/batch
+resource "aws_api_gateway_resource" "sensors_data_batch" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  parent_id   = aws_api_gateway_resource.sensors_data.id
+  path_part   = "batch"
+}
+
+# POST /sensors/data/batch
+resource "aws_api_gateway_method" "sensors_data_batch_post" {
+  rest_api_id   = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id   = aws_api_gateway_resource.sensors_data_batch.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "sensors_data_batch_post" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_batch.id
+  http_method = aws_api_gateway_method.sensors_data_batch_post.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_sensor_api_invoke_arn
+}
+
+# /api/sensors/data/export
+resource "aws_api_gateway_resource" "sensors_data_export" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  parent_id   = aws_api_gateway_resource.sensors_data.id
+  path_part   = "export"
+}
+
+# GET /sensors/data/export
+resource "aws_api_gateway_method" "sensors_data_export_get" {
+  rest_api_id   = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id   = aws_api_gateway_resource.sensors_data_export.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "sensors_data_export_get" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_data_export.id
+  http_method = aws_api_gateway_method.sensors_data_export_get.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_sensor_api_invoke_arn
+}
+
+# /api/sensors/rollups
+resource "aws_api_gateway_resource" "sensors_rollups" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  parent_id   = aws_api_gateway_resource.sensors.id
+  path_part   = "rollups"
+}
+
+# GET /sensors/rollups
+resource "aws_api_gateway_method" "sensors_rollups_get" {
+  rest_api_id   = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id   = aws_api_gateway_resource.sensors_rollups.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "sensors_rollups_get" {
+  rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
+  resource_id = aws_api_gateway_resource.sensors_rollups.id
+  http_method = aws_api_gateway_method.sensors_rollups_get.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_sensor_api_invoke_arn
+}
+
 # ===========================
 # Deployment
 # ===========================
@@ -294,6 +369,9 @@ resource "aws_api_gateway_deployment" "lambda_iot" {
     aws_api_gateway_integration.runs_id_finish_post,
     aws_api_gateway_integration.sensors_data_post,
     aws_api_gateway_integration.sensors_data_get,
+    aws_api_gateway_integration.sensors_data_batch_post,
+    aws_api_gateway_integration.sensors_data_export_get,
+    aws_api_gateway_integration.sensors_rollups_get,
     # CORS OPTIONS integrations
     aws_api_gateway_integration_response.runs_options,
     aws_api_gateway_integration_response.runs_start_options,
@@ -304,6 +382,9 @@ resource "aws_api_gateway_deployment" "lambda_iot" {
     aws_api_gateway_integration_response.runs_all_options,
     aws_api_gateway_integration_response.runs_interrupt_all_options,
     aws_api_gateway_integration_response.sensors_data_options,
+    aws_api_gateway_integration_response.sensors_data_batch_options,
+    aws_api_gateway_integration_response.sensors_data_export_options,
+    aws_api_gateway_integration_response.sensors_rollups_options,
   ]
 
   rest_api_id = aws_api_gateway_rest_api.lambda_iot.id
@@ -320,6 +401,9 @@ resource "aws_api_gateway_deployment" "lambda_iot" {
       aws_api_gateway_resource.runs_id.id,
       aws_api_gateway_resource.sensors.id,
       aws_api_gateway_resource.sensors_data.id,
+      aws_api_gateway_resource.sensors_data_batch.id,
+      aws_api_gateway_resource.sensors_data_export.id,
+      aws_api_gateway_resource.sensors_rollups.id,
       aws_api_gateway_method.runs_get.id,
       aws_api_gateway_method.runs_start_post.id,
       aws_api_gateway_method.runs_can_start_get.id,
@@ -328,6 +412,9 @@ resource "aws_api_gateway_deployment" "lambda_iot" {
       aws_api_gateway_method.runs_id_finish_post.id,
       aws_api_gateway_method.sensors_data_post.id,
       aws_api_gateway_method.sensors_data_get.id,
+      aws_api_gateway_method.sensors_data_batch_post.id,
+      aws_api_gateway_method.sensors_data_export_get.id,
+      aws_api_gateway_method.sensors_rollups_get.id,
       # OPTIONS methods for CORS
       aws_api_gateway_integration_response.runs_options.id,
       aws_api_gateway_integration_response.runs_start_options.id,
@@ -338,6 +425,9 @@ resource "aws_api_gateway_deployment" "lambda_iot" {
       aws_api_gateway_integration_response.runs_all_options.id,
       aws_api_gateway_integration_response.runs_interrupt_all_options.id,
       aws_api_gateway_integration_response.sensors_data_options.id,
+      aws_api_gateway_integration_response.sensors_data_batch_options.id,
+      aws_api_gateway_integration_response.sensors_data_export_options.id,
+      aws_api_gateway_integration_response.sensors_rollups_options.id,
     ]))
   }
 
@@ -23,6 +23,11 @@ resource "aws_dynamodb_table" "runs" {
     type = "S" # ISO8601 timestamp pour tri
   }
 
+  attribute {
+    name = "status"
+    type = "S" # RUNNING, COMPLETED, FAILED, INTERRUPTED
+  }
+
   # GSI pour requêtes par username
   global_secondary_index {
     name            = "username-startedAt-index"
@@ -31,6 +36,15 @@ resource "aws_dynamodb_table" "runs" {
     projection_type = "ALL"
   }
 
+  # GSI pour requêtes par status triées par startedAt
+  # (can-start, running, interrupt-all, all) : Query au lieu de Scan
+  global_secondary_index {
+    name            = "status-startedAt-index"
+    hash_key        = "status"
+    range_key       = "startedAt"
+    projection_type = "ALL"
+  }
+
   # GSI pour tri par startedAt (pour /api/runs/all)
   global_secondary_index {
     name            = "startedAt-index"
@@ -62,6 +76,10 @@ resource "aws_dynamodb_table" "sensor_data" {
   hash_key       = "sensorId"
   range_key      = "timestamp"
 
+  # Stream consommé par la Lambda de rollups (agrégats par minute)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   attribute {
     name = "sensorId"
     type = "S"
@@ -102,3 +120,91 @@ resource "aws_dynamodb_table" "sensor_data" {
   )
 }
 
+# Table SensorData v2 (schéma compact)
+# - s = sensorId, t = epoch millisecondes (numérique), attributs courts (v, k, u, r)
+# - items packés optionnels : plusieurs mesures d'un sensor par bucket de temps (listes o / v)
+resource "aws_dynamodb_table" "sensor_data_compact" {
+  name           = "${var.project}-sensor-data-v2-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "s"
+  range_key      = "t"
+
+  # Ancienne image nécessaire pour isoler les mesures ajoutées à un item packé
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
+  attribute {
+    name = "s"
+    type = "S" # sensorId
+  }
+
+  attribute {
+    name = "t"
+    type = "N" # Epoch millisecondes
+  }
+
+  attribute {
+    name = "r"
+    type = "S" # runId
+  }
+
+  # GSI pour requêtes par runId
+  global_secondary_index {
+    name            = "r-t-index"
+    hash_key        = "r"
+    range_key       = "t"
+    projection_type = "ALL"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project}-sensor-data-v2-${var.environment}"
+    }
+  )
+}
+
+# Table SensorRollups : agrégats par minute maintenus depuis le stream SensorData
+# - pk = "RUN#<runId>",       sk = "<minute>#<sensorId>"
+# - pk = "SENSOR#<sensorId>", sk = "<minute>"
+resource "aws_dynamodb_table" "sensor_rollups" {
+  name           = "${var.project}-sensor-rollups-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "pk"
+  range_key      = "sk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
+    type = "S" # Minute ISO8601 (YYYY-MM-DDTHH:MM) pour tri
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project}-sensor-rollups-${var.environment}"
+    }
+  )
+}
@@ -18,3 +18,32 @@ output "sensor_data_table_arn" {
   value       = aws_dynamodb_table.sensor_data.arn
 }
 
+output "sensor_data_stream_arn" {
+  description = "ARN of the SensorData DynamoDB stream"
+  value       = aws_dynamodb_table.sensor_data.stream_arn
+}
+
+output "sensor_data_compact_table_name" {
+  description = "Name of the compact (v2) SensorData DynamoDB table"
+  value       = aws_dynamodb_table.sensor_data_compact.name
+}
+
+output "sensor_data_compact_table_arn" {
+  description = "ARN of the compact (v2) SensorData DynamoDB table"
+  value       = aws_dynamodb_table.sensor_data_compact.arn
+}
+
+output "sensor_data_compact_stream_arn" {
+  description = "ARN of the compact (v2) SensorData DynamoDB stream"
+  value       = aws_dynamodb_table.sensor_data_compact.stream_arn
+}
+
+output "sensor_rollups_table_name" {
+  description = "Name of the SensorRollups DynamoDB table"
+  value       = aws_dynamodb_table.sensor_rollups.name
+}
+
+output "sensor_rollups_table_arn" {
+  description = "ARN of the SensorRollups DynamoDB table"
+  value       = aws_dynamodb_table.sensor_rollups.arn
+}
@@ -1,15 +1,57 @@
 import json
+import base64
 import boto3
+import hashlib
+import heapq
+import hmac
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from json_encoder import dumps
 
 dynamodb = boto3.resource('dynamodb')
 cloudwatch = boto3.client('cloudwatch')
 
 TABLE_NAME = os.environ['RUNS_TABLE_NAME']
 table = dynamodb.Table(TABLE_NAME)
+# Client de la ressource : (dé)sérialise lui-même les types Python (Decimal, dict, ...)
+client = dynamodb.meta.client
+
+# Compteur atomique des runs RUNNING (item dédié dans la table runs)
+# Admission d'un run = 1 écriture transactionnelle conditionnelle, O(1)
+COUNTER_ID = '__running_counter__'
+MAX_CONCURRENT_RUNS = int(os.environ.get('MAX_CONCURRENT_RUNS', '5'))
+
+# Interruption en masse : runs par transaction (max 100) et parallélisme
+INTERRUPT_BATCH_SIZE = min(int(os.environ.get('INTERRUPT_BATCH_SIZE', '25')), 100)
+INTERRUPT_MAX_WORKERS = int(os.environ.get('INTERRUPT_MAX_WORKERS', '8'))
+INTERRUPT_MAX_ATTEMPTS = 3
+# Start/finish concurrents : conflits transactionnels sur le compteur (item unique),
+# rejoués avec backoff aléatoire avant de répondre 503
+TRANSACT_MAX_ATTEMPTS = int(os.environ.get('TRANSACT_MAX_ATTEMPTS', '5'))
+
+# GSI status + startedAt : évite les Scan complets de la table
+STATUS_INDEX = 'status-startedAt-index'
+USERNAME_INDEX = 'username-startedAt-index'
+RUN_STATUSES = ['RUNNING', 'COMPLETED', 'FAILED', 'INTERRUPTED']
+
+# Rétention des runs (TTL DynamoDB, epoch secondes), surchargeable par run via params.retentionDays
+# (la même valeur s'applique aux mesures du run, lue par la Sensor API).
+# Le ttl n'est posé qu'à la fin du run : un run RUNNING supprimé par le TTL
+# laisserait son slot compté dans __running_counter__
+RUN_RETENTION_DAYS = int(os.environ.get('RUN_RETENTION_DAYS', '0'))
+MAX_RETENTION_DAYS = 3650
+
+# Secret de signature des curseurs de pagination (opaques et non falsifiables)
+CURSOR_SECRET = os.environ.get('CURSOR_SECRET', '').encode()
+MAX_PAGE_SIZE = 100
+# Transition : lastKey des anciens clients (clé de Scan en base64) encore acceptée
+ACCEPT_LEGACY_LAST_KEY = os.environ.get('ACCEPT_LEGACY_LAST_KEY', 'true').lower() == 'true'
 
 def lambda_handler(event, context):
     """
@@ -89,67 +131,132 @@ def get_run_by_id(run_id):
     """Récupère un run par son ID (UUID)"""
     result = table.get_item(Key={'id': run_id})
 
-    if 'Item' not in result:
+    if 'Item' not in result or run_id == COUNTER_ID:
         print(f"[RUN-API] Run not found: {run_id}")
         return response(404, {'error': 'Run not found'})
 
-    item = convert_decimals(result['Item'])
+    item = result['Item']
     print(f"[RUN-API] Run retrieved: {run_id} - Status: {item.get('status')}")
     return response(200, item)
 
 
 def get_all_runs():
     """Récupère tous les runs triés par startedAt DESC"""
-    # Scan avec tri en mémoire (pour small datasets)
-    # Pour production avec beaucoup de données, utiliser le GSI startedAt-index
-    result = table.scan()
-    items = result.get('Items', [])
+    # Une Query par status sur le GSI (déjà triée par startedAt DESC),
+    # puis fusion des listes triées
+    per_status = [query_runs_by_status(status) for status in RUN_STATUSES]
+    items = list(heapq.merge(*per_status, key=lambda x: x.get('startedAt', ''), reverse=True))
 
-    # Tri par startedAt décroissant
-    items.sort(key=lambda x: x.get('startedAt', ''), reverse=True)
-
-    items = [convert_decimals(item) for item in items]
     print(f"[RUN-API] Retrieved {len(items)} runs")
     return response(200, items)
 
 
-def list_runs_paginated(query_params):
+def query_runs_by_status(status, **kwargs):
     """
-    Liste paginée des runs
-    Query params:
-    - limit: nombre d'items par page (défaut: 20)
-    - lastKey: clé de pagination (base64 encoded)
+    Query paginée sur le GSI status-startedAt-index (suit LastEvaluatedKey).
+    Retourne les items triés par startedAt DESC.
     """
-    limit = int(query_params.get('limit', 20))
-    last_key = query_params.get('lastKey')
-
-    scan_kwargs = {
-        'Limit': limit
+    query_kwargs = {
+        'IndexName': STATUS_INDEX,
+        'KeyConditionExpression': Key('status').eq(status),
+        'ScanIndexForward': False,
+        **kwargs
     }
+    items = []
+    while True:
+        result = table.query(**query_kwargs)
+        items.extend(result.get('Items', []))
+        if 'LastEvaluatedKey' not in result:
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    return items
+
+
+def count_runs_by_status(status):
+    """Compte les runs d'un status via le GSI (Select=COUNT, paginé)"""
+    query_kwargs = {
+        'IndexName': STATUS_INDEX,
+        'KeyConditionExpression': Key('status').eq(status),
+        'Select': 'COUNT'
+    }
+    count = 0
+    while True:
+        result = table.query(**query_kwargs)
+        count += result.get('Count', 0)
+        if 'LastEvaluatedKey' not in result:
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    return count
 
-    if last_key:
-        # Décoder la clé de pagination
-        import base64
-        scan_kwargs['ExclusiveStartKey'] = json.loads(base64.b64decode(last_key))
 
-    result = table.scan(**scan_kwargs)
-    items = result.get('Items', [])
+def list_runs_paginated(query_params):
+    """
+    Liste paginée des runs, du plus récent au plus ancien
+    Query params:
+    - limit: nombre d'items par page (défaut: 20, max: 100)
+    - cursor (ou lastKey): curseur opaque signé renvoyé par la page précédente
+      (lastKey au format historique accepté tant que ACCEPT_LEGACY_LAST_KEY est actif)
+    - username: filtre optionnel (GSI username-startedAt-index)
+    - status: filtre optionnel (GSI status-startedAt-index)
 
-    # Tri par startedAt décroissant
-    items.sort(key=lambda x: x.get('startedAt', ''), reverse=True)
+    Chaque page coûte O(limit) lectures, quelle que soit la taille de la table.
+    """
+    try:
+        limit = max(1, min(int(query_params.get('limit', 20)), MAX_PAGE_SIZE))
+    except ValueError:
+        return response(400, {'error': 'limit must be an integer'})
+
+    username = query_params.get('username') or None
+    status = (query_params.get('status') or '').upper() or None
+    if status and status not in RUN_STATUSES:
+        return response(400, {'error': f'Invalid status (allowed: {", ".join(RUN_STATUSES)})'})
+
+    token = query_params.get('cursor') or query_params.get('lastKey')
+    position = None
+    if token:
+        cursor = decode_cursor(token)
+        if cursor is None and not query_params.get('cursor') and ACCEPT_LEGACY_LAST_KEY:
+            position = legacy_position(token)
+            if position is None:
+                return response(400, {'error': 'Invalid pagination cursor'})
+        elif cursor is None or cursor.get('u') != username or cursor.get('st') != status:
+            return response(400, {'error': 'Invalid pagination cursor'})
+        else:
+            position = (cursor['s'], cursor['i'])
+
+    if username:
+        # Une seule partition : username, filtrée éventuellement par status
+        extra = {'FilterExpression': Attr('status').eq(status)} if status else {}
+        partitions = [fetch_runs_page(USERNAME_INDEX, Key('username').eq(username), position, limit, extra)]
+    elif status:
+        partitions = [fetch_runs_page(STATUS_INDEX, Key('status').eq(status), position, limit)]
+    else:
+        # Pas de filtre : fusion des partitions status (chacune déjà triée)
+        partitions = [
+            fetch_runs_page(STATUS_INDEX, Key('status').eq(s), position, limit)
+            for s in RUN_STATUSES
+        ]
 
-    items = [convert_decimals(item) for item in items]
+    candidates = list(heapq.merge(*[items for items, _ in partitions], key=run_sort_key, reverse=True))
+    items = candidates[:limit]
+    has_more = len(candidates) > limit or any(more for _, more in partitions)
 
     response_data = {
         'items': items,
         'count': len(items)
     }
 
-    # Ajouter la clé de pagination si présente
-    if 'LastEvaluatedKey' in result:
-        import base64
-        next_key = base64.b64encode(json.dumps(result['LastEvaluatedKey']).encode()).decode()
-        response_data['nextKey'] = next_key
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor({
+            's': last.get('startedAt', ''),
+            'i': last['id'],
+            'u': username,
+            'st': status
+        })
+        response_data['nextCursor'] = next_cursor
+        if ACCEPT_LEGACY_LAST_KEY:
+            response_data['nextKey'] = next_cursor  # Anciens clients : renvoyé tel quel en lastKey
         print(f"[RUN-API] Paginated response: {len(items)} items, has next page")
     else:
         print(f"[RUN-API] Paginated response: {len(items)} items, last page")
@@ -157,38 +264,113 @@ def list_runs_paginated(query_params):
     return response(200, response_data)
 
 
+def legacy_position(token):
+    """
+    lastKey historique (LastEvaluatedKey d'un Scan, {"id": ...} en base64) -> position
+    (startedAt, id) du run correspondant ; la page suivante reprend après ce run.
+    None si la clé ne se décode pas ou si le run n'existe plus.
+    """
+    try:
+        key = json.loads(base64.b64decode(token, validate=True))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(key, dict) or not isinstance(key.get('id'), str) or key['id'] == COUNTER_ID:
+        return None
+    item = table.get_item(Key={'id': key['id']}).get('Item')
+    if item is None:
+        return None
+    print(f"[RUN-API] Legacy lastKey used (run {key['id']})")
+    return run_sort_key(item)
+
+
+def fetch_runs_page(index_name, key_condition, position, limit, extra=None):
+    """
+    Lit au plus `limit` runs d'une partition de GSI, du plus récent au plus ancien,
+    strictement après `position` (startedAt, id).
+    Retourne (items, has_more).
+    """
+    condition = key_condition
+    if position:
+        condition = key_condition & Key('startedAt').lte(position[0])
+
+    query_kwargs = {
+        'IndexName': index_name,
+        'KeyConditionExpression': condition,
+        'ScanIndexForward': False,
+        'Limit': limit + 1,
+        **(extra or {})
+    }
+
+    items = []
+    while True:
+        result = table.query(**query_kwargs)
+        for item in result.get('Items', []):
+            # Ex aequo sur startedAt : on exclut ceux déjà servis (ordre par id décroissant)
+            if position and run_sort_key(item) >= position:
+                continue
+            items.append(item)
+
+        exhausted = 'LastEvaluatedKey' not in result
+        if exhausted:
+            break
+        # Continuer tant que les ex aequo du dernier startedAt de la page ne sont pas tous lus
+        if len(items) > limit and items[-1].get('startedAt', '') < items[limit - 1].get('startedAt', ''):
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+    # L'index ne trie que sur startedAt : départager les ex aequo par id
+    items.sort(key=run_sort_key, reverse=True)
+    return items[:limit], len(items) > limit or not exhausted
+
+
+def run_sort_key(item):
+    """Clé de tri totale des runs : (startedAt, id)"""
+    return (item.get('startedAt', ''), item.get('id', ''))
+
+
+def encode_cursor(payload):
+    """Encode un curseur opaque signé (HMAC-SHA256)"""
+    data = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+    signature = hmac.new(CURSOR_SECRET, data.encode(), hashlib.sha256).digest()
+    return f"{data}.{base64.urlsafe_b64encode(signature).decode().rstrip('=')}"
+
+
+def decode_cursor(token):
+    """Vérifie la signature et décode un curseur, retourne None s'il est invalide"""
+    try:
+        data, signature = token.split('.', 1)
+        expected = base64.urlsafe_b64encode(
+            hmac.new(CURSOR_SECRET, data.encode(), hashlib.sha256).digest()
+        ).decode().rstrip('=')
+        if not hmac.compare_digest(signature, expected):
+            return None
+        payload = json.loads(base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)))
+        if not isinstance(payload, dict) or 's' not in payload or 'i' not in payload:
+            return None
+        return payload
+    except Exception:
+        return None
+
+
 def can_start_simulation(event):
     """
     GET /api/runs/can-start
     Vérifie si on peut démarrer une nouvelle simulation
-    Limite: 5 runs en cours maximum GLOBAUX (tous utilisateurs confondus)
+    Limite: MAX_CONCURRENT_RUNS runs en cours maximum GLOBAUX (tous utilisateurs confondus)
     """
     print(f"[RUN-API] can-start: Checking global running simulations")
 
-    # Compter TOUS les runs en cours (tous utilisateurs)
+    # Lecture O(1) du compteur de runs en cours (tous utilisateurs)
     try:
-        result = table.scan(
-            FilterExpression=Attr('status').eq('RUNNING')
-        )
-
-        items = result.get('Items', [])
-        running_count = len(items)
-
+        running_count = get_running_count()
         print(f"[RUN-API] can-start: Found {running_count} RUNNING items (ALL users)")
 
-        # Log les IDs des runs trouvés pour debug
-        if running_count > 0:
-            run_ids = [item.get('id', 'no-id') for item in items]
-            users = [item.get('username', 'no-user') for item in items]
-            print(f"[RUN-API] can-start: Running run IDs: {run_ids}")
-            print(f"[RUN-API] can-start: Users: {users}")
-
     except Exception as e:
-        print(f"[RUN-API] can-start: ERROR scanning DynamoDB: {str(e)}")
+        print(f"[RUN-API] can-start: ERROR reading running counter: {str(e)}")
         # En cas d'erreur, on retourne une réponse safe
         running_count = 0
 
-    max_concurrent_runs = 5  # Limite GLOBALE (Spring Boot par défaut: 5)
+    max_concurrent_runs = MAX_CONCURRENT_RUNS  # Limite GLOBALE (Spring Boot par défaut: 5)
     can_start = running_count < max_concurrent_runs
     available = max(0, max_concurrent_runs - running_count)
 
@@ -203,6 +385,264 @@ def can_start_simulation(event):
     })
 
 
+def get_running_count():
+    """Lit le compteur de runs RUNNING (initialisé depuis le GSI s'il n'existe pas)"""
+    result = table.get_item(Key={'id': COUNTER_ID}, ConsistentRead=True)
+    if 'Item' in result:
+        return int(result['Item'].get('runningCount', 0))
+    return init_running_counter()
+
+
+def init_running_counter():
+    """Crée le compteur à partir du nombre réel de runs RUNNING (une seule fois)"""
+    running_count = count_runs_by_status('RUNNING')
+    try:
+        table.put_item(
+            Item={'id': COUNTER_ID, 'runningCount': running_count},
+            ConditionExpression='attribute_not_exists(id)'
+        )
+        print(f"[RUN-API] Running counter initialized: {running_count}")
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # Un autre appel l'a initialisé entre-temps
+        result = table.get_item(Key={'id': COUNTER_ID}, ConsistentRead=True)
+        running_count = int(result.get('Item', {}).get('runningCount', running_count))
+    return running_count
+
+
+def to_dynamodb(values):
+    """Prépare un dict Python pour DynamoDB (float -> Decimal, non acceptés par boto3)"""
+    return json.loads(json.dumps(values), parse_float=Decimal)
+
+
+def counter_update(delta):
+    """Élément de transaction qui ajuste le compteur de runs RUNNING de `delta`"""
+    update = {
+        'TableName': TABLE_NAME,
+        'Key': to_dynamodb({'id': COUNTER_ID}),
+        'UpdateExpression': 'ADD runningCount :delta',
+        'ExpressionAttributeValues': to_dynamodb({':delta': delta})
+    }
+    if delta > 0:
+        update['ConditionExpression'] = 'runningCount <= :limit'
+        update['ExpressionAttributeValues'].update(to_dynamodb({':limit': MAX_CONCURRENT_RUNS - delta}))
+    else:
+        update['ConditionExpression'] = 'runningCount >= :needed'
+        update['ExpressionAttributeValues'].update(to_dynamodb({':needed': -delta}))
+    return {'Update': update}
+
+
+def cancellation_codes(error):
+    """Codes d'annulation d'une TransactionCanceledException (un par élément)"""
+    return [reason.get('Code') for reason in error.response.get('CancellationReasons', [])]
+
+
+def is_transaction_cancelled(error):
+    return error.response['Error']['Code'] == 'TransactionCanceledException'
+
+
+def is_transaction_conflict(error):
+    """Transaction annulée uniquement par une écriture concurrente (aucune condition en échec)"""
+    if not is_transaction_cancelled(error):
+        return False
+    codes = cancellation_codes(error)
+    return 'TransactionConflict' in codes and 'ConditionalCheckFailed' not in codes
+
+
+def conflict_backoff(attempt):
+    """Backoff exponentiel avec jitter complet entre deux essais d'une transaction en conflit"""
+    time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+class TransactionBusy(Exception):
+    """Conflits transactionnels persistants sur le compteur : à réessayer côté client (503)"""
+
+
+def transact_write(transact_items):
+    """
+    TransactWriteItems rejouée sur TransactionConflict (start/finish concurrents
+    sur __running_counter__). Les autres erreurs sont propagées ;
+    TransactionBusy une fois les essais épuisés.
+    """
+    for attempt in range(TRANSACT_MAX_ATTEMPTS):
+        try:
+            client.transact_write_items(TransactItems=transact_items)
+            return
+        except ClientError as e:
+            if not is_transaction_conflict(e):
+                raise
+            print(f"[RUN-API] Transaction conflict (attempt {attempt + 1}/{TRANSACT_MAX_ATTEMPTS})")
+            if attempt < TRANSACT_MAX_ATTEMPTS - 1:
+                conflict_backoff(attempt)
+    raise TransactionBusy()
+
+
+def busy_response():
+    return response(503, {'error': 'Too many concurrent run updates, retry later'})
+
+
+def running_run_update(run_id, update_expression, expression_names, expression_values):
+    """Élément de transaction qui met à jour un run à condition qu'il soit RUNNING"""
+    return {
+        'Update': {
+            'TableName': TABLE_NAME,
+            'Key': to_dynamodb({'id': run_id}),
+            'UpdateExpression': update_expression,
+            'ConditionExpression': '#s = :running',
+            'ExpressionAttributeNames': expression_names,
+            'ExpressionAttributeValues': to_dynamodb({**expression_values, ':running': 'RUNNING'})
+        }
+    }
+
+
+def update_running_run(run_id, update_expression, expression_names, expression_values):
+    """
+    Met à jour un run (condition: status = RUNNING) et décrémente le compteur
+    dans la même transaction. Retourne False si le run n'est plus RUNNING,
+    lève TransactionBusy si les conflits persistent.
+    """
+    run_update = running_run_update(run_id, update_expression, expression_names, expression_values)
+
+    try:
+        transact_write([run_update, counter_update(-1)])
+        return True
+    except ClientError as e:
+        if not is_transaction_cancelled(e):
+            raise
+        codes = cancellation_codes(e)
+        if codes[:1] == ['ConditionalCheckFailed']:
+            return False
+        if codes[1:2] != ['ConditionalCheckFailed']:
+            raise
+
+    # Compteur absent ou désynchronisé : mettre à jour le run seul
+    print(f"[RUN-API] Running counter out of sync, updating run {run_id} without counter")
+    try:
+        client.update_item(**run_update['Update'])
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def interrupt_update(run_id, finished_at, ttl):
+    """Élément de transaction qui interrompt un run RUNNING (et pose son ttl)"""
+    update_expression = 'SET #s = :status, finishedAt = :finished_at, errorMessage = :error_msg'
+    expression_names = {'#s': 'status'}
+    expression_values = {
+        ':status': 'INTERRUPTED',
+        ':finished_at': finished_at,
+        ':error_msg': 'Interrupted by user'
+    }
+    if ttl:
+        update_expression += ', #ttl = :ttl'
+        expression_names['#ttl'] = 'ttl'
+        expression_values[':ttl'] = ttl
+    return running_run_update(run_id, update_expression, expression_names, expression_values)
+
+
+def interrupt_runs_batch(run_ids, finished_at, ttls):
+    """
+    Interrompt un lot de runs dans une seule TransactWriteItems
+    (une mise à jour conditionnelle status = RUNNING par run).
+    Les runs déjà terminés sont retirés du lot et la transaction est rejouée.
+    ttls : {run_id: ttl ou None}.
+    Retourne {run_id: 'INTERRUPTED' | 'NOT_RUNNING' | 'FAILED'}.
+    """
+    outcomes = {}
+    pending = list(run_ids)
+
+    for attempt in range(INTERRUPT_MAX_ATTEMPTS):
+        if not pending:
+            return outcomes
+
+        transact_items = [interrupt_update(run_id, finished_at, ttls.get(run_id)) for run_id in pending]
+
+        try:
+            client.transact_write_items(TransactItems=transact_items)
+            outcomes.update({run_id: 'INTERRUPTED' for run_id in pending})
+            return outcomes
+        except ClientError as e:
+            if not is_transaction_cancelled(e):
+                print(f"[RUN-API] ERROR - Interrupt batch failed: {str(e)}")
+                break
+
+            # Runs terminés entre-temps : les retirer du lot
+            codes = cancellation_codes(e)
+            finished = {run_id for run_id, code in zip(pending, codes) if code == 'ConditionalCheckFailed'}
+            outcomes.update({run_id: 'NOT_RUNNING' for run_id in finished})
+            pending = [run_id for run_id in pending if run_id not in finished]
+
+            # Conflit transactionnel : backoff avant de rejouer
+            if not finished:
+                conflict_backoff(attempt)
+
+    # Repli : mise à jour individuelle des runs restants
+    for run_id in pending:
+        try:
+            update = interrupt_update(run_id, finished_at, ttls.get(run_id))
+            client.update_item(**update['Update'])
+            outcomes[run_id] = 'INTERRUPTED'
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                outcomes[run_id] = 'NOT_RUNNING'
+            else:
+                print(f"[RUN-API] ERROR - Failed to interrupt run {run_id}: {str(e)}")
+                outcomes[run_id] = 'FAILED'
+
+    return outcomes
+
+
+def run_ttl(run):
+    """ttl (epoch secondes) d'un run qui se termine maintenant, None sans rétention"""
+    days = int(run.get('retentionDays') or RUN_RETENTION_DAYS)
+    if days <= 0:
+        return None
+    return int(time.time()) + days * 86400
+
+
+def release_running_slots(count):
+    """
+    Décrémente le compteur de `count` en une seule écriture atomique.
+    Compteur inférieur à `count` (désynchronisé) : ramené à max(0, valeur - count)
+    par une écriture conditionnée à la valeur lue, sans recomptage depuis le GSI
+    (éventuellement cohérent) qui écraserait les start/finish concurrents.
+    Compteur absent : rien à faire, il sera initialisé depuis le GSI au prochain start.
+    """
+    if count <= 0:
+        return
+    try:
+        client.update_item(**counter_update(-count)['Update'])
+        return
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+    for attempt in range(TRANSACT_MAX_ATTEMPTS):
+        result = table.get_item(Key={'id': COUNTER_ID}, ConsistentRead=True)
+        current = result.get('Item', {}).get('runningCount')
+        if current is None:
+            return
+        clamped = max(0, int(current) - count)
+        try:
+            table.update_item(
+                Key={'id': COUNTER_ID},
+                UpdateExpression='SET runningCount = :clamped',
+                ConditionExpression='runningCount = :current',
+                ExpressionAttributeValues={':clamped': clamped, ':current': current}
+            )
+            print(f"[RUN-API] Running counter out of sync, clamped from {current} to {clamped}")
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            conflict_backoff(attempt)
+
+    print(f"[RUN-API] ERROR - Running counter changed during {TRANSACT_MAX_ATTEMPTS} clamp attempts, not released")
+
+
 def start_run(event):
     """
     POST /api/runs/start
@@ -219,18 +659,6 @@ def start_run(event):
     except json.JSONDecodeError:
         return response(400, {'error': 'Invalid JSON body'})
 
-    # Vérifier si l'utilisateur peut démarrer une nouvelle simulation
-    can_start_response = can_start_simulation(event)
-    can_start_data = json.loads(can_start_response['body'])
-
-    if not can_start_data['canStart']:
-        print(f"[RUN-API] User '{user}' cannot start simulation (limit reached)")
-        return response(400, {
-            'error': 'Maximum concurrent runs reached',
-            'currentRunning': can_start_data['currentRunning'],
-            'maxAllowed': can_start_data['maxAllowed']
-        })
-
     # Générer un ID unique pour le run
     import uuid
     run_id = str(uuid.uuid4())
@@ -243,6 +671,11 @@ def start_run(event):
     duration = params.get('duration', 60)  # Défaut: 60 secondes
     interval = params.get('interval', 5)   # Défaut: 5 secondes
 
+    retention_days = params.get('retentionDays')
+    if retention_days is not None:
+        if not isinstance(retention_days, int) or isinstance(retention_days, bool) or not 1 <= retention_days <= MAX_RETENTION_DAYS:
+            return response(400, {'error': f'retentionDays must be an integer between 1 and {MAX_RETENTION_DAYS}'})
+
     print(f"[RUN-API] Body received: {json.dumps(body)}")
     print(f"[RUN-API] Extracted params: duration={duration}, interval={interval}")
 
@@ -260,11 +693,47 @@ def start_run(event):
         'grafanaUrl': f'{grafana_base_url}/d/iot-serverless-cloudwatch/iot-serverless-sensor-monitoring-cloudwatch?orgId=1&from=now-3h&to=now&refresh=5s&var-SensorId=All&var-User=All&var-RunId={run_id}'
     }
 
-    table.put_item(Item=item)
+    if retention_days is not None:
+        item['retentionDays'] = retention_days
+
+    # Admission atomique : incrément conditionnel du compteur + création du run
+    transact_items = [
+        counter_update(1),
+        {
+            'Put': {
+                'TableName': TABLE_NAME,
+                'Item': to_dynamodb(item),
+                'ConditionExpression': 'attribute_not_exists(id)'
+            }
+        }
+    ]
+
+    for attempt in range(2):
+        try:
+            transact_write(transact_items)
+            break
+        except TransactionBusy:
+            print(f"[RUN-API] Run start for user '{user}' aborted after repeated transaction conflicts")
+            return busy_response()
+        except ClientError as e:
+            if not is_transaction_cancelled(e) or cancellation_codes(e)[:1] != ['ConditionalCheckFailed']:
+                raise
+
+            # Compteur absent : l'initialiser puis réessayer une fois
+            running_count = get_running_count()
+            if attempt == 0 and running_count < MAX_CONCURRENT_RUNS:
+                continue
+
+            print(f"[RUN-API] User '{user}' cannot start simulation (limit reached)")
+            return response(400, {
+                'error': 'Maximum concurrent runs reached',
+                'currentRunning': running_count,
+                'maxAllowed': MAX_CONCURRENT_RUNS
+            })
 
     print(f"[RUN-API] Run started: {run_id} by user '{user}' (duration={duration}s, interval={interval}s)")
 
-    return response(201, convert_decimals(item))
+    return response(201, item)
 
 
 def finish_run(run_id, event):
@@ -278,7 +747,7 @@ def finish_run(run_id, event):
     # Vérifier si le run existe
     result = table.get_item(Key={'id': run_id})
 
-    if 'Item' not in result:
+    if 'Item' not in result or run_id == COUNTER_ID:
         print(f"[RUN-API] Run not found: {run_id}")
         return response(404, {'error': 'Run not found'})
 
@@ -311,20 +780,27 @@ def finish_run(run_id, event):
         update_expression += ', errorMessage = :error_message'
         expression_values[':error_message'] = error_message
 
-    table.update_item(
-        Key={'id': run_id},
-        UpdateExpression=update_expression,
-        ExpressionAttributeNames=expression_names,
-        ExpressionAttributeValues=expression_values
-    )
+    ttl = run_ttl(run)
+    if ttl:
+        update_expression += ', #ttl = :ttl'
+        expression_names['#ttl'] = 'ttl'
+        expression_values[':ttl'] = ttl
+
+    # Mise à jour conditionnelle + décrément du compteur (transaction)
+    try:
+        updated = update_running_run(run_id, update_expression, expression_names, expression_values)
+    except TransactionBusy:
+        print(f"[RUN-API] Run finish aborted after repeated transaction conflicts: {run_id}")
+        return busy_response()
+    if not updated:
+        print(f"[RUN-API] Run already finished: {run_id}")
+        return response(400, {'error': 'Run is not running'})
 
     print(f"[RUN-API] Run finished: {run_id} - Status: {'FAILED' if error_message else 'COMPLETED'}")
 
     # Récupérer le run mis à jour
     updated_result = table.get_item(Key={'id': run_id})
-    updated_item = convert_decimals(updated_result['Item'])
-
-    return response(200, updated_item)
+    return response(200, updated_result['Item'])
 
 
 def get_running_simulations(event):
@@ -334,17 +810,8 @@ def get_running_simulations(event):
     """
     print(f"[RUN-API] Fetching running simulations (ALL users)")
 
-    # Scanner pour récupérer TOUS les runs RUNNING
-    result = table.scan(
-        FilterExpression=Attr('status').eq('RUNNING')
-    )
-
-    items = result.get('Items', [])
-
-    # Tri par startedAt décroissant
-    items.sort(key=lambda x: x.get('startedAt', ''), reverse=True)
-
-    items = [convert_decimals(item) for item in items]
+    # Query sur le GSI status (déjà trié par startedAt décroissant)
+    items = query_runs_by_status('RUNNING')
 
     print(f"[RUN-API] Found {len(items)} running simulations (ALL users)")
 
@@ -360,14 +827,11 @@ def interrupt_all_runs(event):
 
     # Récupérer TOUS les runs RUNNING (tous utilisateurs)
     try:
-        result = table.scan(
-            FilterExpression=Attr('status').eq('RUNNING')
-        )
+        items = query_runs_by_status('RUNNING')
     except Exception as e:
-        print(f"[RUN-API] Error scanning for running simulations: {str(e)}")
+        print(f"[RUN-API] Error querying running simulations: {str(e)}")
         return response(500, {'error': 'Failed to fetch running simulations'})
 
-    items = result.get('Items', [])
     print(f"[RUN-API] Found {len(items)} running simulations to interrupt (ALL users)")
 
     if len(items) == 0:
@@ -377,52 +841,52 @@ def interrupt_all_runs(event):
             'message': 'No running simulations to interrupt'
         })
 
-    interrupted_count = 0
-    failed_count = 0
     finished_at = datetime.utcnow().isoformat() + 'Z'
+    run_ids = [item['id'] for item in items]
+    usernames = {item['id']: item.get('username', 'unknown') for item in items}
+    ttls = {item['id']: run_ttl(item) for item in items}
+
+    # Lots de INTERRUPT_BATCH_SIZE runs traités en parallèle (pool borné).
+    # Le compteur n'est pas dans les transactions (item unique = conflits entre lots) :
+    # il est décrémenté une seule fois, de façon atomique, après l'interruption.
+    batches = [run_ids[i:i + INTERRUPT_BATCH_SIZE] for i in range(0, len(run_ids), INTERRUPT_BATCH_SIZE)]
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(INTERRUPT_MAX_WORKERS, len(batches)))) as executor:
+        for batch_outcomes in executor.map(lambda batch: interrupt_runs_batch(batch, finished_at, ttls), batches):
+            outcomes.update(batch_outcomes)
+
+    results = []
+    for run_id in run_ids:
+        outcome = outcomes.get(run_id, 'FAILED')
+        results.append({'id': run_id, 'username': usernames[run_id], 'status': outcome})
+        if outcome == 'INTERRUPTED':
+            print(f"[RUN-API] Successfully interrupted run: {run_id} (user: {usernames[run_id]})")
+        elif outcome == 'NOT_RUNNING':
+            print(f"[RUN-API] Run already finished, skipped: {run_id}")
+        else:
+            print(f"[RUN-API] ERROR - Failed to interrupt run {run_id}")
 
-    # Terminer chaque run avec status INTERRUPTED
-    for item in items:
-        run_id = item['id']
-        username = item.get('username', 'unknown')
-        try:
-            table.update_item(
-                Key={'id': run_id},
-                UpdateExpression='SET #s = :status, finishedAt = :finished_at, errorMessage = :error_msg',
-                ExpressionAttributeNames={'#s': 'status'},
-                ExpressionAttributeValues={
-                    ':status': 'INTERRUPTED',
-                    ':finished_at': finished_at,
-                    ':error_msg': 'Interrupted by user'
-                }
-            )
-            interrupted_count += 1
-            print(f"[RUN-API] Successfully interrupted run: {run_id} (user: {username})")
-        except Exception as e:
-            failed_count += 1
-            print(f"[RUN-API] ERROR - Failed to interrupt run {run_id}: {str(e)}")
+    interrupted_count = sum(1 for r in results if r['status'] == 'INTERRUPTED')
+    failed_count = sum(1 for r in results if r['status'] == 'FAILED')
+    skipped_count = len(results) - interrupted_count - failed_count
+
+    try:
+        release_running_slots(interrupted_count)
+    except Exception as e:
+        print(f"[RUN-API] ERROR - Failed to update running counter: {str(e)}")
 
-    print(f"[RUN-API] Interrupted {interrupted_count}/{len(items)} runs (ALL users) (failed: {failed_count})")
+    print(f"[RUN-API] Interrupted {interrupted_count}/{len(items)} runs (ALL users) (failed: {failed_count}, skipped: {skipped_count})")
 
-    # Retourner la réponse (match Spring Boot)
+    # Retourner la réponse (match Spring Boot) + résultat par run
     return response(200, {
         'interrupted': interrupted_count,
-        'message': f'{interrupted_count} simulation(s) interrupted'
+        'failed': failed_count,
+        'skipped': skipped_count,
+        'message': f'{interrupted_count} simulation(s) interrupted',
+        'results': results
     })
 
 
-def convert_decimals(obj):
-    """Convertit les Decimal de DynamoDB en float pour JSON"""
-    if isinstance(obj, list):
-        return [convert_decimals(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj) if obj % 1 else int(obj)
-    else:
-        return obj
-
-
 def response(status_code, body):
     """Retourne une réponse HTTP avec CORS"""
     return {
@@ -433,6 +897,6 @@ def response(status_code, body):
             'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-User,X-Run-Id',
             'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
         },
-        'body': json.dumps(body, default=str)
+        'body': dumps(body)
     }
 
@@ -2,10 +2,31 @@
 # Lambda Function pour Run API
 # ===========================
 
+# Secret de signature des curseurs de pagination (GET /api/runs)
+resource "random_password" "cursor_secret" {
+  length  = 32
+  special = false
+}
+
+# Sources de la Lambda + module partagé serverless/shared (encodeur JSON)
+locals {
+  lambda_sources = merge(
+    { for f in fileset("${path.module}/files", "*.{py,txt}") : f => "${path.module}/files/${f}" },
+    { "json_encoder.py" = "${path.module}/../shared/json_encoder.py" }
+  )
+}
+
 data "archive_file" "lambda_run_api" {
   type        = "zip"
-  source_dir  = "${path.module}/files"
   output_path = "${path.module}/lambda_run_api.zip"
+
+  dynamic "source" {
+    for_each = local.lambda_sources
+    content {
+      content  = file(source.value)
+      filename = source.key
+    }
+  }
 }
 
 resource "aws_lambda_function" "run_api" {
@@ -23,6 +44,16 @@ resource "aws_lambda_function" "run_api" {
       RUNS_TABLE_NAME = var.runs_table_name
       ENVIRONMENT     = var.environment
       GRAFANA_URL     = var.grafana_url
+      CURSOR_SECRET   = random_password.cursor_secret.result
+
+      # Transition : lastKey historique accepté et nextKey renvoyé
+      ACCEPT_LEGACY_LAST_KEY = tostring(var.accept_legacy_last_key)
+
+      # Limite globale de runs simultanés (compteur atomique)
+      MAX_CONCURRENT_RUNS = tostring(var.max_concurrent_runs)
+
+      # Rétention par défaut des runs (TTL DynamoDB)
+      RUN_RETENTION_DAYS = tostring(var.run_retention_days)
     }
   }
 
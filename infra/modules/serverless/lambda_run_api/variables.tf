@@ -28,6 +28,24 @@ variable "grafana_url" {
   type        = string
 }
 
+variable "max_concurrent_runs" {
+  description = "Maximum number of RUNNING simulations allowed globally (all users)"
+  type        = number
+  default     = 5
+}
+
+variable "accept_legacy_last_key" {
+  description = "Transition for old clients: accept the historical base64 lastKey (Scan key) and return nextKey. Disable once all clients send cursor"
+  type        = bool
+  default     = true
+}
+
+variable "run_retention_days" {
+  description = "Default retention of runs in days, stamped as DynamoDB TTL when the run finishes (0 = keep forever). Overridden by params.retentionDays. Opt-in: expired runs are deleted"
+  type        = number
+  default     = 0
+}
+
 variable "tags" {
   description = "Common tags to apply to all resources"
   type        = map(string)
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+
+# Schéma compact (v2) de la table SensorData :
+#   s = sensorId (clé de partition)
+#   t = timestamp epoch millisecondes (clé de tri numérique)
+#   v = reading, k = type, u = user, r = runId
+#   q = sequence, i = idempotencyKey (mesures horodatées par le client)
+# Item "packé" (plusieurs mesures d'un sensor dans un bucket de temps) :
+#   t = début du bucket + numéro de slot, b = taille du bucket (ms),
+#   o = liste des offsets (ms depuis t, >= -slot), v = liste des readings,
+#   i = ensemble des idempotencyKey déjà ajoutées à l'item
+# Un item plein (max_readings mesures, limite de 400 Ko d'un item DynamoDB)
+# est complété par l'item du slot suivant (t + 1 ms, t + 2 ms, ...)
+
+_EPOCH = datetime(1970, 1, 1)
+# Format unique des timestamps string (clé de tri v1, réponses) : microsecondes
+# toujours présentes, pour que l'ordre lexicographique soit l'ordre chronologique
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def to_epoch_ms(timestamp):
+    """Timestamp ISO8601 (ou datetime naïf UTC) -> epoch millisecondes"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - _EPOCH) // timedelta(milliseconds=1)
+
+
+def to_iso(epoch_ms):
+    """Epoch millisecondes -> timestamp ISO8601 au format du schéma v1 (microsecondes + Z)"""
+    return (_EPOCH + timedelta(milliseconds=epoch_ms)).strftime(ISO_FORMAT)
+
+
+def compact_item(item):
+    """Item v1 (sensorId, timestamp ISO, ...) -> item compact v2 non packé"""
+    compact = {
+        's': item['sensorId'],
+        't': to_epoch_ms(item['timestamp']),
+        'v': item['reading'],
+        'k': item['type'],
+        'u': item['user'],
+        'r': item['runId']
+    }
+    for name, short in (('sequence', 'q'), ('idempotencyKey', 'i'), ('ttl', 'ttl')):
+        if name in item:
+            compact[short] = item[name]
+    return compact
+
+
+def packed_update(group, bucket_ms, max_readings, slot=0):
+    """
+    Paramètres UpdateItem qui ajoutent un groupe de mesures (même sensor,
+    même bucket, même type/user/runId) à l'item packé du slot du bucket.
+    La condition refuse de mélanger deux runs (ou types) dans un même item,
+    de dépasser max_readings mesures par item, et d'ajouter une mesure dont
+    l'idempotencyKey est déjà dans l'item.
+    """
+    first = group[0]
+    bucket_start = to_epoch_ms(first['timestamp']) // bucket_ms * bucket_ms
+    item_start = bucket_start + slot
+    update = {
+        'Key': {'s': first['sensorId'], 't': item_start},
+        'UpdateExpression': (
+            'SET #k = if_not_exists(#k, :k), #u = if_not_exists(#u, :u), #r = if_not_exists(#r, :r), '
+            '#b = if_not_exists(#b, :b), #o = list_append(if_not_exists(#o, :empty), :o), '
+            '#v = list_append(if_not_exists(#v, :empty), :v)'
+        ),
+        'ConditionExpression': 'attribute_not_exists(#t) OR (#r = :r AND #k = :k AND #u = :u AND size(#o) <= :room)',
+        'ExpressionAttributeNames': {
+            '#t': 't', '#k': 'k', '#u': 'u', '#r': 'r', '#b': 'b', '#o': 'o', '#v': 'v'
+        },
+        'ExpressionAttributeValues': {
+            ':k': first['type'],
+            ':u': first['user'],
+            ':r': first['runId'],
+            ':b': bucket_ms,
+            ':room': max_readings - len(group),
+            ':empty': [],
+            ':o': [to_epoch_ms(item['timestamp']) - item_start for item in group],
+            ':v': [item['reading'] for item in group]
+        }
+    }
+    # TTL repoussé à chaque ajout : l'item expire avec sa mesure la plus récente
+    if 'ttl' in first:
+        update['UpdateExpression'] += ', #ttl = :ttl'
+        update['ExpressionAttributeNames']['#ttl'] = 'ttl'
+        update['ExpressionAttributeValues'][':ttl'] = first['ttl']
+    # Idempotence : les clés du groupe rejoignent l'ensemble i du bucket
+    keys = [item['idempotencyKey'] for item in group if 'idempotencyKey' in item]
+    if keys:
+        update['UpdateExpression'] += ' ADD #i :i'
+        update['ConditionExpression'] = f"({update['ConditionExpression']})" + ''.join(
+            f" AND NOT contains(#i, :i{index})" for index in range(len(keys))
+        )
+        update['ExpressionAttributeNames']['#i'] = 'i'
+        update['ExpressionAttributeValues'][':i'] = set(keys)
+        update['ExpressionAttributeValues'].update({f":i{index}": key for index, key in enumerate(keys)})
+    return update
+
+
+def expand_item(item, ts_from=None, ts_to=None, newest_first=False):
+    """
+    Item compact v2 (décodé, packé ou non) -> liste de mesures au format v1.
+    ts_from / ts_to (epoch ms, inclus) filtrent les mesures d'un item packé.
+    """
+    base = {'sensorId': item['s'], 'type': item.get('k'), 'user': item.get('u'), 'runId': item.get('r')}
+
+    if 'o' not in item:
+        reading = {**base, 'timestamp': to_iso(int(item['t'])), 'reading': item['v']}
+        if 'q' in item:
+            reading['sequence'] = item['q']
+        return [reading]
+
+    start = int(item['t'])
+    readings = []
+    for offset, value in zip(item['o'], item['v']):
+        epoch_ms = start + int(offset)
+        if (ts_from is None or epoch_ms >= ts_from) and (ts_to is None or epoch_ms <= ts_to):
+            readings.append({**base, 'timestamp': to_iso(epoch_ms), 'reading': value})
+    readings.sort(key=lambda r: r['timestamp'], reverse=newest_first)
+    return readings
@@ -0,0 +1,55 @@
+from handler import metrics, publish_batch_metrics, write_sensor_items
+from ingest_queue import decode_message
+
+
+def lambda_handler(event, context):
+    """
+    Consommateur de la file d'ingestion SQS (mode INGEST_MODE=async).
+    Les mesures de tous les messages reçus sont écrites ensemble, toutes par
+    écritures conditionnelles idempotentes : un message partiellement écrit puis
+    rejoué par SQS voit ses mesures déjà écrites revenir en DUPLICATE (ni
+    écrasement ni métriques comptées deux fois), y compris celles horodatées
+    par le serveur à la mise en file.
+    Seuls les messages dont une mesure n'a pas pu être écrite sont signalés
+    dans batchItemFailures (ReportBatchItemFailures) et rejoués par SQS.
+    """
+    records = event.get('Records', [])
+    print(f"[SENSOR-INGEST] Processing {len(records)} messages")
+
+    failed_messages = set()
+    items, owners = [], []
+
+    for record in records:
+        message_id = record['messageId']
+        try:
+            entries = decode_message(record['body'])
+        except (KeyError, TypeError, ValueError) as e:
+            # Message illisible : laissé en échec, il finira dans la DLQ
+            print(f"[SENSOR-INGEST] Invalid message {message_id}: {str(e)}")
+            failed_messages.add(message_id)
+            continue
+
+        for position, (item, _) in enumerate(entries):
+            # Clé d'idempotence stable d'un rejeu à l'autre : l'identifiant du message SQS
+            item.setdefault('idempotencyKey', f"{message_id}:{position}")
+            items.append(item)
+            owners.append(message_id)
+
+    statuses = write_sensor_items(items, conditional=True) if items else []
+
+    written = []
+    duplicates = 0
+    for item, owner, status in zip(items, owners, statuses):
+        if status == 'FAILED':
+            failed_messages.add(owner)
+        elif status == 'DUPLICATE':
+            duplicates += 1
+        else:
+            written.append(item)
+
+    # Métriques agrégées du lot (doublons exclus)
+    publish_batch_metrics(written)
+    metrics.flush()
+
+    print(f"[SENSOR-INGEST] {len(written)} readings written, {duplicates} duplicates, {len(failed_messages)} messages failed")
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failed_messages)]}
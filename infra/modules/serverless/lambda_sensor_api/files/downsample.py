@@ -0,0 +1,79 @@
+from bisect import bisect_right
+
+# Taille de bucket -> longueur du préfixe ISO8601 (YYYY-MM-DDTHH:MM:SS)
+# Le bucket est dérivé directement du timestamp string, sans parsing datetime.
+BUCKET_PREFIX_LENGTHS = {
+    '1s': 19,
+    '10s': 18,
+    '1m': 16,
+    '10m': 15,
+    '1h': 13
+}
+
+_EPOCH_TEMPLATE = '0000-01-01T00:00:00'
+
+
+class Downsampler:
+    """
+    Agrégation min/max/avg/count par (sensorId, bucket de temps).
+
+    Chaque page est traitée en colonnes : les mesures d'un sensor étant triées
+    par timestamp, un bucket correspond à une tranche contiguë de la colonne
+    des valeurs, réduite avec min/max/sum (boucles natives) au lieu d'une
+    mise à jour item par item.
+    """
+
+    def __init__(self, bucket):
+        if bucket not in BUCKET_PREFIX_LENGTHS:
+            raise ValueError(f"Invalid bucket (allowed: {', '.join(BUCKET_PREFIX_LENGTHS)})")
+        self.bucket = bucket
+        self.prefix_length = BUCKET_PREFIX_LENGTHS[bucket]
+        # (sensorId, préfixe) -> [count, min, max, sum]
+        self._stats = {}
+
+    def add_page(self, items):
+        # Colonnes par sensor : (préfixes de bucket, valeurs)
+        columns = {}
+        n = self.prefix_length
+        for item in items:
+            keys, values = columns.setdefault(item['sensorId'], ([], []))
+            keys.append(item['timestamp'][:n])
+            values.append(float(item['reading']))
+
+        for sensor_id, (keys, values) in columns.items():
+            # Les pages peuvent être en ordre décroissant (newest first)
+            if len(keys) > 1 and keys[0] > keys[-1]:
+                keys.reverse()
+                values.reverse()
+            start = 0
+            total = len(keys)
+            while start < total:
+                key = keys[start]
+                end = bisect_right(keys, key, start)
+                chunk = values[start:end]
+                self._merge((sensor_id, key), len(chunk), min(chunk), max(chunk), sum(chunk))
+                start = end
+
+    def _merge(self, key, count, minimum, maximum, total):
+        stats = self._stats.get(key)
+        if stats is None:
+            self._stats[key] = [count, minimum, maximum, total]
+        else:
+            stats[0] += count
+            stats[1] = min(stats[1], minimum)
+            stats[2] = max(stats[2], maximum)
+            stats[3] += total
+
+    def results(self):
+        """Liste des points agrégés, triés par sensorId puis temps"""
+        points = []
+        for (sensor_id, prefix), (count, minimum, maximum, total) in sorted(self._stats.items()):
+            points.append({
+                'sensorId': sensor_id,
+                'timestamp': prefix + _EPOCH_TEMPLATE[len(prefix):] + 'Z',
+                'count': count,
+                'min': minimum,
+                'max': maximum,
+                'avg': total / count
+            })
+        return points
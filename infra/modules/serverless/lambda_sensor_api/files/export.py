@@ -0,0 +1,49 @@
+import csv
+import io
+from json_encoder import dumps
+
+CSV_COLUMNS = ['sensorId', 'timestamp', 'type', 'reading', 'user', 'runId']
+
+
+class NdjsonEncoder:
+    """Une ligne JSON par mesure"""
+    content_type = 'application/x-ndjson'
+    extension = 'ndjson'
+
+    def header(self):
+        return b''
+
+    def encode(self, items):
+        return ''.join(dumps(item) + '\n' for item in items).encode()
+
+
+class CsvEncoder:
+    """CSV avec colonnes fixes (CSV_COLUMNS)"""
+    content_type = 'text/csv'
+    extension = 'csv'
+
+    def header(self):
+        return (','.join(CSV_COLUMNS) + '\r\n').encode()
+
+    def encode(self, items):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerows([item.get(column, '') for column in CSV_COLUMNS] for item in items)
+        return out.getvalue().encode()
+
+
+ENCODERS = {
+    'ndjson': NdjsonEncoder,
+    'csv': CsvEncoder
+}
+
+
+def export_pages(pages, writer, encoder):
+    """Encode et écrit chaque page de résultats DynamoDB, retourne le nombre d'items"""
+    count = 0
+    writer.write(encoder.header())
+    for items in pages:
+        if items:
+            writer.write(encoder.encode(items))
+            count += len(items)
+    return count
@@ -1,30 +1,128 @@
 import json
 import boto3
+import heapq
+import math
 import os
-from datetime import datetime
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from boto3.dynamodb.conditions import ConditionExpressionBuilder, Key
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from compact import ISO_FORMAT, compact_item, expand_item, packed_update, to_epoch_ms, to_iso
+from json_encoder import dumps, from_dynamodb
+from metrics import create_metric_buffer
+from export import ENCODERS, export_pages
+from s3_stream import S3StreamWriter
+from downsample import BUCKET_PREFIX_LENGTHS, Downsampler
+from ingest_queue import create_ingest_queue
 
 dynamodb = boto3.resource('dynamodb')
+# Client bas niveau pour les lectures : items décodés sans passer par Decimal
+dynamodb_client = boto3.client('dynamodb')
+serializer = TypeSerializer()
 cloudwatch = boto3.client('cloudwatch')
+s3 = boto3.client('s3')
+lambda_client = boto3.client('lambda')
+sqs = boto3.client('sqs')
 
 TABLE_NAME = os.environ['SENSOR_DATA_TABLE_NAME']
 table = dynamodb.Table(TABLE_NAME)
 
+# Schéma compact (v2) : clé de tri epoch ms, attributs courts, packing optionnel par bucket
+# SENSOR_SCHEMA_VERSION choisit le schéma des écritures ; les lectures couvrent la table v2
+# en schéma 2, ou en schéma 1 si COMPACT_READS=true (données v2 existantes, ex. retour à v1)
+COMPACT_TABLE_NAME = os.environ.get('COMPACT_TABLE_NAME')
+compact_table = dynamodb.Table(COMPACT_TABLE_NAME) if COMPACT_TABLE_NAME else None
+COMPACT_RUN_INDEX = 'r-t-index'
+COMPACT_WRITES = os.environ.get('SENSOR_SCHEMA_VERSION', '1') == '2' and compact_table is not None
+COMPACT_READS = compact_table is not None and (COMPACT_WRITES or os.environ.get('COMPACT_READS', 'false').lower() == 'true')
+PACK_BUCKET_MS = int(os.environ.get('PACK_BUCKET_SECONDS', '0')) * 1000
+# Mesures par item packé (o, v et i grossissent à chaque ajout, limite de 400 Ko par item)
+PACK_MAX_READINGS = int(os.environ.get('PACK_MAX_READINGS', '1000'))
+
+# Rétention (TTL DynamoDB) : par environnement, surchargée par run (retentionDays dans la table Runs)
+SENSOR_DATA_RETENTION_DAYS = int(os.environ.get('SENSOR_DATA_RETENTION_DAYS', '0'))
+RUNS_TABLE_NAME = os.environ.get('RUNS_TABLE_NAME')
+runs_table = dynamodb.Table(RUNS_TABLE_NAME) if RUNS_TABLE_NAME else None
+RUN_RETENTION_CACHE_SECONDS = 300
+_run_retention_cache = {}  # runId -> (retentionDays ou None, expiration du cache)
+_pack_slots = {}  # (sensorId, bucket) -> premier slot non plein connu
+
+# Rollups par minute maintenus depuis le stream SensorData (Lambda sensor-rollup)
+ROLLUPS_TABLE_NAME = os.environ.get('ROLLUPS_TABLE_NAME')
+rollups_table = dynamodb.Table(ROLLUPS_TABLE_NAME) if ROLLUPS_TABLE_NAME else None
+
+# Ingestion batch : limites DynamoDB / CloudWatch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '1000'))
+DYNAMODB_BATCH_SIZE = 25      # Limite de batch_write_item
+BATCH_WRITE_MAX_RETRIES = 5
+
+# Ingestion idempotente (eventTime + sequence / idempotencyKey fournis par le client)
+MAX_IDEMPOTENCY_KEY_LENGTH = 128
+MAX_KEY_COLLISIONS = 10        # Décalages successifs de la clé de tri avant abandon
+CONDITIONAL_WRITE_WORKERS = 10  # = max_pool_connections par défaut de botocore
+PACKED_GROUP_MAX_SIZE = 100    # Mesures par UpdateItem packé (taille de la ConditionExpression)
+PACK_MAX_SLOTS = 100           # Items packés par bucket avant d'écrire les mesures non packées
+PACK_SLOTS_CACHE_SIZE = 10000
+
+# Export des données capteur vers S3 (lien présigné)
+EXPORT_BUCKET = os.environ.get('EXPORT_BUCKET')
+EXPORT_URL_EXPIRES_SECONDS = int(os.environ.get('EXPORT_URL_EXPIRES_SECONDS', '3600'))
+# Export synchrone borné (API Gateway coupe la requête à 29 s) : au-delà, l'export
+# est relancé en asynchrone et la réponse devient un 202
+SYNC_EXPORT_MAX_SECONDS = float(os.environ.get('SYNC_EXPORT_MAX_SECONDS', '20'))
+SYNC_EXPORT_MAX_RECORDS = int(os.environ.get('SYNC_EXPORT_MAX_RECORDS', '100000'))
+
+# Ingestion asynchrone (INGEST_MODE=async) : validation puis mise en file SQS,
+# écriture DynamoDB et métriques par la Lambda consommatrice (consumer.py)
+# INGEST_QUEUE_URL=local : file en mémoire pour les tests hors ligne (scripts/local_ingest.py)
+INGEST_MODE = os.environ.get('INGEST_MODE', 'sync').lower()
+INGEST_QUEUE_URL = os.environ.get('INGEST_QUEUE_URL')
+ingest_queue = create_ingest_queue(INGEST_QUEUE_URL, sqs) if INGEST_MODE == 'async' and INGEST_QUEUE_URL else None
+
+# Buffer de métriques partagé entre invocations (vidé en fin d'invocation)
+# METRICS_BACKEND: 'cloudwatch' (PutMetricData) ou 'emf' (Embedded Metric Format sur stdout)
+METRICS_NAMESPACE = 'IoTPlayground/Sensors'
+METRICS_BACKEND = os.environ.get('METRICS_BACKEND', 'cloudwatch').lower()
+metrics = create_metric_buffer(
+    METRICS_BACKEND,
+    cloudwatch,
+    METRICS_NAMESPACE,
+    flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL_SECONDS', '1')),
+    max_datums=int(os.environ.get('METRICS_MAX_DATUMS', '1000'))
+)
+
 def lambda_handler(event, context):
     """
     Handler pour les endpoints Sensor API:
     - POST /api/sensors/data (ingestion)
+    - POST /api/sensors/data/batch (ingestion par lot)
     - GET /api/sensors/data (liste)
+    - GET /api/sensors/data/export (export complet NDJSON/CSV vers S3)
+    - GET /api/sensors/rollups (agrégats par minute)
     """
 
+    # Export asynchrone : invocation de la Lambda par elle-même
+    if 'exportJob' in event:
+        return run_export_job(event['exportJob'])
+
     http_method = event.get('httpMethod', '')
     path = event.get('path', '')
 
     print(f"[SENSOR-API] {http_method} {path}")
 
     try:
-        if http_method == 'POST':
+        if http_method == 'POST' and path.rstrip('/').endswith('/batch'):
+            return ingest_sensor_data_batch(event)
+        elif http_method == 'POST':
             return ingest_sensor_data(event)
+        elif http_method == 'GET' and path.rstrip('/').endswith('/export'):
+            return export_sensor_data(event, context)
+        elif http_method == 'GET' and path.rstrip('/').endswith('/rollups'):
+            return list_sensor_rollups(event)
         elif http_method == 'GET':
             return list_sensor_data(event)
         else:
@@ -35,6 +133,10 @@ def lambda_handler(event, context):
         print(f"[SENSOR-API] ERROR: {str(e)}")
         return response(500, {'error': 'Internal server error', 'details': str(e)})
 
+    finally:
+        # Envoyer les métriques restantes avant le gel du container
+        metrics.flush()
+
 
 def ingest_sensor_data(event):
     """
@@ -50,32 +152,55 @@ def ingest_sensor_data(event):
     except json.JSONDecodeError:
         return response(400, {'error': 'Invalid JSON body'})
 
+    # Clé d'idempotence possible en header (Idempotency-Key)
+    header_key = headers.get('Idempotency-Key') or headers.get('idempotency-key')
+    if isinstance(body, dict) and header_key and 'idempotencyKey' not in body:
+        body['idempotencyKey'] = header_key
+
     # Validation des données
-    sensor_id = body.get('sensorId')
-    sensor_type = body.get('type')
-    reading = body.get('reading')
+    error = validate_reading(body)
+    if error:
+        print(f"[SENSOR-API] Validation failed: {error}")
+        return response(400, {'error': error})
 
-    if not sensor_id or not sensor_type or reading is None:
-        print(f"[SENSOR-API] Validation failed: missing fields")
-        return response(400, {'error': 'Missing required fields: sensorId, type, reading'})
+    sensor_id = body['sensorId']
+    sensor_type = body['type']
+    reading = body['reading']
 
-    # Timestamp actuel
-    timestamp = datetime.utcnow().isoformat() + 'Z'
+    # eventTime client si fourni (clé déterministe : un retry est reconnu par sa clé d'idempotence,
+    # ou sans clé par une mesure identique au même instant), sinon timestamp actuel
+    event_time = parse_event_time(body['eventTime']) if 'eventTime' in body else datetime.utcnow()
 
     print(f"[SENSOR-API] Ingesting data: sensor={sensor_id}, type={sensor_type}, reading={reading}, user={user}, runId={run_id}")
 
     # Préparer l'item DynamoDB
-    item = {
-        'sensorId': sensor_id,
-        'timestamp': timestamp,
-        'type': sensor_type,
-        'reading': Decimal(str(reading)),
-        'user': user,
-        'runId': run_id
-    }
+    item = build_item(body, format_timestamp(event_time), user, run_id, retention_ttl(run_id))
+
+    # Mode asynchrone : mise en file, écriture et métriques par le consommateur
+    if ingest_queue:
+        if ingest_queue.send([(item, 'eventTime' in body)]):
+            return response(503, {'error': 'Failed to queue reading, retry later'})
+        print(f"[SENSOR-API] Reading queued: {sensor_id} at {item['timestamp']}")
+        return response(202, {
+            'message': 'Reading queued',
+            'sensorId': sensor_id,
+            'timestamp': item['timestamp']
+        })
+
+    # Sauvegarder dans DynamoDB (écriture conditionnelle : jamais d'écrasement)
+    status = write_sensor_items([item], conditional=True)[0]
+    if status == 'FAILED':
+        return response(500, {'error': 'Failed to store reading'})
 
-    # Sauvegarder dans DynamoDB
-    table.put_item(Item=item)
+    timestamp = item['timestamp']
+    if status == 'DUPLICATE':
+        print(f"[SENSOR-API] Duplicate reading ignored: {sensor_id} key={item['idempotencyKey']}")
+        return response(200, {
+            'message': 'Duplicate reading ignored',
+            'duplicate': True,
+            'sensorId': sensor_id,
+            'timestamp': timestamp
+        })
 
     # Publier les métriques CloudWatch
     publish_metrics(sensor_id, reading, user, run_id, sensor_type)
@@ -90,44 +215,515 @@ def ingest_sensor_data(event):
     })
 
 
+def ingest_sensor_data_batch(event):
+    """
+    POST /api/sensors/data/batch
+    Ingestion d'un lot de mesures en une seule requête
+    Body: [ {"sensorId": ..., "type": ..., "reading": ..., "eventTime"?: ..., "sequence"?: ..., "idempotencyKey"?: ...}, ... ]
+       ou { "readings": [ ... ] }
+    Les mesures avec eventTime sont écrites de façon conditionnelle (retry idempotent),
+    les autres via batch_write_item avec un timestamp serveur.
+    """
+    headers = event.get('headers') or {}
+    user = headers.get('X-User') or headers.get('x-user', 'unknown')
+    run_id = headers.get('X-Run-Id') or headers.get('x-run-id', 'unknown')
+
+    try:
+        body = json.loads(event.get('body') or '[]')
+    except json.JSONDecodeError:
+        return response(400, {'error': 'Invalid JSON body'})
+
+    readings = body.get('readings') if isinstance(body, dict) else body
+    if not isinstance(readings, list) or len(readings) == 0:
+        return response(400, {'error': 'Body must be a non-empty array of readings'})
+
+    if len(readings) > MAX_BATCH_SIZE:
+        return response(400, {'error': f'Batch too large (max {MAX_BATCH_SIZE} readings)'})
+
+    print(f"[SENSOR-API] Batch ingestion: {len(readings)} readings, user={user}, runId={run_id}")
+
+    # Validation de tout le lot en une seule passe
+    results = [None] * len(readings)
+    items = []          # (index, item) valides, timestamp serveur
+    timed_items = []    # (index, item) valides, eventTime client
+    seen_keys = set()   # (sensorId, idempotencyKey) déjà présents dans le lot
+    base_time = datetime.utcnow()
+    last_timestamp = {}  # sensorId -> dernier datetime attribué dans ce lot
+    # Résolution de la clé de tri : microseconde (v1) ou milliseconde (v2)
+    step = timedelta(milliseconds=1) if COMPACT_WRITES else timedelta(microseconds=1)
+    ttl = retention_ttl(run_id)
+
+    for index, entry in enumerate(readings):
+        error = validate_reading(entry)
+        if error:
+            results[index] = {'index': index, 'status': 'INVALID', 'error': error}
+            continue
+
+        sensor_id = entry['sensorId']
+
+        if 'eventTime' in entry:
+            # Doublon dans le lot lui-même : ne pas l'écrire deux fois
+            key = idempotency_key(entry)
+            if key and (sensor_id, key) in seen_keys:
+                results[index] = {'index': index, 'status': 'DUPLICATE', 'sensorId': sensor_id}
+                continue
+            seen_keys.add((sensor_id, key))
+            timestamp = format_timestamp(parse_event_time(entry['eventTime']))
+            timed_items.append((index, build_item(entry, timestamp, user, run_id, ttl)))
+            continue
+
+        # Garantir une clé (sensorId, timestamp) unique dans le lot :
+        # batch_write_item refuse les doublons de clé dans une même requête
+        ts = base_time
+        previous = last_timestamp.get(sensor_id)
+        if previous is not None and ts <= previous:
+            ts = previous + step
+        last_timestamp[sensor_id] = ts
+
+        items.append((index, build_item(entry, format_timestamp(ts), user, run_id, ttl)))
+
+    if not items and not timed_items:
+        print(f"[SENSOR-API] Batch validation failed: no valid readings")
+        return response(400, {
+            'error': 'No valid readings in batch',
+            'accepted': 0,
+            'rejected': len(readings),
+            'results': results
+        })
+
+    if ingest_queue:
+        return enqueue_batch(len(readings), items + timed_items, len(items), results)
+
+    # Écriture DynamoDB (v1 : paquets de 25 avec retry des UnprocessedItems,
+    # mesures horodatées par le client : écritures conditionnelles)
+    statuses = write_sensor_items([item for _, item in items]) if items else []
+    if timed_items:
+        statuses += write_sensor_items([item for _, item in timed_items], conditional=True)
+
+    written = []
+    for (index, item), status in zip(items + timed_items, statuses):
+        if status == 'FAILED':
+            results[index] = {'index': index, 'status': 'FAILED', 'error': 'Write throttled, retry later'}
+            continue
+        results[index] = {
+            'index': index,
+            'status': status,
+            'sensorId': item['sensorId'],
+            'timestamp': item['timestamp']
+        }
+        if status == 'OK':
+            written.append(item)
+
+    # Les doublons (retries) ne sont pas republiés : les agrégats ne sont pas faussés
+    publish_batch_metrics(written)
+
+    accepted = len(written)
+    duplicates = sum(1 for result in results if result['status'] == 'DUPLICATE')
+    rejected = len(readings) - accepted - duplicates
+    print(f"[SENSOR-API] Batch saved: {accepted} accepted, {duplicates} duplicates, {rejected} rejected")
+
+    return response(200, {
+        'message': 'Batch processed',
+        'accepted': accepted,
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'results': results
+    })
+
+
+def enqueue_batch(total, queued_items, server_timed_count, results):
+    """
+    Mode asynchrone : met en file les mesures validées du lot (messages SQS
+    de 50 mesures, 10 messages par appel) et répond 202 avec un statut par mesure.
+    Les items d'index < server_timed_count portent un timestamp serveur.
+    """
+    entries = [(item, position >= server_timed_count) for position, (_, item) in enumerate(queued_items)]
+    failed = ingest_queue.send(entries)
+
+    queued = 0
+    for position, (index, item) in enumerate(queued_items):
+        if position in failed:
+            results[index] = {'index': index, 'status': 'FAILED', 'error': 'Queue unavailable, retry later'}
+            continue
+        results[index] = {'index': index, 'status': 'QUEUED', 'sensorId': item['sensorId'], 'timestamp': item['timestamp']}
+        queued += 1
+
+    duplicates = sum(1 for result in results if result['status'] == 'DUPLICATE')
+    rejected = total - queued - duplicates
+    print(f"[SENSOR-API] Batch queued: {queued} queued, {duplicates} duplicates, {rejected} rejected")
+
+    return response(202, {
+        'message': 'Batch queued',
+        'queued': queued,
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'results': results
+    })
+
+
+def validate_reading(entry):
+    """Valide une mesure du lot, retourne un message d'erreur ou None"""
+    if not isinstance(entry, dict):
+        return 'Reading must be an object'
+    if not entry.get('sensorId') or not entry.get('type') or entry.get('reading') is None:
+        return 'Missing required fields: sensorId, type, reading'
+    try:
+        reading = float(entry['reading'])
+    except (TypeError, ValueError):
+        return 'reading must be a number'
+    # NaN / Infinity (acceptés par json.loads) : non sérialisables par DynamoDB
+    if not math.isfinite(reading):
+        return 'reading must be a finite number'
+    if 'eventTime' in entry and parse_event_time(entry['eventTime']) is None:
+        return 'eventTime must be an ISO8601 timestamp'
+    sequence = entry.get('sequence')
+    if sequence is not None and (isinstance(sequence, bool) or not isinstance(sequence, int) or sequence < 0):
+        return 'sequence must be a non-negative integer'
+    key = entry.get('idempotencyKey')
+    if key is not None and (not isinstance(key, str) or not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH):
+        return f'idempotencyKey must be a non-empty string (max {MAX_IDEMPOTENCY_KEY_LENGTH} chars)'
+    # Sans eventTime, la clé de tri d'un retry changerait : pas d'idempotence possible
+    if (sequence is not None or key is not None) and 'eventTime' not in entry:
+        return 'sequence and idempotencyKey require eventTime'
+    return None
+
+
+def parse_event_time(value):
+    """eventTime client (ISO8601) -> datetime naïf UTC, None si invalide"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def idempotency_key(entry):
+    """Clé d'idempotence d'une mesure : idempotencyKey explicite, sinon dérivée de sequence"""
+    if entry.get('idempotencyKey'):
+        return entry['idempotencyKey']
+    if entry.get('sequence') is not None:
+        return f"seq:{entry['sequence']}"
+    return None
+
+
+def build_item(entry, timestamp, user, run_id, ttl):
+    """Item DynamoDB (format v1) d'une mesure validée"""
+    item = {
+        'sensorId': entry['sensorId'],
+        'timestamp': timestamp,
+        'type': entry['type'],
+        'reading': Decimal(str(entry['reading'])),
+        'user': user,
+        'runId': run_id
+    }
+    if entry.get('sequence') is not None:
+        item['sequence'] = entry['sequence']
+    key = idempotency_key(entry)
+    if key:
+        item['idempotencyKey'] = key
+    if ttl:
+        item['ttl'] = ttl
+    return item
+
+
+def retention_ttl(run_id):
+    """
+    Epoch (secondes) d'expiration des mesures d'un run : rétention du run si
+    définie, sinon celle de l'environnement. None si aucune rétention.
+    """
+    days = run_retention_days(run_id)
+    if days is None:
+        days = SENSOR_DATA_RETENTION_DAYS
+    if days <= 0:
+        return None
+    return int(time.time()) + days * 86400
+
+
+def run_retention_days(run_id):
+    """retentionDays du run (table Runs), mis en cache quelques minutes par container"""
+    if not runs_table or not run_id or run_id == 'unknown':
+        return None
+
+    now = time.monotonic()
+    cached = _run_retention_cache.get(run_id)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    days = None
+    try:
+        result = runs_table.get_item(Key={'id': run_id}, ProjectionExpression='retentionDays')
+        if 'retentionDays' in result.get('Item', {}):
+            days = int(result['Item']['retentionDays'])
+    except Exception as e:
+        # Ne pas bloquer l'ingestion : rétention de l'environnement
+        print(f"[SENSOR-API] Failed to read retention of run {run_id}: {str(e)}")
+
+    _run_retention_cache[run_id] = (days, now + RUN_RETENTION_CACHE_SECONDS)
+    return days
+
+
+def format_timestamp(ts):
+    """
+    Timestamp ISO8601 de la clé de tri (tronqué à la milliseconde en schéma v2).
+    Toujours avec microsecondes : isoformat() les omet pour une seconde ronde,
+    et "...:05Z" serait trié après "...:05.100000Z".
+    """
+    return to_iso(to_epoch_ms(ts)) if COMPACT_WRITES else ts.strftime(ISO_FORMAT)
+
+
+def next_timestamp(timestamp):
+    """Timestamp suivant d'un pas de clé de tri (µs en v1, ms en v2)"""
+    step = timedelta(milliseconds=1) if COMPACT_WRITES else timedelta(microseconds=1)
+    return format_timestamp(parse_event_time(timestamp) + step)
+
+
+def write_sensor_items(items, conditional=False):
+    """
+    Écrit des mesures (format v1) selon le schéma configuré : table v1,
+    table compacte v2, ou items packés par bucket en v2.
+    conditional=True : une écriture conditionnelle par mesure (jamais d'écrasement).
+    Retourne le statut de chaque mesure (OK, DUPLICATE ou FAILED) ; le timestamp
+    d'une mesure décalée après collision est mis à jour dans l'item.
+    """
+    if COMPACT_WRITES and PACK_BUCKET_MS:
+        return write_packed_items(items)
+    if conditional:
+        if len(items) == 1:
+            return [put_item_once(items[0])]
+        with ThreadPoolExecutor(max_workers=min(CONDITIONAL_WRITE_WORKERS, len(items))) as executor:
+            return list(executor.map(put_item_once, items))
+    if COMPACT_WRITES:
+        failed = batch_write_items([compact_item(item) for item in items], COMPACT_TABLE_NAME, ('s', 't'))
+        failed = {(sensor_id, to_iso(int(epoch_ms))) for sensor_id, epoch_ms in failed}
+    else:
+        failed = batch_write_items(items)
+    return ['FAILED' if (item['sensorId'], item['timestamp']) in failed else 'OK' for item in items]
+
+
+def put_item_once(item):
+    """
+    PutItem conditionnel d'une mesure (attribute_not_exists sur la clé de tri).
+    Si la clé existe déjà :
+    - même idempotencyKey : retry du client -> DUPLICATE, rien n'est écrit
+    - mesure sans idempotencyKey identique (type, reading, user, runId) : retry
+      d'une mesure horodatée sans clé -> DUPLICATE
+    - autre mesure au même instant : la clé de tri est décalée d'un pas et l'écriture rejouée
+    Le client de la ressource est thread-safe (écritures parallèles du lot).
+    """
+    if COMPACT_WRITES:
+        table_name, sort_key, key_attribute = COMPACT_TABLE_NAME, 't', 'i'
+        fields = {'k': 'type', 'v': 'reading', 'u': 'user', 'r': 'runId'}
+    else:
+        table_name, sort_key, key_attribute = TABLE_NAME, 'timestamp', 'idempotencyKey'
+        fields = {name: name for name in ('type', 'reading', 'user', 'runId')}
+    key = item.get('idempotencyKey')
+
+    for _ in range(MAX_KEY_COLLISIONS):
+        try:
+            dynamodb.meta.client.put_item(
+                TableName=table_name,
+                Item=compact_item(item) if COMPACT_WRITES else item,
+                ConditionExpression='attribute_not_exists(#sk)',
+                ExpressionAttributeNames={'#sk': sort_key},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return 'OK'
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                print(f"[SENSOR-API] Conditional write failed for {item['sensorId']} at {item['timestamp']}: {str(e)}")
+                return 'FAILED'
+            # Item existant renvoyé au format AttributeValue
+            existing = e.response.get('Item', {})
+
+        existing_key = existing.get(key_attribute, {}).get('S')
+        if key and existing_key == key:
+            return 'DUPLICATE'
+        if not key and existing_key is None and is_same_reading(existing, item, fields):
+            return 'DUPLICATE'
+        item['timestamp'] = next_timestamp(item['timestamp'])
+
+    print(f"[SENSOR-API] Too many key collisions for {item['sensorId']} at {item['timestamp']}")
+    return 'FAILED'
+
+
+def is_same_reading(existing, item, fields):
+    """Item existant (format AttributeValue) au contenu identique à la mesure (fields : attribut -> champ v1)"""
+    for attribute, field in fields.items():
+        value = existing.get(attribute, {})
+        if 'N' in value:
+            if Decimal(value['N']) != Decimal(str(item[field])):
+                return False
+        elif value.get('S') != item[field]:
+            return False
+    return True
+
+
+def write_packed_items(items):
+    """
+    Regroupe les mesures par (sensorId, bucket, type) et les ajoute à l'item
+    packé du bucket (1 UpdateItem par groupe au lieu d'1 item par mesure).
+    Retourne le statut de chaque mesure (OK, DUPLICATE ou FAILED).
+    """
+    groups = {}
+    for position, item in enumerate(items):
+        bucket = to_epoch_ms(item['timestamp']) // PACK_BUCKET_MS
+        groups.setdefault((item['sensorId'], bucket, item['type']), []).append(position)
+
+    statuses = ['OK'] * len(items)
+    for positions in groups.values():
+        for start in range(0, len(positions), PACKED_GROUP_MAX_SIZE):
+            write_packed_group(items, positions[start:start + PACKED_GROUP_MAX_SIZE], statuses)
+    return statuses
+
+
+def write_packed_group(items, positions, statuses):
+    """
+    Ajoute un groupe de mesures à l'item packé de leur bucket.
+    En cas d'échec de la condition, l'item existant indique la cause :
+    - idempotencyKey déjà présentes : ces mesures sont des doublons, le reste est rejoué
+    - item plein (PACK_MAX_READINGS) : le reste est ajouté à l'item du slot suivant
+    - bucket d'un autre run : les mesures sont écrites non packées
+    """
+    first = items[positions[0]]
+    slot_key = (first['sensorId'], to_epoch_ms(first['timestamp']) // PACK_BUCKET_MS)
+    # Slot 0 pour les mesures avec idempotencyKey : un doublon peut être dans un item déjà plein
+    keyed = any('idempotencyKey' in items[position] for position in positions)
+    slot = 0 if keyed else _pack_slots.get(slot_key, 0)
+    pending = positions
+    while pending and slot < PACK_MAX_SLOTS:
+        group = [items[position] for position in pending]
+        try:
+            compact_table.update_item(
+                **packed_update(group, PACK_BUCKET_MS, PACK_MAX_READINGS, slot),
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            remember_pack_slot(slot_key, slot)
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                print(f"[SENSOR-API] Packed write failed for {group[0]['sensorId']}: {str(e)}")
+                for position in pending:
+                    statuses[position] = 'FAILED'
+                return
+            existing = e.response.get('Item', {})
+
+        known_keys = set(existing.get('i', {}).get('SS', []))
+        duplicates = {position for position in pending if items[position].get('idempotencyKey') in known_keys}
+        if duplicates:
+            for position in duplicates:
+                statuses[position] = 'DUPLICATE'
+            pending = [position for position in pending if position not in duplicates]
+        elif 'o' in existing and all(existing.get(name, {}).get('S') == group[0][field]
+                                     for name, field in (('r', 'runId'), ('k', 'type'), ('u', 'user'))):
+            slot += 1
+        else:
+            break
+
+    if not pending:
+        return
+    reason = 'full' if slot >= PACK_MAX_SLOTS else 'owned by another run'
+    print(f"[SENSOR-API] Bucket of {items[pending[0]]['sensorId']} {reason}, writing {len(pending)} readings unpacked")
+    for position in pending:
+        # La condition protège l'item packé si la mesure tombe pile au début du bucket
+        statuses[position] = put_item_once(items[position])
+
+
+def remember_pack_slot(slot_key, slot):
+    """Slot courant d'un bucket : les groupes suivants ne retestent pas les items pleins"""
+    if slot_key not in _pack_slots and len(_pack_slots) >= PACK_SLOTS_CACHE_SIZE:
+        _pack_slots.clear()
+    _pack_slots[slot_key] = slot
+
+
+def batch_write_items(items, table_name=TABLE_NAME, key_names=('sensorId', 'timestamp')):
+    """
+    Écrit les items par paquets de 25 via batch_write_item.
+    Les UnprocessedItems sont rejoués avec backoff exponentiel.
+    Retourne l'ensemble des clés (key_names) non écrites.
+    """
+    failed_keys = set()
+
+    for start in range(0, len(items), DYNAMODB_BATCH_SIZE):
+        requests = [{'PutRequest': {'Item': item}} for item in items[start:start + DYNAMODB_BATCH_SIZE]]
+        attempt = 0
+
+        while requests:
+            try:
+                result = dynamodb.batch_write_item(RequestItems={table_name: requests})
+                requests = result.get('UnprocessedItems', {}).get(table_name, [])
+            except Exception as e:
+                print(f"[SENSOR-API] batch_write_item error: {str(e)}")
+
+            if not requests:
+                break
+
+            attempt += 1
+            if attempt > BATCH_WRITE_MAX_RETRIES:
+                break
+            time.sleep(min(0.05 * (2 ** attempt), 1.0))
+
+        for request in requests:
+            item = request['PutRequest']['Item']
+            failed_keys.add(tuple(item[name] for name in key_names))
+
+    if failed_keys:
+        print(f"[SENSOR-API] {len(failed_keys)} items not written after {BATCH_WRITE_MAX_RETRIES} retries")
+
+    return failed_keys
+
+
 def list_sensor_data(event):
     """
     GET /api/sensors/data
     Liste toutes les données capteur (ou filtré par query params)
+    Query params optionnels:
+    - sensorId / runId: filtre (Query sur la clé primaire ou le GSI runId)
+    - from / to: bornes sur timestamp (ISO8601), appliquées dans la KeyCondition
+    - bucket: 1s, 10s, 1m, 10m ou 1h -> agrégation min/max/avg/count par bucket
+    - limit: nombre max d'items bruts (défaut: 100, ignoré avec bucket)
     """
     query_params = event.get('queryStringParameters') or {}
 
     # Paramètres optionnels
     sensor_id = query_params.get('sensorId')
     run_id = query_params.get('runId')
+    bucket = query_params.get('bucket')
     limit = int(query_params.get('limit', 100))
 
-    print(f"[SENSOR-API] Listing data: sensorId={sensor_id}, runId={run_id}, limit={limit}")
+    ts_from, ts_to, range_error = normalize_time_range(query_params.get('from'), query_params.get('to'))
+    if range_error:
+        return response(400, {'error': range_error})
 
-    if sensor_id:
-        # Query par sensorId
-        result = table.query(
-            KeyConditionExpression='sensorId = :sid',
-            ExpressionAttributeValues={':sid': sensor_id},
-            Limit=limit,
-            ScanIndexForward=False  # Tri décroissant par timestamp
-        )
-    elif run_id:
-        # Query par runId (utilise le GSI)
-        result = table.query(
-            IndexName='runId-timestamp-index',
-            KeyConditionExpression='runId = :rid',
-            ExpressionAttributeValues={':rid': run_id},
-            Limit=limit,
-            ScanIndexForward=False
-        )
+    print(f"[SENSOR-API] Listing data: sensorId={sensor_id}, runId={run_id}, from={ts_from}, to={ts_to}, bucket={bucket}, limit={limit}")
+
+    if bucket:
+        return downsample_sensor_data(sensor_id, run_id, ts_from, ts_to, bucket)
+
+    if sensor_id or run_id:
+        # Query par sensorId ou par runId (GSI), tri décroissant par timestamp
+        # Fusion des deux schémas (v1 et compact v2), chacun déjà trié
+        sources = [
+            take_items(pages, limit)
+            for pages in sensor_page_sources(sensor_id, run_id, ts_from, ts_to, newest_first=True, page_size=limit)
+        ]
+        items = list(heapq.merge(*sources, key=lambda x: x['timestamp'], reverse=True))[:limit]
+    elif ts_from or ts_to:
+        return response(400, {'error': 'from/to require sensorId or runId'})
     else:
         # Scan (attention à la performance sur de grandes tables)
-        result = table.scan(Limit=limit)
+        result = dynamodb_client.scan(TableName=TABLE_NAME, Limit=limit)
+        items = [from_dynamodb(item) for item in result.get('Items', [])]
+        if COMPACT_READS and len(items) < limit:
+            result = dynamodb_client.scan(TableName=COMPACT_TABLE_NAME, Limit=limit - len(items))
+            for raw in result.get('Items', []):
+                items.extend(expand_item(from_dynamodb(raw)))
+            items = items[:limit]
 
-    items = result.get('Items', [])
     print(f"[SENSOR-API] Retrieved {len(items)} sensor data records")
-    items = [convert_decimals(item) for item in items]
 
     return response(200, {
         'items': items,
@@ -135,56 +731,398 @@ def list_sensor_data(event):
     })
 
 
-def publish_metrics(sensor_id, reading, user, run_id, sensor_type):
-    """Publie les métriques vers CloudWatch pour Grafana avec haute résolution (1s)"""
+def downsample_sensor_data(sensor_id, run_id, ts_from, ts_to, bucket):
+    """Lit toutes les pages de la plage demandée et les agrège par bucket de temps"""
+    if not sensor_id and not run_id:
+        return response(400, {'error': 'bucket requires sensorId or runId'})
+    if bucket not in BUCKET_PREFIX_LENGTHS:
+        return response(400, {'error': f'Invalid bucket (allowed: {", ".join(BUCKET_PREFIX_LENGTHS)})'})
+
+    downsampler = Downsampler(bucket)
+    samples = 0
+    for items in iter_sensor_pages(sensor_id, run_id, ts_from, ts_to):
+        downsampler.add_page(items)
+        samples += len(items)
+
+    points = downsampler.results()
+    print(f"[SENSOR-API] Downsampled {samples} records into {len(points)} points (bucket={bucket})")
+
+    return response(200, {
+        'bucket': bucket,
+        'points': points,
+        'count': len(points),
+        'samples': samples
+    })
+
+
+def list_sensor_rollups(event):
+    """
+    GET /api/sensors/rollups
+    Agrégats par minute (count, min, max, avg, stddev, firstTs, lastTs)
+    Query params:
+    - runId (par sensor du run) ou sensorId
+    - from / to: bornes optionnelles (ISO8601, tronquées à la minute)
+    - summary: true pour fusionner toutes les minutes (une ligne par sensor)
+    Coût O(nombre de minutes) au lieu de O(nombre de mesures).
+    """
+    query_params = event.get('queryStringParameters') or {}
+
+    run_id = query_params.get('runId')
+    sensor_id = query_params.get('sensorId')
+    summary = (query_params.get('summary') or 'false').lower() == 'true'
+
+    ts_from, ts_to, range_error = normalize_time_range(query_params.get('from'), query_params.get('to'))
+    if range_error:
+        return response(400, {'error': range_error})
+    ts_from = (ts_from or '')[:16]
+    ts_to = (ts_to or '')[:16]
+
+    if not rollups_table:
+        return response(500, {'error': 'ROLLUPS_TABLE_NAME not configured'})
+    if not run_id and not sensor_id:
+        return response(400, {'error': 'Missing required parameter: runId or sensorId'})
+
+    # Les sk RUN# sont suffixées par #<sensorId> : borne haute étendue
+    pk = f"RUN#{run_id}" if run_id else f"SENSOR#{sensor_id}"
+    upper = (ts_to + '#\uffff') if run_id and ts_to else ts_to
+
+    condition = Key('pk').eq(pk)
+    if ts_from and upper:
+        condition = condition & Key('sk').between(ts_from, upper)
+    elif ts_from:
+        condition = condition & Key('sk').gte(ts_from)
+    elif upper:
+        condition = condition & Key('sk').lte(upper)
+
+    query_kwargs = {'KeyConditionExpression': condition}
+    rollups = []
+    while True:
+        result = rollups_table.query(**query_kwargs)
+        rollups.extend(result.get('Items', []))
+        if 'LastEvaluatedKey' not in result:
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+    if run_id and sensor_id:
+        rollups = [r for r in rollups if r.get('sensorId') == sensor_id]
+
+    if summary:
+        rollups = merge_rollups(rollups)
+
+    items = [rollup_stats(r, summary) for r in rollups]
+    print(f"[SENSOR-API] Retrieved {len(items)} rollups for {pk} (summary={summary})")
+
+    return response(200, {
+        'items': items,
+        'count': len(items)
+    })
+
+
+def merge_rollups(rollups):
+    """Fusionne les rollups par sensorId (count/sum/sumSq additifs, min/max)"""
+    merged = {}
+    for r in rollups:
+        m = merged.get(r['sensorId'])
+        if m is None:
+            merged[r['sensorId']] = dict(r)
+            continue
+        m['count'] += r['count']
+        m['sum'] += r['sum']
+        m['sumSq'] += r['sumSq']
+        m['min'] = min(m['min'], r['min'])
+        m['max'] = max(m['max'], r['max'])
+        m['firstTs'] = min(m['firstTs'], r['firstTs'])
+        m['lastTs'] = max(m['lastTs'], r['lastTs'])
+    return list(merged.values())
+
+
+def rollup_stats(rollup, summary=False):
+    """Calcule avg/stddev (population) à partir de count, sum et sumSq"""
+    count = int(rollup['count'])
+    total = float(rollup['sum'])
+    avg = total / count if count else 0.0
+    variance = max(float(rollup['sumSq']) / count - avg * avg, 0.0) if count else 0.0
+    stats = {
+        'sensorId': rollup.get('sensorId'),
+        'runId': rollup.get('runId'),
+        'type': rollup.get('type'),
+        'count': count,
+        'min': float(rollup['min']),
+        'max': float(rollup['max']),
+        'avg': avg,
+        'stddev': variance ** 0.5,
+        'firstTs': rollup.get('firstTs'),
+        'lastTs': rollup.get('lastTs')
+    }
+    if not summary:
+        stats['minute'] = rollup.get('minute')
+    return stats
+
+
+def export_sensor_data(event, context):
+    """
+    GET /api/sensors/data/export
+    Exporte toutes les mesures d'un run (ou d'un sensor sur une plage de temps)
+    vers S3 en streaming, et retourne un lien présigné.
+    Query params:
+    - runId ou sensorId (obligatoire)
+    - from / to: bornes optionnelles sur timestamp (ISO8601)
+    - format: csv (défaut) ou ndjson
+    - compress: true (défaut) pour gzip
+    - async: true pour lancer l'export en arrière-plan (réponse 202 immédiate)
+    Un export synchrone qui dépasse SYNC_EXPORT_MAX_SECONDS ou SYNC_EXPORT_MAX_RECORDS
+    est annulé et relancé en asynchrone (202, même clé et même lien).
+    """
+    query_params = event.get('queryStringParameters') or {}
+
+    run_id = query_params.get('runId')
+    sensor_id = query_params.get('sensorId')
+    export_format = (query_params.get('format') or 'csv').lower()
+    compress = (query_params.get('compress') or 'true').lower() != 'false'
+    run_async = (query_params.get('async') or 'false').lower() == 'true'
+
+    if not run_id and not sensor_id:
+        return response(400, {'error': 'Missing required parameter: runId or sensorId'})
+    if export_format not in ENCODERS:
+        return response(400, {'error': f'Invalid format (allowed: {", ".join(ENCODERS)})'})
+    ts_from, ts_to, range_error = normalize_time_range(query_params.get('from'), query_params.get('to'))
+    if range_error:
+        return response(400, {'error': range_error})
+    if not EXPORT_BUCKET:
+        return response(500, {'error': 'EXPORT_BUCKET not configured'})
+
+    export_id = str(uuid.uuid4())
+    extension = ENCODERS[export_format].extension + ('.gz' if compress else '')
+    job = {
+        'exportId': export_id,
+        'runId': run_id,
+        'sensorId': sensor_id,
+        'from': ts_from,
+        'to': ts_to,
+        'format': export_format,
+        'compress': compress,
+        'key': f"exports/{run_id or sensor_id}/{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{export_id}.{extension}"
+    }
+
+    url = s3.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': EXPORT_BUCKET, 'Key': job['key']},
+        ExpiresIn=EXPORT_URL_EXPIRES_SECONDS
+    )
+
+    print(f"[SENSOR-API] Export requested: id={export_id}, runId={run_id}, sensorId={sensor_id}, format={export_format}, async={run_async}")
+
+    if not run_async:
+        try:
+            result = run_export_job(job, limit_pages=sync_export_limit())
+        except SyncExportLimitExceeded as e:
+            print(f"[SENSOR-API] Export too large for a synchronous response ({str(e)}), switching to async: id={export_id}")
+            run_async = True
+
+    if run_async:
+        lambda_client.invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=json.dumps({'exportJob': job}).encode()
+        )
+        return response(202, {
+            'exportId': export_id,
+            'status': 'PENDING',
+            'key': job['key'],
+            'url': url,
+            'expiresIn': EXPORT_URL_EXPIRES_SECONDS
+        })
+
+    return response(200, {
+        'exportId': export_id,
+        'status': 'COMPLETED',
+        'key': job['key'],
+        'url': url,
+        'expiresIn': EXPORT_URL_EXPIRES_SECONDS,
+        'count': result['count'],
+        'bytes': result['bytes']
+    })
+
+
+class SyncExportLimitExceeded(Exception):
+    """Export synchrone interrompu : trop long ou trop volumineux pour API Gateway"""
+
+
+def sync_export_limit():
+    """Filtre de pages qui interrompt l'export au-delà des limites du mode synchrone"""
+    deadline = time.monotonic() + SYNC_EXPORT_MAX_SECONDS
+
+    def limit_pages(pages):
+        count = 0
+        for items in pages:
+            count += len(items)
+            if count > SYNC_EXPORT_MAX_RECORDS:
+                raise SyncExportLimitExceeded(f"more than {SYNC_EXPORT_MAX_RECORDS} records")
+            if time.monotonic() > deadline:
+                raise SyncExportLimitExceeded(f"more than {SYNC_EXPORT_MAX_SECONDS:g} s")
+            yield items
+
+    return limit_pages
+
+
+def run_export_job(job, limit_pages=None):
+    """Lit toutes les pages DynamoDB et les écrit en streaming dans S3 (mémoire bornée)"""
+    encoder = ENCODERS[job['format']]()
+    # Upload multipart annulé si l'export échoue (ou dépasse les limites du mode synchrone)
+    with S3StreamWriter(s3, EXPORT_BUCKET, job['key'], encoder.content_type, compress=job['compress']) as writer:
+        pages = iter_sensor_pages(job.get('sensorId'), job.get('runId'), job.get('from'), job.get('to'))
+        if limit_pages:
+            pages = limit_pages(pages)
+        count = export_pages(pages, writer, encoder)
+
+    print(f"[SENSOR-API] Export completed: id={job['exportId']}, {count} records, {writer.bytes_written} bytes -> s3://{EXPORT_BUCKET}/{job['key']}")
+    return {'count': count, 'bytes': writer.bytes_written}
+
+
+def normalize_time_range(ts_from, ts_to):
+    """
+    Bornes from/to (ISO8601, fuseau quelconque) -> (from, to, erreur) au format
+    des clés de tri (UTC, microsecondes, Z) pour comparer des strings homogènes.
+    """
+    bounds = []
+    for value in (ts_from, ts_to):
+        if not value:
+            bounds.append(None)
+            continue
+        parsed = parse_event_time(value)
+        if parsed is None:
+            return None, None, f'Invalid timestamp (expected ISO8601): {value}'
+        bounds.append(parsed.strftime(ISO_FORMAT))
+    return bounds[0], bounds[1], None
+
+
+def take_items(pages, limit):
+    """Lit des pages jusqu'à obtenir au moins `limit` mesures (ou la fin)"""
+    items = []
+    for page in pages:
+        items.extend(page)
+        if len(items) >= limit:
+            break
+    return items
+
+
+def iter_sensor_pages(sensor_id=None, run_id=None, ts_from=None, ts_to=None, newest_first=False, page_size=None):
+    """
+    Générateur de pages de mesures (suit LastEvaluatedKey jusqu'à la fin),
+    au format v1 quel que soit le schéma : table v1, puis table compacte v2.
+    """
+    for pages in sensor_page_sources(sensor_id, run_id, ts_from, ts_to, newest_first, page_size):
+        yield from pages
+
+
+def sensor_page_sources(sensor_id=None, run_id=None, ts_from=None, ts_to=None, newest_first=False, page_size=None):
+    """
+    Un générateur de pages par schéma de stockage.
+    Query par sensorId (clé primaire) ou par runId (GSI), avec bornes optionnelles sur le temps.
+    """
+    # Schéma v1 : timestamp ISO8601 (string)
+    if sensor_id:
+        condition = Key('sensorId').eq(sensor_id)
+        index_name = None
+    else:
+        condition = Key('runId').eq(run_id)
+        index_name = 'runId-timestamp-index'
+    condition = with_range(condition, 'timestamp', ts_from, ts_to)
+    sources = [query_pages(TABLE_NAME, index_name, condition, newest_first, page_size)]
+
+    if COMPACT_READS:
+        # Schéma v2 : t = epoch ms ; un item packé commence au plus PACK_BUCKET_MS avant sa 1re mesure,
+        # et au plus PACK_MAX_SLOTS ms après (items des slots suivants d'un bucket plein)
+        ms_from = to_epoch_ms(ts_from) if ts_from else None
+        ms_to = to_epoch_ms(ts_to) if ts_to else None
+        if sensor_id:
+            condition = Key('s').eq(sensor_id)
+            index_name = None
+        else:
+            condition = Key('r').eq(run_id)
+            index_name = COMPACT_RUN_INDEX
+        lower = ms_from - PACK_BUCKET_MS + 1 if ms_from is not None and PACK_BUCKET_MS else ms_from
+        upper = ms_to + PACK_MAX_SLOTS if ms_to is not None and PACK_BUCKET_MS else ms_to
+        condition = with_range(condition, 't', lower, upper)
+        pages = query_pages(COMPACT_TABLE_NAME, index_name, condition, newest_first, page_size)
+        # Tri par page : les slots d'un bucket (clés contiguës) ont des mesures entrelacées
+        sources.append(
+            sorted(
+                (reading for item in page for reading in expand_item(item, ms_from, ms_to)),
+                key=lambda r: r['timestamp'], reverse=newest_first
+            )
+            for page in pages
+        )
+
+    return sources
+
+
+def with_range(condition, attribute, lower, upper):
+    """Ajoute des bornes (incluses) sur la clé de tri à une KeyCondition"""
+    if lower is not None and upper is not None:
+        return condition & Key(attribute).between(lower, upper)
+    if lower is not None:
+        return condition & Key(attribute).gte(lower)
+    if upper is not None:
+        return condition & Key(attribute).lte(upper)
+    return condition
+
+
+def query_pages(table_name, index_name, condition, newest_first=False, page_size=None):
+    """
+    Query paginée via le client bas niveau : items décodés en int/float natifs.
+    """
+    expression = ConditionExpressionBuilder().build_expression(condition, is_key_condition=True)
+    query_kwargs = {
+        'TableName': table_name,
+        'KeyConditionExpression': expression.condition_expression,
+        'ExpressionAttributeNames': expression.attribute_name_placeholders,
+        'ExpressionAttributeValues': {
+            name: serializer.serialize(value)
+            for name, value in expression.attribute_value_placeholders.items()
+        },
+        'ScanIndexForward': not newest_first
+    }
+    if index_name:
+        query_kwargs['IndexName'] = index_name
+    if page_size:
+        query_kwargs['Limit'] = page_size
+
+    while True:
+        result = dynamodb_client.query(**query_kwargs)
+        yield [from_dynamodb(item) for item in result.get('Items', [])]
+        if 'LastEvaluatedKey' not in result:
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
+def publish_metrics(sensor_id, reading, user, run_id, sensor_type, timestamp=None):
+    """Ajoute les métriques d'une mesure au buffer CloudWatch (haute résolution 1s)"""
     try:
+        timestamp = timestamp or datetime.utcnow()
         # Métrique principale avec dimensions
-        cloudwatch.put_metric_data(
-            Namespace='IoTPlayground/Sensors',
-            MetricData=[
-                {
-                    'MetricName': 'SensorReading',
-                    'Value': float(reading),
-                    'Unit': 'None',
-                    'Timestamp': datetime.utcnow(),
-                    'StorageResolution': 1,  # Haute résolution: 1 seconde (au lieu de 60s par défaut)
-                    'Dimensions': [
-                        {'Name': 'SensorId', 'Value': sensor_id},
-                        {'Name': 'User', 'Value': user},
-                        {'Name': 'RunId', 'Value': run_id},
-                        {'Name': 'Type', 'Value': sensor_type}
-                    ]
-                },
-                # Compteur d'ingestion
-                {
-                    'MetricName': 'DataIngested',
-                    'Value': 1,
-                    'Unit': 'Count',
-                    'Timestamp': datetime.utcnow(),
-                    'StorageResolution': 1,  # Haute résolution: 1 seconde
-                    'Dimensions': [
-                        {'Name': 'SensorId', 'Value': sensor_id},
-                        {'Name': 'User', 'Value': user},
-                        {'Name': 'RunId', 'Value': run_id}
-                    ]
-                }
-            ]
-        )
+        metrics.add('SensorReading', reading, 'None', [
+            {'Name': 'SensorId', 'Value': sensor_id},
+            {'Name': 'User', 'Value': user},
+            {'Name': 'RunId', 'Value': run_id},
+            {'Name': 'Type', 'Value': sensor_type}
+        ], timestamp)
+        # Compteur d'ingestion
+        metrics.add('DataIngested', 1, 'Count', [
+            {'Name': 'SensorId', 'Value': sensor_id},
+            {'Name': 'User', 'Value': user},
+            {'Name': 'RunId', 'Value': run_id}
+        ], timestamp)
     except Exception as e:
         print(f"Error publishing metrics: {str(e)}")
         # Ne pas bloquer l'ingestion si les métriques échouent
 
 
-def convert_decimals(obj):
-    """Convertit les Decimal de DynamoDB en float pour JSON"""
-    if isinstance(obj, list):
-        return [convert_decimals(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj) if obj % 1 else int(obj)
-    else:
-        return obj
+def publish_batch_metrics(items):
+    """Ajoute les métriques d'un lot au buffer (regroupées en statistic sets)"""
+    now = datetime.utcnow()
+    for item in items:
+        publish_metrics(item['sensorId'], item['reading'], item['user'], item['runId'], item['type'], now)
 
 
 def response(status_code, body):
@@ -194,9 +1132,9 @@ def response(status_code, body):
         'headers': {
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-User,X-Run-Id',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-User,X-Run-Id,Idempotency-Key',
             'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
         },
-        'body': json.dumps(body, default=str)
+        'body': dumps(body)
     }
 
@@ -0,0 +1,127 @@
+import json
+import uuid
+from collections import deque
+from decimal import Decimal
+from json_encoder import dumps
+
+# Limites SQS : 10 messages par SendMessageBatch, 256 KB par appel
+MAX_MESSAGES_PER_CALL = 10
+MAX_READINGS_PER_MESSAGE = 50     # ~20 KB par message, y compris idempotencyKey de 128 caractères
+
+
+def create_ingest_queue(url, sqs):
+    """
+    Crée la file d'ingestion asynchrone :
+    - 'local'      : file en mémoire, vidée explicitement vers le consommateur (tests hors ligne)
+    - URL SQS      : SendMessageBatch vers la file, consommée par la Lambda consumer.py
+    """
+    if url == 'local':
+        return LocalIngestQueue()
+    return SqsIngestQueue(sqs, url)
+
+
+def encode_message(entries):
+    """Corps d'un message : items (format v1) et indicateur d'horodatage client"""
+    return dumps({
+        'items': [item for item, _ in entries],
+        'timed': [timed for _, timed in entries]
+    })
+
+
+def decode_message(body):
+    """Corps d'un message -> liste de (item, horodatée par le client)"""
+    message = json.loads(body, parse_float=Decimal)
+    items = message['items']
+    timed = message.get('timed') or [False] * len(items)
+    return list(zip(items, timed))
+
+
+def chunk_messages(entries):
+    """Découpe les mesures en messages de MAX_READINGS_PER_MESSAGE (positions d'origine conservées)"""
+    return [
+        list(range(start, min(start + MAX_READINGS_PER_MESSAGE, len(entries))))
+        for start in range(0, len(entries), MAX_READINGS_PER_MESSAGE)
+    ]
+
+
+class SqsIngestQueue:
+    """File d'ingestion SQS (MAX_READINGS_PER_MESSAGE mesures par message, 10 messages par appel)"""
+
+    def __init__(self, sqs, url):
+        self.sqs = sqs
+        self.url = url
+
+    def send(self, entries):
+        """
+        Met en file des mesures [(item, horodatée par le client), ...].
+        Retourne l'ensemble des positions non envoyées.
+        """
+        failed = set()
+        chunks = chunk_messages(entries)
+
+        for start in range(0, len(chunks), MAX_MESSAGES_PER_CALL):
+            batch = chunks[start:start + MAX_MESSAGES_PER_CALL]
+            request = [
+                {'Id': str(index), 'MessageBody': encode_message([entries[p] for p in chunk])}
+                for index, chunk in enumerate(batch)
+            ]
+            try:
+                result = self.sqs.send_message_batch(QueueUrl=self.url, Entries=request)
+                failed_ids = {entry['Id'] for entry in result.get('Failed', [])}
+            except Exception as e:
+                print(f"[SENSOR-API] send_message_batch error: {str(e)}")
+                failed_ids = {entry['Id'] for entry in request}
+
+            for index, chunk in enumerate(batch):
+                if str(index) in failed_ids:
+                    failed.update(chunk)
+
+        return failed
+
+
+class LocalIngestQueue:
+    """
+    Remplaçant local de SQS pour les tests hors ligne.
+    drain() construit des événements au format SQS, appelle le consommateur et
+    rejoue les messages signalés en échec (batchItemFailures), comme l'event
+    source mapping ; au-delà de max_receive_count, le message part en dead letters.
+    """
+
+    def __init__(self, batch_size=100, max_receive_count=5):
+        self.batch_size = batch_size
+        self.max_receive_count = max_receive_count
+        self.messages = deque()   # (messageId, body, receiveCount)
+        self.dead_letters = []
+
+    def send(self, entries):
+        for chunk in chunk_messages(entries):
+            self.messages.append((str(uuid.uuid4()), encode_message([entries[p] for p in chunk]), 0))
+        return set()
+
+    def drain(self, consumer):
+        """Vide la file vers consumer(event, context), retourne le nombre d'invocations"""
+        invocations = 0
+        while self.messages:
+            batch = [self.messages.popleft() for _ in range(min(self.batch_size, len(self.messages)))]
+            event = {'Records': [
+                {
+                    'messageId': message_id,
+                    'body': body,
+                    'eventSource': 'aws:sqs',
+                    'attributes': {'ApproximateReceiveCount': str(count + 1)}
+                }
+                for message_id, body, count in batch
+            ]}
+            result = consumer(event, None) or {}
+            invocations += 1
+
+            failed_ids = {failure['itemIdentifier'] for failure in result.get('batchItemFailures', [])}
+            for message_id, body, count in batch:
+                if message_id not in failed_ids:
+                    continue
+                if count + 1 >= self.max_receive_count:
+                    self.dead_letters.append((message_id, body))
+                else:
+                    self.messages.append((message_id, body, count + 1))
+
+        return invocations
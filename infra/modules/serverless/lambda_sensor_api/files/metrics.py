@@ -0,0 +1,191 @@
+import json
+import time
+from datetime import datetime, timezone
+
+# Limites PutMetricData
+MAX_DATUMS_PER_CALL = 1000        # Nombre max de MetricDatum par appel
+MAX_VALUES_PER_DATUM = 150        # Nombre max de valeurs distinctes dans Values/Counts
+MAX_VALUES_PER_CALL = 5000        # Garde-fou pour rester sous la taille max de requête (1 MB)
+
+# Limites Embedded Metric Format
+EMF_MAX_VALUES_PER_METRIC = 100   # Nombre max de valeurs dans un tableau EMF
+
+
+def create_metric_buffer(backend, cloudwatch, namespace, **kwargs):
+    """
+    Crée le buffer de métriques selon le backend choisi :
+    - 'cloudwatch' : PutMetricData (statistic sets)
+    - 'emf'        : Embedded Metric Format écrit sur stdout (aucun appel réseau)
+    """
+    if backend == 'emf':
+        return EmfMetricBuffer(namespace, flush_interval=kwargs.get('flush_interval', 1.0))
+    return MetricBuffer(cloudwatch, namespace, **kwargs)
+
+
+class MetricBuffer:
+    """
+    Buffer de métriques CloudWatch.
+
+    Les datums sont regroupés par (MetricName, Unit, Dimensions, seconde) et
+    envoyés sous forme de statistic sets (tableaux Values/Counts), jusqu'à
+    1000 datums par appel PutMetricData.
+
+    Le buffer est vidé :
+    - quand il est plein (datums ou valeurs)
+    - quand la fenêtre de temps (flush_interval) est écoulée
+    - explicitement via flush() (fin d'invocation)
+    """
+
+    def __init__(self, cloudwatch, namespace, flush_interval=1.0, max_datums=MAX_DATUMS_PER_CALL):
+        self.cloudwatch = cloudwatch
+        self.namespace = namespace
+        self.flush_interval = flush_interval
+        self.max_datums = min(max_datums, MAX_DATUMS_PER_CALL)
+        self._reset()
+
+    def _reset(self):
+        # clé -> liste de dict {valeur: count} (un dict par datum, 150 valeurs max)
+        self._series = {}
+        self._datum_count = 0
+        self._value_count = 0
+        self._first_add = None
+
+    def add(self, metric_name, value, unit, dimensions, timestamp=None, storage_resolution=1):
+        """Ajoute une valeur au buffer (dimensions: liste de {'Name', 'Value'})"""
+        timestamp = (timestamp or datetime.utcnow()).replace(microsecond=0)
+        key = (
+            metric_name,
+            unit,
+            tuple((d['Name'], d['Value']) for d in dimensions),
+            timestamp,
+            storage_resolution
+        )
+        value = float(value)
+
+        buckets = self._series.get(key)
+        if buckets is None:
+            buckets = [{}]
+            self._series[key] = buckets
+            self._datum_count += 1
+
+        current = buckets[-1]
+        if value not in current and len(current) >= MAX_VALUES_PER_DATUM:
+            current = {}
+            buckets.append(current)
+            self._datum_count += 1
+
+        if value not in current:
+            self._value_count += 1
+        current[value] = current.get(value, 0) + 1
+
+        if self._first_add is None:
+            self._first_add = time.monotonic()
+
+        if self._datum_count >= self.max_datums or self._value_count >= MAX_VALUES_PER_CALL:
+            self.flush()
+        elif time.monotonic() - self._first_add >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Envoie le contenu du buffer vers CloudWatch, retourne le nombre d'appels"""
+        if not self._series:
+            return 0
+
+        metric_data = []
+        for (metric_name, unit, dimensions, timestamp, storage_resolution), buckets in self._series.items():
+            for values in buckets:
+                metric_data.append({
+                    'MetricName': metric_name,
+                    'Unit': unit,
+                    'Timestamp': timestamp,
+                    'StorageResolution': storage_resolution,
+                    'Dimensions': [{'Name': name, 'Value': value} for name, value in dimensions],
+                    'Values': list(values.keys()),
+                    'Counts': [float(count) for count in values.values()]
+                })
+        self._reset()
+
+        calls = 0
+        for start in range(0, len(metric_data), self.max_datums):
+            try:
+                self.cloudwatch.put_metric_data(
+                    Namespace=self.namespace,
+                    MetricData=metric_data[start:start + self.max_datums]
+                )
+                calls += 1
+            except Exception as e:
+                print(f"Error publishing metrics: {str(e)}")
+                # Ne pas bloquer l'ingestion si les métriques échouent
+
+        return calls
+
+
+class EmfMetricBuffer:
+    """
+    Buffer de métriques au format CloudWatch Embedded Metric Format.
+
+    Chaque flush écrit une ligne JSON par (MetricName, Dimensions, seconde) sur
+    stdout ; CloudWatch Logs extrait les métriques de façon asynchrone. Même
+    namespace, mêmes dimensions et même résolution (1s) que PutMetricData,
+    les dashboards Grafana existants restent donc compatibles.
+    """
+
+    def __init__(self, namespace, flush_interval=1.0):
+        self.namespace = namespace
+        self.flush_interval = flush_interval
+        self._reset()
+
+    def _reset(self):
+        # clé -> liste de valeurs
+        self._series = {}
+        self._first_add = None
+
+    def add(self, metric_name, value, unit, dimensions, timestamp=None, storage_resolution=1):
+        """Ajoute une valeur au buffer (dimensions: liste de {'Name', 'Value'})"""
+        timestamp = (timestamp or datetime.utcnow()).replace(microsecond=0)
+        key = (
+            metric_name,
+            unit,
+            tuple((d['Name'], d['Value']) for d in dimensions),
+            timestamp,
+            storage_resolution
+        )
+        self._series.setdefault(key, []).append(float(value))
+
+        if self._first_add is None:
+            self._first_add = time.monotonic()
+        if time.monotonic() - self._first_add >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Écrit le contenu du buffer sur stdout, retourne le nombre de lignes EMF"""
+        if not self._series:
+            return 0
+
+        lines = 0
+        for (metric_name, unit, dimensions, timestamp, storage_resolution), values in self._series.items():
+            epoch_ms = int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            for start in range(0, len(values), EMF_MAX_VALUES_PER_METRIC):
+                chunk = values[start:start + EMF_MAX_VALUES_PER_METRIC]
+                document = {
+                    '_aws': {
+                        'Timestamp': epoch_ms,
+                        'CloudWatchMetrics': [{
+                            'Namespace': self.namespace,
+                            'Dimensions': [[name for name, _ in dimensions]],
+                            'Metrics': [{
+                                'Name': metric_name,
+                                'Unit': unit,
+                                'StorageResolution': storage_resolution
+                            }]
+                        }]
+                    },
+                    metric_name: chunk if len(chunk) > 1 else chunk[0]
+                }
+                for name, value in dimensions:
+                    document[name] = str(value)
+                print(json.dumps(document, separators=(',', ':')))
+                lines += 1
+
+        self._reset()
+        return lines
@@ -2,10 +2,62 @@
 # Lambda Function pour Sensor API
 # ===========================
 
+# Sources de la Lambda + modules partagés (encodeur JSON, écriture S3 en streaming)
+locals {
+  lambda_sources = merge(
+    { for f in fileset("${path.module}/files", "*.{py,txt}") : f => "${path.module}/files/${f}" },
+    {
+      "json_encoder.py" = "${path.module}/../shared/json_encoder.py"
+      "s3_stream.py"    = "${path.module}/../../shared/s3_stream.py"
+    }
+  )
+
+  # Environnement commun à l'API et au consommateur de la file d'ingestion
+  lambda_environment = {
+    SENSOR_DATA_TABLE_NAME = var.sensor_data_table_name
+    ROLLUPS_TABLE_NAME     = var.rollups_table_name
+    ENVIRONMENT            = var.environment
+    MAX_BATCH_SIZE         = tostring(var.max_batch_size)
+
+    # Schéma compact (v2) : table, version des écritures, packing par bucket
+    COMPACT_TABLE_NAME    = var.compact_table_name
+    SENSOR_SCHEMA_VERSION = tostring(var.sensor_schema_version)
+    COMPACT_READS         = tostring(var.compact_reads)
+    PACK_BUCKET_SECONDS   = tostring(var.pack_bucket_seconds)
+    PACK_MAX_READINGS     = tostring(var.pack_max_readings)
+
+    # Rétention (TTL) : par environnement, surchargée par run
+    SENSOR_DATA_RETENTION_DAYS = tostring(var.sensor_data_retention_days)
+    RUNS_TABLE_NAME            = var.runs_table_name
+
+    # Ingestion synchrone (DynamoDB dans la requête) ou asynchrone (file SQS + consommateur)
+    INGEST_MODE      = var.ingest_mode
+    INGEST_QUEUE_URL = aws_sqs_queue.ingest.url
+
+    # Buffer de métriques CloudWatch (backend: cloudwatch ou emf)
+    METRICS_BACKEND                = var.metrics_backend
+    METRICS_FLUSH_INTERVAL_SECONDS = tostring(var.metrics_flush_interval_seconds)
+    METRICS_MAX_DATUMS             = tostring(var.metrics_max_datums)
+
+    # Export des données capteur (S3 + lien présigné)
+    EXPORT_BUCKET              = aws_s3_bucket.exports.bucket
+    EXPORT_URL_EXPIRES_SECONDS = tostring(var.export_url_expires_seconds)
+    SYNC_EXPORT_MAX_SECONDS    = tostring(var.sync_export_max_seconds)
+    SYNC_EXPORT_MAX_RECORDS    = tostring(var.sync_export_max_records)
+  }
+}
+
 data "archive_file" "lambda_sensor_api" {
   type        = "zip"
-  source_dir  = "${path.module}/files"
   output_path = "${path.module}/lambda_sensor_api.zip"
+
+  dynamic "source" {
+    for_each = local.lambda_sources
+    content {
+      content  = file(source.value)
+      filename = source.key
+    }
+  }
 }
 
 resource "aws_lambda_function" "sensor_api" {
@@ -15,14 +67,11 @@ resource "aws_lambda_function" "sensor_api" {
   handler         = "handler.lambda_handler"
   source_code_hash = data.archive_file.lambda_sensor_api.output_base64sha256
   runtime         = "python3.11"
-  timeout         = 30
+  timeout         = var.timeout
   memory_size     = 512
 
   environment {
-    variables = {
-      SENSOR_DATA_TABLE_NAME = var.sensor_data_table_name
-      ENVIRONMENT            = var.environment
-    }
+    variables = local.lambda_environment
   }
 
   tags = var.tags
@@ -67,6 +116,7 @@ resource "aws_iam_role_policy" "lambda_sensor_api_dynamodb" {
         Action = [
           "dynamodb:GetItem",
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
@@ -74,8 +124,24 @@ resource "aws_iam_role_policy" "lambda_sensor_api_dynamodb" {
         ]
         Resource = [
           var.sensor_data_table_arn,
-          "${var.sensor_data_table_arn}/index/*"
+          "${var.sensor_data_table_arn}/index/*",
+          var.compact_table_arn,
+          "${var.compact_table_arn}/index/*"
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Query"
+        ]
+        Resource = var.rollups_table_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem"
+        ]
+        Resource = var.runs_table_arn
       }
     ]
   })
@@ -100,6 +166,168 @@ resource "aws_iam_role_policy" "lambda_sensor_api_cloudwatch_metrics" {
   })
 }
 
+# Policy pour les exports S3 (multipart upload + lien présigné)
+resource "aws_iam_role_policy" "lambda_sensor_api_exports" {
+  name = "${var.project}-lambda-sensor-api-exports-${var.environment}"
+  role = aws_iam_role.lambda_sensor_api.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:AbortMultipartUpload"
+        ]
+        Resource = "${aws_s3_bucket.exports.arn}/*"
+      },
+      {
+        # Export asynchrone : la Lambda s'invoque elle-même
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = aws_lambda_function.sensor_api.arn
+      }
+    ]
+  })
+}
+
+# Policy pour la file d'ingestion (envoi par l'API, consommation par le consumer)
+resource "aws_iam_role_policy" "lambda_sensor_api_ingest_queue" {
+  name = "${var.project}-lambda-sensor-api-ingest-queue-${var.environment}"
+  role = aws_iam_role.lambda_sensor_api.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.ingest.arn
+      }
+    ]
+  })
+}
+
+# ===========================
+# File d'ingestion asynchrone (SQS) + Lambda consommatrice
+# ===========================
+
+# Messages en échec après ingest_max_receive_count tentatives
+resource "aws_sqs_queue" "ingest_dlq" {
+  name                      = "${var.project}-sensor-ingest-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue" "ingest" {
+  name                       = "${var.project}-sensor-ingest-${var.environment}"
+  visibility_timeout_seconds = 6 * var.ingest_consumer_timeout # Recommandation AWS pour les event source mappings
+  message_retention_seconds  = 345600
+  sqs_managed_sse_enabled    = true
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.ingest_dlq.arn
+    maxReceiveCount     = var.ingest_max_receive_count
+  })
+
+  tags = var.tags
+}
+
+# Même package que l'API (handler consumer.lambda_handler)
+resource "aws_lambda_function" "sensor_ingest_consumer" {
+  filename         = data.archive_file.lambda_sensor_api.output_path
+  function_name    = "${var.project}-sensor-ingest-consumer-${var.environment}"
+  role            = aws_iam_role.lambda_sensor_api.arn
+  handler         = "consumer.lambda_handler"
+  source_code_hash = data.archive_file.lambda_sensor_api.output_base64sha256
+  runtime         = "python3.11"
+  timeout         = var.ingest_consumer_timeout
+  memory_size     = 512
+
+  environment {
+    variables = local.lambda_environment
+  }
+
+  tags = var.tags
+}
+
+# Lots de ingest_batch_size messages, seuls les messages en échec sont rejoués
+resource "aws_lambda_event_source_mapping" "sensor_ingest_queue" {
+  event_source_arn                   = aws_sqs_queue.ingest.arn
+  function_name                      = aws_lambda_function.sensor_ingest_consumer.arn
+  batch_size                         = var.ingest_batch_size
+  maximum_batching_window_in_seconds = var.ingest_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # Plafond de concurrence : protège la capacité DynamoDB lors des pics
+  scaling_config {
+    maximum_concurrency = var.ingest_max_concurrency
+  }
+
+  depends_on = [aws_iam_role_policy.lambda_sensor_api_ingest_queue]
+}
+
+# ===========================
+# Bucket S3 pour les exports de données capteur
+# ===========================
+
+resource "aws_s3_bucket" "exports" {
+  bucket        = "${var.project}-sensor-exports-${var.environment}"
+  force_destroy = true
+
+  tags = var.tags
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "exports" {
+  bucket = aws_s3_bucket.exports.id
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Les exports sont temporaires : expiration automatique
+resource "aws_s3_bucket_lifecycle_configuration" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  rule {
+    id     = "expire-exports"
+    status = "Enabled"
+
+    filter {
+      prefix = "exports/"
+    }
+
+    expiration {
+      days = var.export_retention_days
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
+
 # CloudWatch Log Group est créé automatiquement par Lambda
 # On ne le gère pas dans Terraform pour éviter ResourceAlreadyExistsException
 
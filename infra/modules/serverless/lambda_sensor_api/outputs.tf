@@ -13,3 +13,22 @@ output "invoke_arn" {
   value       = aws_lambda_function.sensor_api.invoke_arn
 }
 
+output "exports_bucket_name" {
+  description = "Name of the S3 bucket holding sensor data exports"
+  value       = aws_s3_bucket.exports.bucket
+}
+
+output "ingest_queue_url" {
+  description = "URL of the SQS queue used by async sensor ingestion"
+  value       = aws_sqs_queue.ingest.url
+}
+
+output "ingest_dlq_url" {
+  description = "URL of the dead-letter queue of async sensor ingestion"
+  value       = aws_sqs_queue.ingest_dlq.url
+}
+
+output "ingest_consumer_function_name" {
+  description = "Name of the Lambda consuming the ingestion queue"
+  value       = aws_lambda_function.sensor_ingest_consumer.function_name
+}
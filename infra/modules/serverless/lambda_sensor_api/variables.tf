@@ -18,11 +18,186 @@ variable "sensor_data_table_arn" {
   type        = string
 }
 
+variable "compact_table_name" {
+  description = "Name of the compact (v2) SensorData DynamoDB table"
+  type        = string
+}
+
+variable "compact_table_arn" {
+  description = "ARN of the compact (v2) SensorData DynamoDB table"
+  type        = string
+}
+
+variable "sensor_schema_version" {
+  description = "Schema used for new sensor readings: 1 (ISO8601 strings) or 2 (compact, epoch ms). Reads cover the v1 table, plus the compact table with schema 2 or compact_reads"
+  type        = number
+  default     = 1
+
+  validation {
+    condition     = contains([1, 2], var.sensor_schema_version)
+    error_message = "sensor_schema_version must be 1 or 2."
+  }
+}
+
+variable "compact_reads" {
+  description = "Also query the compact (v2) table with sensor_schema_version = 1 (set when v2 data exists, e.g. after switching back from 2 to 1). Always on with schema 2"
+  type        = bool
+  default     = false
+}
+
+variable "pack_bucket_seconds" {
+  description = "Schema v2 only: pack readings of a sensor into one item per bucket of N seconds (0 = one item per reading)"
+  type        = number
+  default     = 0
+}
+
+variable "pack_max_readings" {
+  description = "Schema v2 only: maximum readings per packed item before rolling over to the next item of the bucket (keeps items under the 400 KB DynamoDB limit)"
+  type        = number
+  default     = 1000
+
+  validation {
+    condition     = var.pack_max_readings >= 100 && var.pack_max_readings <= 5000
+    error_message = "pack_max_readings must be between 100 and 5000."
+  }
+}
+
+variable "runs_table_name" {
+  description = "Name of the Runs DynamoDB table (per-run retention lookup)"
+  type        = string
+}
+
+variable "runs_table_arn" {
+  description = "ARN of the Runs DynamoDB table"
+  type        = string
+}
+
+variable "sensor_data_retention_days" {
+  description = "Default retention of sensor readings in days, stamped as DynamoDB TTL at write time (0 = keep forever). Overridden by the run's retentionDays. Opt-in: expired readings are deleted"
+  type        = number
+  default     = 0
+}
+
+variable "rollups_table_name" {
+  description = "Name of the SensorRollups DynamoDB table"
+  type        = string
+}
+
+variable "rollups_table_arn" {
+  description = "ARN of the SensorRollups DynamoDB table"
+  type        = string
+}
+
 variable "api_gateway_execution_arn" {
   description = "Execution ARN of the API Gateway"
   type        = string
 }
 
+variable "max_batch_size" {
+  description = "Maximum number of readings accepted by POST /api/sensors/data/batch"
+  type        = number
+  default     = 1000
+}
+
+variable "metrics_backend" {
+  description = "Metrics backend: cloudwatch (PutMetricData) or emf (Embedded Metric Format on stdout)"
+  type        = string
+  default     = "cloudwatch"
+
+  validation {
+    condition     = contains(["cloudwatch", "emf"], var.metrics_backend)
+    error_message = "metrics_backend must be one of: cloudwatch, emf"
+  }
+}
+
+variable "metrics_flush_interval_seconds" {
+  description = "Time window after which buffered CloudWatch metrics are flushed"
+  type        = number
+  default     = 1
+}
+
+variable "metrics_max_datums" {
+  description = "Maximum number of MetricDatum sent per PutMetricData call (max 1000)"
+  type        = number
+  default     = 1000
+}
+
+variable "timeout" {
+  description = "Lambda timeout in seconds (async exports run within this limit; synchronous exports are bounded by sync_export_max_seconds)"
+  type        = number
+  default     = 120
+}
+
+variable "sync_export_max_seconds" {
+  description = "Maximum duration of a synchronous export before it is cancelled and restarted asynchronously (API Gateway cuts requests at 29 s)"
+  type        = number
+  default     = 20
+
+  validation {
+    condition     = var.sync_export_max_seconds > 0 && var.sync_export_max_seconds <= 25
+    error_message = "sync_export_max_seconds must be greater than 0 and at most 25 (API Gateway integration timeout is 29 s)."
+  }
+}
+
+variable "sync_export_max_records" {
+  description = "Maximum number of records of a synchronous export before it is cancelled and restarted asynchronously"
+  type        = number
+  default     = 100000
+}
+
+variable "export_url_expires_seconds" {
+  description = "Validity of the presigned URL returned by GET /api/sensors/data/export"
+  type        = number
+  default     = 3600
+}
+
+variable "export_retention_days" {
+  description = "Number of days before sensor data exports are deleted from S3"
+  type        = number
+  default     = 1
+}
+
+variable "ingest_mode" {
+  description = "Sensor ingestion mode: sync (DynamoDB write in the request) or async (SQS queue + consumer Lambda)"
+  type        = string
+  default     = "sync"
+
+  validation {
+    condition     = contains(["sync", "async"], var.ingest_mode)
+    error_message = "ingest_mode must be one of: sync, async"
+  }
+}
+
+variable "ingest_batch_size" {
+  description = "Maximum number of SQS messages (up to 50 readings each) per consumer invocation"
+  type        = number
+  default     = 100
+}
+
+variable "ingest_batching_window_seconds" {
+  description = "Maximum time SQS messages are buffered before invoking the consumer"
+  type        = number
+  default     = 1
+}
+
+variable "ingest_max_concurrency" {
+  description = "Maximum number of concurrent consumer invocations (2 to 1000)"
+  type        = number
+  default     = 5
+}
+
+variable "ingest_max_receive_count" {
+  description = "Number of receives before an ingestion message is moved to the dead-letter queue"
+  type        = number
+  default     = 5
+}
+
+variable "ingest_consumer_timeout" {
+  description = "Consumer Lambda timeout in seconds (queue visibility timeout is 6x this value)"
+  type        = number
+  default     = 60
+}
+
 variable "tags" {
   description = "Common tags to apply to all resources"
   type        = map(string)
@@ -0,0 +1,244 @@
+import boto3
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+
+ROLLUPS_TABLE_NAME = os.environ['ROLLUPS_TABLE_NAME']
+rollups_table = dynamodb.Table(ROLLUPS_TABLE_NAME)
+
+EPOCH = datetime(1970, 1, 1)
+SEQUENCE_DIGITS = 40  # SequenceNumber DynamoDB Streams : 21 à 40 chiffres
+
+
+def lambda_handler(event, context):
+    """
+    Consommateur des streams DynamoDB SensorData (schéma v1 et schéma compact v2).
+    Maintient de façon incrémentale les rollups par minute :
+    - par run et par sensor : pk = RUN#<runId>, sk = <minute>#<sensorId>
+    - par sensor            : pk = SENSOR#<sensorId>, sk = <minute>
+    Chaque rollup contient count, min, max, sum, sumSq, firstTs, lastTs,
+    et le ttl des mesures sources (rétention du run) quand elles en ont un.
+    """
+    records = event.get('Records', [])
+    print(f"[SENSOR-ROLLUP] Processing {len(records)} stream records")
+    if not records:
+        return {'updated': 0, 'skipped': 0}
+
+    # Un batch provient d'un seul stream : marqueur de séquence propre à la table source
+    seq_attribute = f"seq#{records[0]['eventSourceARN'].split('/')[1]}"
+
+    # Agrégation en mémoire du batch : une seule écriture par rollup touché
+    rollups = {}
+    skipped = 0
+    for record in records:
+        readings = parse_readings(record)
+        if not readings:
+            skipped += 1
+            continue
+        seq = sequence_number(record)
+        ttl = record_ttl(record)
+
+        for sensor_id, run_id, sensor_type, timestamp, value in readings:
+            minute = timestamp[:16]  # YYYY-MM-DDTHH:MM
+
+            keys = [(f"SENSOR#{sensor_id}", minute)]
+            if run_id:
+                keys.append((f"RUN#{run_id}", f"{minute}#{sensor_id}"))
+
+            for key in keys:
+                stats = rollups.get(key)
+                if stats is None:
+                    rollups[key] = {
+                        'sensorId': sensor_id,
+                        'runId': run_id,
+                        'type': sensor_type,
+                        'minute': minute,
+                        'count': 1,
+                        'sum': value,
+                        'sumSq': value * value,
+                        'min': value,
+                        'max': value,
+                        'firstTs': timestamp,
+                        'lastTs': timestamp,
+                        'firstSeq': seq,
+                        'lastSeq': seq,
+                        'ttl': ttl
+                    }
+                else:
+                    stats['count'] += 1
+                    stats['sum'] += value
+                    stats['sumSq'] += value * value
+                    stats['min'] = min(stats['min'], value)
+                    stats['max'] = max(stats['max'], value)
+                    stats['firstTs'] = min(stats['firstTs'], timestamp)
+                    stats['lastTs'] = max(stats['lastTs'], timestamp)
+                    stats['lastSeq'] = seq  # Records ordonnés par séquence dans un shard
+                    if ttl is not None:
+                        stats['ttl'] = max(stats['ttl'] or 0, ttl)
+
+    updated = sum(apply_rollup(pk, sk, stats, seq_attribute) for (pk, sk), stats in rollups.items())
+
+    print(f"[SENSOR-ROLLUP] Updated {updated} rollups, {len(rollups) - updated} already applied ({skipped} records skipped)")
+    return {'updated': updated, 'already_applied': len(rollups) - updated, 'skipped': skipped}
+
+
+def sequence_number(record):
+    """
+    SequenceNumber du record, complété par des zéros : les séquences d'un shard
+    croissent mais n'ont pas toutes le même nombre de chiffres (comparaison en string).
+    """
+    return record['dynamodb']['SequenceNumber'].zfill(SEQUENCE_DIGITS)
+
+
+def record_ttl(record):
+    """ttl (epoch secondes) de l'item source, None si la rétention est désactivée"""
+    ttl = record.get('dynamodb', {}).get('NewImage', {}).get('ttl', {}).get('N')
+    return int(ttl) if ttl else None
+
+
+def parse_readings(record):
+    """
+    Mesures (sensorId, runId, type, timestamp, reading) apportées par un record du stream.
+    - schéma v1 : une mesure par INSERT
+    - schéma v2 : une mesure par INSERT, ou les mesures ajoutées à un item packé
+      (INSERT ou MODIFY, comparaison des listes NewImage / OldImage)
+    """
+    change = record.get('dynamodb', {})
+    image = change.get('NewImage', {})
+    event_name = record.get('eventName')
+
+    if 'sensorId' in image:
+        reading = parse_reading(image) if event_name == 'INSERT' else None
+        return [reading] if reading else []
+
+    try:
+        sensor_id = image['s']['S']
+        start = int(image['t']['N'])
+        run_id = image.get('r', {}).get('S')
+        sensor_type = image.get('k', {}).get('S', 'unknown')
+        if run_id == 'unknown':
+            run_id = None
+
+        if 'o' not in image:
+            if event_name != 'INSERT':
+                return []
+            return [(sensor_id, run_id, sensor_type, iso_from_epoch_ms(start), Decimal(image['v']['N']))]
+
+        already = len(change.get('OldImage', {}).get('o', {}).get('L', []))
+        offsets = image['o']['L'][already:]
+        values = image['v']['L'][already:]
+        return [
+            (sensor_id, run_id, sensor_type, iso_from_epoch_ms(start + int(offset['N'])), Decimal(value['N']))
+            for offset, value in zip(offsets, values)
+        ]
+    except (KeyError, ValueError, ArithmeticError):
+        return []
+
+
+def iso_from_epoch_ms(epoch_ms):
+    """Epoch millisecondes -> timestamp ISO8601 (même format que le schéma v1)"""
+    return (EPOCH + timedelta(milliseconds=epoch_ms)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def parse_reading(image):
+    """Extrait (sensorId, runId, type, timestamp, reading) d'une NewImage du stream (schéma v1)"""
+    try:
+        sensor_id = image['sensorId']['S']
+        timestamp = image['timestamp']['S']
+        value = Decimal(image['reading']['N'])
+    except (KeyError, ArithmeticError):
+        return None
+    run_id = image.get('runId', {}).get('S')
+    if run_id == 'unknown':
+        run_id = None
+    sensor_type = image.get('type', {}).get('S', 'unknown')
+    return sensor_id, run_id, sensor_type, timestamp, value
+
+
+def apply_rollup(pk, sk, stats, seq_attribute):
+    """
+    Fusionne les statistiques du batch dans le rollup :
+    1 UpdateItem atomique (ADD count/sum/sumSq), puis, uniquement si nécessaire,
+    des mises à jour conditionnelles de min/max/firstTs/lastTs.
+
+    Les records d'un rollup (un sensor) viennent d'un seul shard, dans l'ordre :
+    l'ADD n'est appliqué que si toutes les séquences du batch sont postérieures
+    au marqueur stocké (seq_attribute). Un batch rejoué (retry, bisect) est ignoré.
+    Retourne False si le batch avait déjà été appliqué.
+    """
+    attributes = {
+        'sensorId': stats['sensorId'],
+        'type': stats['type'],
+        'minute': stats['minute']
+    }
+    if stats['runId']:
+        attributes['runId'] = stats['runId']
+
+    set_clause = ', '.join(f"#{name} = if_not_exists(#{name}, :{name})" for name in attributes)
+    set_clause += ', #seq = :lastSeq'
+    values = {
+        ':count': stats['count'],
+        ':sum': stats['sum'],
+        ':sumSq': stats['sumSq'],
+        ':firstSeq': stats['firstSeq'],
+        ':lastSeq': stats['lastSeq'],
+        **{f":{name}": value for name, value in attributes.items()}
+    }
+    names = {'#count': 'count', '#sum': 'sum', '#seq': seq_attribute, **{f"#{name}": name for name in attributes}}
+    # Le rollup expire avec la plus récente de ses mesures
+    if stats['ttl'] is not None:
+        set_clause += ', #ttl = :ttl'
+        names['#ttl'] = 'ttl'
+        values[':ttl'] = stats['ttl']
+
+    applied = True
+    try:
+        result = rollups_table.update_item(
+            Key={'pk': pk, 'sk': sk},
+            UpdateExpression=f"ADD #count :count, #sum :sum, sumSq :sumSq SET {set_clause}",
+            ConditionExpression='attribute_not_exists(#seq) OR #seq < :firstSeq',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        current = result.get('Attributes', {})
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # Déjà compté : min/max/firstTs/lastTs sont tout de même revérifiés,
+        # l'essai précédent a pu échouer avant de les écrire
+        applied = False
+        current = e.response.get('Item', {})
+
+    # min/max/firstTs/lastTs : pas d'opérateur min/max dans les UpdateExpression,
+    # on écrit seulement si la valeur du batch améliore la valeur stockée (condition = garde anti-course)
+    for attribute, operator in (('min', '>'), ('max', '<'), ('firstTs', '>'), ('lastTs', '<')):
+        value = stats[attribute]
+        stored = stored_value(current.get(attribute))
+        if stored is not None and not (stored > value if operator == '>' else stored < value):
+            continue
+        try:
+            rollups_table.update_item(
+                Key={'pk': pk, 'sk': sk},
+                UpdateExpression='SET #attr = :value',
+                ConditionExpression=f"attribute_not_exists(#attr) OR #attr {operator} :value",
+                ExpressionAttributeNames={'#attr': attribute},
+                ExpressionAttributeValues={':value': value}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    return applied
+
+
+def stored_value(attribute):
+    """Valeur stockée : déjà décodée (Attributes) ou brute (Item d'un ConditionalCheckFailed)"""
+    if isinstance(attribute, dict):
+        if 'N' in attribute:
+            return Decimal(attribute['N'])
+        return attribute.get('S')
+    return attribute
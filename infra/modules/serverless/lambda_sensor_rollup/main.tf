@@ -0,0 +1,155 @@
+# ===========================
+# Lambda Function pour les rollups SensorData (DynamoDB Streams)
+# ===========================
+
+data "archive_file" "lambda_sensor_rollup" {
+  type        = "zip"
+  source_dir  = "${path.module}/files"
+  output_path = "${path.module}/lambda_sensor_rollup.zip"
+}
+
+resource "aws_lambda_function" "sensor_rollup" {
+  filename         = data.archive_file.lambda_sensor_rollup.output_path
+  function_name    = "${var.project}-sensor-rollup-${var.environment}"
+  role            = aws_iam_role.lambda_sensor_rollup.arn
+  handler         = "handler.lambda_handler"
+  source_code_hash = data.archive_file.lambda_sensor_rollup.output_base64sha256
+  runtime         = "python3.11"
+  timeout         = 60
+  memory_size     = 256
+
+  environment {
+    variables = {
+      ROLLUPS_TABLE_NAME = var.rollups_table_name
+      ENVIRONMENT        = var.environment
+    }
+  }
+
+  tags = var.tags
+}
+
+# IAM Role pour Lambda
+resource "aws_iam_role" "lambda_sensor_rollup" {
+  name = "${var.project}-lambda-sensor-rollup-${var.environment}"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+
+  tags = var.tags
+}
+
+# Policy pour logs CloudWatch
+resource "aws_iam_role_policy_attachment" "lambda_sensor_rollup_logs" {
+  role       = aws_iam_role.lambda_sensor_rollup.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+# Policy pour lire les streams SensorData (v1 et v2) et écrire les rollups
+resource "aws_iam_role_policy" "lambda_sensor_rollup_dynamodb" {
+  name = "${var.project}-lambda-sensor-rollup-dynamodb-${var.environment}"
+  role = aws_iam_role.lambda_sensor_rollup.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = [
+          var.sensor_data_stream_arn,
+          var.compact_stream_arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:UpdateItem"
+        ]
+        Resource = var.rollups_table_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage"
+        ]
+        Resource = aws_sqs_queue.rollup_failures.arn
+      }
+    ]
+  })
+}
+
+# Batches en échec après les retries : métadonnées (shard, séquences) conservées
+# pour rejouer les rollups manquants (le stream n'est retenu que 24 h)
+resource "aws_sqs_queue" "rollup_failures" {
+  name                      = "${var.project}-sensor-rollup-failures-${var.environment}"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+
+  tags = var.tags
+}
+
+# Déclenchement par le stream (uniquement les INSERT)
+# Retries et bisect sans double comptage : marqueur de séquence par rollup (handler)
+resource "aws_lambda_event_source_mapping" "sensor_data_stream" {
+  event_source_arn                   = var.sensor_data_stream_arn
+  function_name                      = aws_lambda_function.sensor_rollup.arn
+  starting_position                  = "LATEST"
+  batch_size                         = var.batch_size
+  maximum_batching_window_in_seconds = var.maximum_batching_window_in_seconds
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 3
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.rollup_failures.arn
+    }
+  }
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ eventName = ["INSERT"] })
+    }
+  }
+
+  depends_on = [aws_iam_role_policy.lambda_sensor_rollup_dynamodb]
+}
+
+# Table compacte (v2) : INSERT (nouvel item) et MODIFY (mesures ajoutées à un item packé)
+resource "aws_lambda_event_source_mapping" "sensor_data_compact_stream" {
+  event_source_arn                   = var.compact_stream_arn
+  function_name                      = aws_lambda_function.sensor_rollup.arn
+  starting_position                  = "LATEST"
+  batch_size                         = var.batch_size
+  maximum_batching_window_in_seconds = var.maximum_batching_window_in_seconds
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 3
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.rollup_failures.arn
+    }
+  }
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ eventName = ["INSERT", "MODIFY"] })
+    }
+  }
+
+  depends_on = [aws_iam_role_policy.lambda_sensor_rollup_dynamodb]
+}
@@ -0,0 +1,14 @@
+output "function_name" {
+  description = "Name of the Lambda function"
+  value       = aws_lambda_function.sensor_rollup.function_name
+}
+
+output "function_arn" {
+  description = "ARN of the Lambda function"
+  value       = aws_lambda_function.sensor_rollup.arn
+}
+
+output "failure_queue_url" {
+  description = "URL of the SQS queue receiving stream batches that failed all retries"
+  value       = aws_sqs_queue.rollup_failures.url
+}
@@ -0,0 +1,47 @@
+variable "project" {
+  description = "Project name"
+  type        = string
+}
+
+variable "environment" {
+  description = "Environment (dev, staging, prod)"
+  type        = string
+}
+
+variable "sensor_data_stream_arn" {
+  description = "ARN of the SensorData DynamoDB stream"
+  type        = string
+}
+
+variable "compact_stream_arn" {
+  description = "ARN of the compact (v2) SensorData DynamoDB stream"
+  type        = string
+}
+
+variable "rollups_table_name" {
+  description = "Name of the SensorRollups DynamoDB table"
+  type        = string
+}
+
+variable "rollups_table_arn" {
+  description = "ARN of the SensorRollups DynamoDB table"
+  type        = string
+}
+
+variable "batch_size" {
+  description = "Maximum number of stream records per invocation"
+  type        = number
+  default     = 500
+}
+
+variable "maximum_batching_window_in_seconds" {
+  description = "Maximum time to gather stream records before invoking the Lambda"
+  type        = number
+  default     = 5
+}
+
+variable "tags" {
+  description = "Common tags to apply to all resources"
+  type        = map(string)
+  default     = {}
+}
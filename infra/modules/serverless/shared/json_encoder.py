@@ -0,0 +1,69 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+# Module partagé entre lambda_run_api et lambda_sensor_api
+# (copié dans chaque archive Lambda par Terraform, cf. data "archive_file")
+
+
+def _default(value):
+    """Types non natifs JSON, appelé par l'encodeur C uniquement pour ces valeurs"""
+    if isinstance(value, Decimal):
+        integer = int(value)
+        return integer if integer == value else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+# Encodeur unique (une seule traversée, sans copie préalable des items)
+_encoder = json.JSONEncoder(default=_default, separators=(',', ':'))
+
+
+def dumps(obj):
+    """Sérialise en JSON compact : Decimal -> int/float, datetime -> ISO8601, set -> liste"""
+    return _encoder.encode(obj)
+
+
+def _number(value):
+    if '.' in value or 'e' in value or 'E' in value:
+        return float(value)
+    return int(value)
+
+
+_DESERIALIZERS = {
+    'S': lambda v: v,
+    'N': _number,
+    'BOOL': lambda v: v,
+    'NULL': lambda v: None,
+    'M': lambda v: {k: _deserialize(x) for k, x in v.items()},
+    'L': lambda v: [_deserialize(x) for x in v],
+    'SS': set,
+    'NS': lambda v: {_number(x) for x in v},
+    'B': lambda v: v,
+    'BS': set
+}
+
+
+def _deserialize(value):
+    for attr_type, data in value.items():
+        return _DESERIALIZERS[attr_type](data)
+
+
+def from_dynamodb(item):
+    """
+    Convertit un item du client DynamoDB bas niveau ({'N': '23.5'}, {'S': ...})
+    en dict Python natif, sans passer par Decimal (nombres -> int/float).
+    """
+    result = {}
+    for key, value in item.items():
+        # Chemin rapide pour les types dominants (S, N)
+        if 'S' in value:
+            result[key] = value['S']
+        elif 'N' in value:
+            result[key] = _number(value['N'])
+        else:
+            result[key] = _deserialize(value)
+    return result
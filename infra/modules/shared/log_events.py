@@ -0,0 +1,70 @@
+import base64
+import json
+import logging
+import os
+import re
+import zlib
+
+# Module partagé entre les Lambdas abonnées aux logs CloudWatch
+# (lambda_generate_report, iot_playground_lambda_notify), copié dans chaque archive
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+
+def get_logger(name):
+    """Logger au niveau LOG_LEVEL (DEBUG pour tracer chaque message reçu)"""
+    logger = logging.getLogger(name)
+    logger.setLevel(LOG_LEVEL)
+    return logger
+
+
+logger = get_logger(__name__)
+
+
+class LogMatcher:
+    """
+    Regex compilée une seule fois, précédée d'un test de sous-chaîne (marker)
+    bien moins coûteux : la regex ne tourne que sur les messages candidats.
+    Le marker doit être une sous-chaîne ASCII de tout message qui matche.
+    """
+
+    def __init__(self, pattern, marker):
+        self.regex = re.compile(pattern)
+        self.marker = marker
+        self.marker_bytes = marker.encode("ascii")
+
+    def search(self, message):
+        if self.marker not in message:
+            return None
+        return self.regex.search(message)
+
+
+RUN_FINISHED = LogMatcher(r"Run ([0-9a-fA-F\-]{36}) finished SUCCESS", "finished SUCCESS")
+
+
+def decode_payload(event):
+    """Données awslogs (base64 + gzip) -> JSON brut en bytes, sans décodage texte intermédiaire"""
+    return zlib.decompress(base64.b64decode(event["awslogs"]["data"]), wbits=31)
+
+
+def iter_matches(event, matcher):
+    """
+    Itère sur les (log event, match) d'un événement de souscription CloudWatch Logs.
+    Le payload n'est pas parsé si le marker n'apparaît nulle part dans le JSON brut
+    (un marker ASCII sans guillemet ni antislash n'est pas échappé par JSON).
+    """
+    raw = decode_payload(event)
+    if matcher.marker_bytes not in raw:
+        logger.debug("No candidate message in %d bytes of log data", len(raw))
+        return
+
+    payload = json.loads(raw)
+    if payload.get("messageType") == "CONTROL_MESSAGE":
+        return
+
+    for log_event in payload["logEvents"]:
+        message = log_event["message"]
+        logger.debug("Raw message: %s", message)
+        match = matcher.search(message)
+        if match:
+            yield log_event, match
@@ -0,0 +1,80 @@
+import json
+import random
+import time
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+# Module partagé entre lambda_generate_report (écriture du catalogue)
+# et lambda_download_reports (lecture), copié dans chaque archive
+#
+# Catalogue des rapports : un fichier NDJSON par date ({prefix}{date}.ndjson),
+# une ligne par objet (rapport CSV ou statistiques) :
+# {"runId", "date", "key", "kind", "size", "rows", "etag", "lastModified"}
+
+MAX_UPDATE_ATTEMPTS = 5
+# Écriture conditionnelle refusée : le fichier a changé depuis sa lecture
+CONFLICT_CODES = ('PreconditionFailed', 'ConditionalRequestConflict')
+
+
+def shard_key(prefix, day):
+    return f"{prefix}{day}.ndjson"
+
+
+def catalog_entry(key, run_id, kind, size, rows, etag):
+    """Entrée du catalogue d'un objet uploadé (date déduite de la clé reports/{date}/...)"""
+    return {
+        'runId': run_id.lower(),
+        'date': key.rsplit('/', 2)[-2],
+        'key': key,
+        'kind': kind,
+        'size': size,
+        'rows': rows,
+        'etag': etag,
+        'lastModified': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }
+
+
+def read_shard(s3, bucket, key):
+    """(entrées, ETag) d'un fichier du catalogue ; (None, None) s'il n'existe pas"""
+    try:
+        obj = s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None, None
+        raise
+    entries = [json.loads(line) for line in obj['Body'].read().splitlines() if line]
+    return entries, obj['ETag']
+
+
+def encode_shard(entries):
+    return "".join(json.dumps(entry, separators=(',', ':')) + "\n" for entry in entries).encode('utf-8')
+
+
+def update_catalog(s3, bucket, prefix, entries):
+    """
+    Ajoute les entrées au catalogue (une entrée existante de même clé est remplacée :
+    un rapport régénéré ne crée pas de doublon). Lecture puis écriture conditionnelle
+    (If-Match / If-None-Match) : en cas d'écriture concurrente, relecture et nouvel essai.
+    """
+    by_date = {}
+    for entry in entries:
+        by_date.setdefault(entry['date'], []).append(entry)
+
+    for day, day_entries in sorted(by_date.items()):
+        key = shard_key(prefix, day)
+        for attempt in range(MAX_UPDATE_ATTEMPTS):
+            current, etag = read_shard(s3, bucket, key)
+            merged = {entry['key']: entry for entry in current or []}
+            merged.update((entry['key'], entry) for entry in day_entries)
+            condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+            try:
+                s3.put_object(
+                    Bucket=bucket, Key=key, ContentType='application/x-ndjson',
+                    Body=encode_shard(sorted(merged.values(), key=lambda entry: entry['key'])),
+                    **condition
+                )
+                break
+            except ClientError as e:
+                if e.response['Error']['Code'] not in CONFLICT_CODES or attempt == MAX_UPDATE_ATTEMPTS - 1:
+                    raise
+                time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
@@ -0,0 +1,104 @@
+import zlib
+
+# Module partagé par les Lambdas qui écrivent de gros objets S3 en streaming
+# (export de la Sensor API, rapports de lambda_generate_report, archives ZIP
+# de lambda_download_reports), copié dans chaque archive
+
+# Taille des parts multipart S3 (min 5 Mo sauf la dernière)
+PART_SIZE = 8 * 1024 * 1024
+
+
+class S3StreamWriter:
+    """
+    Fichier en écriture seule envoyé vers S3 sans fichier /tmp.
+    Seule la part en cours est gardée en mémoire (PART_SIZE, parts de taille fixe) :
+    l'upload multipart n'est démarré qu'à la première part pleine, un petit objet
+    part en un seul PutObject. Compression gzip incrémentale optionnelle.
+    Non seekable (ni seek ni tell) : zipfile y écrit des data descriptors.
+
+    Utilisable en context manager : close() en sortie normale, abort() sur exception.
+    """
+
+    def __init__(self, s3, bucket, key, content_type, compress=False, part_size=PART_SIZE):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        # Fichier .gz téléchargé tel quel (pas de Content-Encoding : évite la décompression implicite)
+        self.content_type = "application/gzip" if compress else content_type
+        self.part_size = part_size
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31 : format gzip
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self.bytes_written = 0
+        self.etag = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, data):
+        size = len(data)
+        if self._compressor:
+            data = self._compressor.compress(data)
+        self._append(data)
+        return size
+
+    def flush(self):
+        pass
+
+    def _append(self, data):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+
+    def _upload_part(self, body):
+        if self._upload_id is None:
+            upload = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, ContentType=self.content_type)
+            self._upload_id = upload["UploadId"]
+        part_number = len(self._parts) + 1
+        result = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self._parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+
+    def close(self):
+        """Termine l'objet : PutObject si une seule part, sinon dernière part + CompleteMultipartUpload"""
+        if self._compressor:
+            self._append(self._compressor.flush())
+            self._compressor = None
+        if self._upload_id is None:
+            result = self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), ContentType=self.content_type)
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            result = self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+        self.etag = result["ETag"]
+        self._buffer = bytearray()
+
+    def abort(self):
+        """Annule l'upload en cours (les parts déjà envoyées ne sont plus facturées)"""
+        self._buffer = bytearray()
+        if self._upload_id is None:
+            return
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        except Exception as e:
+            print(f"Failed to abort multipart upload {self.key}: {e}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+scripts/backfill_report_catalog.py
+
+Construit le catalogue des rapports (catalog/{date}.ndjson) pour les rapports
+écrits avant sa mise en place, à partir d'un listing paginé de reports/.
+Seules les clés absentes du catalogue sont ajoutées : les entrées écrites par
+lambda_generate_report (nombre de lignes connu) sont conservées. Le nombre de
+lignes des rapports ajoutés est inconnu (rows = null).
+
+Usage :
+    python scripts/backfill_report_catalog.py --bucket iot-playground-dev-reports
+    python scripts/backfill_report_catalog.py --bucket iot-playground-dev-reports --from 2026-01-01 --dry-run
+"""
+import argparse
+import os
+import re
+import sys
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'infra', 'modules', 'shared'))
+from report_catalog import read_shard, shard_key, update_catalog  # noqa: E402
+
+REPORT_KEY = re.compile(r"(\d{4}-\d{2}-\d{2})/run_([0-9a-zA-Z\-]+?)(_stats)?\.[a-z.]+$")
+
+
+def list_by_date(s3, bucket, prefix, start):
+    """{date: [entrées]} des rapports listés sous prefix (à partir de la date start)"""
+    kwargs = {'Bucket': bucket, 'Prefix': prefix}
+    if start:
+        kwargs['StartAfter'] = f"{prefix}{start}"
+    by_date = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(**kwargs):
+        for obj in page.get('Contents', []):
+            match = REPORT_KEY.match(obj['Key'], len(prefix))
+            if not match:
+                continue
+            day, run_id, stats = match.groups()
+            by_date.setdefault(day, []).append({
+                'runId': run_id.lower(),
+                'date': day,
+                'key': obj['Key'],
+                'kind': 'stats' if stats else 'report',
+                'size': obj['Size'],
+                'rows': None,
+                'etag': obj['ETag'],
+                'lastModified': obj['LastModified'].isoformat(timespec='seconds')
+            })
+    return by_date
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill du catalogue NDJSON des rapports")
+    parser.add_argument('--bucket', required=True, help='Bucket des rapports')
+    parser.add_argument('--reports-prefix', default='reports/', help='Préfixe des rapports')
+    parser.add_argument('--catalog-prefix', default='catalog/', help='Préfixe du catalogue')
+    parser.add_argument('--from', dest='start', help='Première date traitée (YYYY-MM-DD)')
+    parser.add_argument('--dry-run', action='store_true', help="Affiche les ajouts sans écrire")
+    args = parser.parse_args()
+
+    s3 = boto3.client('s3')
+    added = 0
+    for day, entries in sorted(list_by_date(s3, args.bucket, args.reports_prefix, args.start).items()):
+        current, _ = read_shard(s3, args.bucket, shard_key(args.catalog_prefix, day))
+        known = {entry['key'] for entry in current or []}
+        missing = [entry for entry in entries if entry['key'] not in known]
+        if not missing:
+            continue
+        print(f"{day}: {len(missing)} objets ajoutés ({len(known)} déjà catalogués)")
+        if not args.dry_run:
+            update_catalog(s3, args.bucket, args.catalog_prefix, missing)
+        added += len(missing)
+
+    print(f"\n{added} objets {'à ajouter' if args.dry_run else 'ajoutés'} au catalogue")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+scripts/backfill_ttl.py
+
+Pose l'attribut `ttl` (epoch secondes) sur les items existants qui n'en ont pas,
+via un Scan segmenté parallèle (un thread par segment).
+
+Le TTL est calculé à partir de la date de l'item + rétention :
+- sensor         : table SensorData v1 (attribut `timestamp` ISO8601)
+- sensor-compact : table SensorData v2 (attribut `t` epoch ms)
+- runs           : table Runs (attribut `startedAt`, runs RUNNING et compteur ignorés)
+La rétention d'un run (`retentionDays`) est prioritaire sur --days ; pour les mesures,
+elle est lue dans la table Runs si --runs-table est fourni.
+
+Usage :
+    python scripts/backfill_ttl.py --table iot-playground-sensor-data-serverless-dev --kind sensor --days 30
+    python scripts/backfill_ttl.py --table iot-playground-runs-serverless-dev --kind runs --days 90 --segments 4 --dry-run
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+COUNTER_ID = '__running_counter__'
+
+# Attributs lus par kind : (attribut de date, attribut runId)
+KINDS = {
+    'sensor': ('timestamp', 'runId'),
+    'sensor-compact': ('t', 'r'),
+    'runs': ('startedAt', None)
+}
+
+
+def iso_to_epoch(value):
+    """Timestamp ISO8601 -> epoch secondes"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+class RunRetention:
+    """retentionDays par run (table Runs), avec cache partagé entre threads"""
+
+    def __init__(self, client, runs_table):
+        self.client = client
+        self.runs_table = runs_table
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def days(self, run_id):
+        if not self.runs_table or not run_id or run_id == 'unknown':
+            return None
+        with self._lock:
+            if run_id in self._cache:
+                return self._cache[run_id]
+        result = self.client.get_item(
+            TableName=self.runs_table,
+            Key={'id': {'S': run_id}},
+            ProjectionExpression='retentionDays'
+        )
+        value = result.get('Item', {}).get('retentionDays', {}).get('N')
+        days = int(value) if value else None
+        with self._lock:
+            self._cache[run_id] = days
+        return days
+
+
+class Backfill:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.time_attr, self.run_attr = KINDS[args.kind]
+        self.key_names = self._key_names()
+        self.retention = RunRetention(client, args.runs_table)
+        self.stats = {'scanned': 0, 'updated': 0, 'skipped': 0, 'expired': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def _key_names(self):
+        schema = self.client.describe_table(TableName=self.args.table)['Table']['KeySchema']
+        return [key['AttributeName'] for key in schema]
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def compute_ttl(self, item):
+        """TTL d'un item (AttributeValues bas niveau), None s'il doit être ignoré"""
+        if self.args.kind == 'runs':
+            if item.get('id', {}).get('S') == COUNTER_ID or item.get('status', {}).get('S') == 'RUNNING':
+                return None
+            days = int(item['retentionDays']['N']) if 'retentionDays' in item else None
+        else:
+            run_id = item.get(self.run_attr, {}).get('S')
+            days = self.retention.days(run_id)
+        days = days or self.args.days
+
+        value = item.get(self.time_attr)
+        if not value:
+            return None
+        if self.args.kind == 'sensor-compact':
+            written_at = int(value['N']) // 1000
+        else:
+            written_at = iso_to_epoch(value['S'])
+        return written_at + days * 86400
+
+    def scan_segment(self, segment):
+        """Parcourt un segment du Scan et pose le TTL manquant"""
+        # Clés + attributs utiles (dédoublonnés : des chemins identiques sont refusés)
+        attributes = [*self.key_names, self.time_attr, self.run_attr]
+        if self.args.kind == 'runs':
+            attributes.extend(['status', 'retentionDays'])
+        attributes = list(dict.fromkeys(name for name in attributes if name))
+        names = {f"#a{i}": name for i, name in enumerate(attributes)}
+        projection = ', '.join(names)
+        names['#ttl'] = 'ttl'
+
+        scan_kwargs = {
+            'TableName': self.args.table,
+            'Segment': segment,
+            'TotalSegments': self.args.segments,
+            'ProjectionExpression': projection,
+            'FilterExpression': 'attribute_not_exists(#ttl)',
+            'ExpressionAttributeNames': names
+        }
+        now = int(time.time())
+
+        while True:
+            result = self.client.scan(**scan_kwargs)
+            items = result.get('Items', [])
+            self._count(scanned=result.get('ScannedCount', 0))
+
+            for item in items:
+                try:
+                    ttl = self.compute_ttl(item)
+                except (KeyError, ValueError, ClientError) as e:
+                    print(f"  ! segment {segment}: item ignoré ({e})")
+                    self._count(errors=1)
+                    continue
+                if ttl is None:
+                    self._count(skipped=1)
+                    continue
+                if ttl <= now:
+                    self._count(expired=1)
+                if not self.args.dry_run:
+                    self.set_ttl(item, ttl)
+                self._count(updated=1)
+
+            if 'LastEvaluatedKey' not in result:
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+        print(f"  segment {segment} terminé")
+
+    def set_ttl(self, item, ttl):
+        """UpdateItem conditionnel : ne remplace pas un TTL posé entre-temps par l'API"""
+        try:
+            self.client.update_item(
+                TableName=self.args.table,
+                Key={name: item[name] for name in self.key_names},
+                UpdateExpression='SET #ttl = :ttl',
+                ConditionExpression='attribute_not_exists(#ttl)',
+                ExpressionAttributeNames={'#ttl': 'ttl'},
+                ExpressionAttributeValues={':ttl': {'N': str(ttl)}}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.args.segments) as executor:
+            list(executor.map(self.scan_segment, range(self.args.segments)))
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de l'attribut ttl (Scan segmenté parallèle)")
+    parser.add_argument('--table', required=True, help='Nom de la table DynamoDB')
+    parser.add_argument('--kind', required=True, choices=sorted(KINDS), help="Type d'items de la table")
+    parser.add_argument('--days', required=True, type=int, help='Rétention par défaut en jours')
+    parser.add_argument('--runs-table', help='Table Runs pour la rétention par run des mesures')
+    parser.add_argument('--segments', type=int, default=8, help='Nombre de segments (threads) du Scan')
+    parser.add_argument('--region', help='Région AWS')
+    parser.add_argument('--dry-run', action='store_true', help="Calcule les TTL sans écrire")
+    args = parser.parse_args()
+
+    # Retries adaptatifs : les threads ralentissent d'eux-mêmes en cas de throttling
+    client = boto3.client('dynamodb', region_name=args.region, config=Config(retries={'mode': 'adaptive', 'max_attempts': 10}))
+
+    print(f"Backfill TTL sur {args.table} ({args.kind}, {args.days} jours, {args.segments} segments{', dry-run' if args.dry_run else ''})")
+    started = time.monotonic()
+    stats = Backfill(client, args).run()
+    print(
+        f"Terminé en {time.monotonic() - started:.1f}s : {stats['scanned']} items scannés, "
+        f"{stats['updated']} TTL posés (dont {stats['expired']} déjà échus), "
+        f"{stats['skipped']} ignorés, {stats['errors']} erreurs"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_json_encoder.py
+
+Micro-benchmark de la sérialisation des réponses Lambda (serverless/shared/json_encoder.py).
+Compare, sur une page de 100 mesures capteur :
+- ancien chemin : items Decimal (ressource boto3) -> convert_decimals -> json.dumps(default=str)
+- encodeur partagé : items Decimal -> dumps (une seule traversée)
+- client bas niveau : items AttributeValue -> from_dynamodb -> dumps (aucun Decimal)
+
+Usage : python scripts/bench_json_encoder.py [nombre_items] [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'infra', 'modules', 'serverless', 'shared'))
+from json_encoder import dumps, from_dynamodb  # noqa: E402
+
+
+def convert_decimals(obj):
+    """Ancienne implémentation (copie récursive avant json.dumps)"""
+    if isinstance(obj, list):
+        return [convert_decimals(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: convert_decimals(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return float(obj) if obj % 1 else int(obj)
+    else:
+        return obj
+
+
+def deserialize_with_decimals(item):
+    """Équivalent du TypeDeserializer boto3 (nombres -> Decimal)"""
+    result = {}
+    for key, value in item.items():
+        (attr_type, data), = value.items()
+        result[key] = Decimal(data) if attr_type == 'N' else data
+    return result
+
+
+def make_raw_items(count):
+    """Page de mesures au format du client bas niveau"""
+    return [
+        {
+            'sensorId': {'S': f'sensor-{i % 10:03d}'},
+            'timestamp': {'S': f'2025-01-01T10:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}Z'},
+            'type': {'S': 'temperature'},
+            'reading': {'N': f'{20 + (i % 70) / 7:.4f}'},
+            'user': {'S': 'john'},
+            'runId': {'S': '8b0f5a8e-5c1e-4d0e-9a43-3f3a2b1c0d9e'}
+        }
+        for i in range(count)
+    ]
+
+
+def bench(label, func, iterations, baseline=None):
+    seconds = min(timeit.repeat(func, number=iterations, repeat=5)) / iterations
+    ratio = f"  x{baseline / seconds:.2f}" if baseline else ''
+    print(f"{label:<50} {seconds * 1e6:9.1f} µs/page{ratio}")
+    return seconds
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    raw_items = make_raw_items(count)
+    decimal_items = [deserialize_with_decimals(item) for item in raw_items]
+
+    # Les trois chemins doivent produire le même document JSON
+    expected = json.loads(json.dumps({'items': convert_decimals(decimal_items)}, default=str))
+    assert json.loads(dumps({'items': decimal_items})) == expected
+    assert json.loads(dumps({'items': [from_dynamodb(i) for i in raw_items]})) == expected
+
+    print(f"{count} items/page, {iterations} itérations\n")
+    print("Sérialisation seule (items déjà décodés) :")
+    baseline = bench(
+        'convert_decimals + json.dumps(default=str)',
+        lambda: json.dumps({'items': [convert_decimals(i) for i in decimal_items]}, default=str),
+        iterations
+    )
+    bench('json_encoder.dumps', lambda: dumps({'items': decimal_items}), iterations, baseline)
+
+    print("\nDécodage DynamoDB + sérialisation :")
+    baseline = bench(
+        'Decimal + convert_decimals + json.dumps',
+        lambda: json.dumps({'items': [convert_decimals(deserialize_with_decimals(i)) for i in raw_items]}, default=str),
+        iterations
+    )
+    bench(
+        'Decimal + json_encoder.dumps',
+        lambda: dumps({'items': [deserialize_with_decimals(i) for i in raw_items]}),
+        iterations,
+        baseline
+    )
+    bench(
+        'from_dynamodb + json_encoder.dumps (bas niveau)',
+        lambda: dumps({'items': [from_dynamodb(i) for i in raw_items]}),
+        iterations,
+        baseline
+    )
+
+
+if __name__ == '__main__':
+    main()
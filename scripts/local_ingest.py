@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+scripts/local_ingest.py
+
+Teste hors ligne l'ingestion asynchrone de lambda_sensor_api :
+API (handler.py, INGEST_MODE=async) -> file en mémoire (INGEST_QUEUE_URL=local)
+-> consommateur (consumer.py) -> DynamoDB Local.
+
+Chaque lot est envoyé deux fois (retry client) et chaque message est rejoué une
+fois (redélivrance SQS). Les mesures horodatées par le client (eventTime + sequence)
+doivent être écrites une seule fois, les autres une fois par envoi du lot.
+
+Prérequis : DynamoDB Local (docker run -p 8000:8000 amazon/dynamodb-local)
+
+Usage :
+    python scripts/local_ingest.py
+    python scripts/local_ingest.py --endpoint http://localhost:8000 --readings 2000 --sensors 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+FILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'infra', 'modules', 'serverless', 'lambda_sensor_api', 'files')
+SHARED_DIR = os.path.join(os.path.dirname(__file__), '..', 'infra', 'modules', 'serverless', 'shared')
+
+
+def configure(args):
+    """Variables d'environnement lues par handler.py à l'import"""
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-3')
+    os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = args.endpoint
+    os.environ['SENSOR_DATA_TABLE_NAME'] = args.table
+    os.environ['INGEST_MODE'] = 'async'
+    os.environ['INGEST_QUEUE_URL'] = 'local'
+    os.environ['METRICS_BACKEND'] = 'emf'
+    sys.path[:0] = [FILES_DIR, SHARED_DIR]
+
+
+def create_table(client, name):
+    """(Re)crée la table SensorData v1 (sensorId / timestamp)"""
+    if name in client.list_tables()['TableNames']:
+        client.delete_table(TableName=name)
+        client.get_waiter('table_not_exists').wait(TableName=name)
+    client.create_table(
+        TableName=name,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[
+            {'AttributeName': 'sensorId', 'AttributeType': 'S'},
+            {'AttributeName': 'timestamp', 'AttributeType': 'S'}
+        ],
+        KeySchema=[
+            {'AttributeName': 'sensorId', 'KeyType': 'HASH'},
+            {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+        ]
+    )
+    client.get_waiter('table_exists').wait(TableName=name)
+
+
+def make_readings(count, sensors):
+    """Mesures de test : une sur deux horodatée par le client (eventTime + sequence)"""
+    start = datetime.utcnow().replace(microsecond=0)
+    readings = []
+    for i in range(count):
+        reading = {'sensorId': f"sensor-{i % sensors:03d}", 'type': 'temperature', 'reading': round(20 + (i % 50) / 10, 1)}
+        if i % 2:
+            reading['eventTime'] = (start + timedelta(milliseconds=i)).isoformat() + 'Z'
+            reading['sequence'] = i
+        readings.append(reading)
+    return readings
+
+
+def count_items(client, table):
+    total = 0
+    kwargs = {'TableName': table, 'Select': 'COUNT'}
+    while True:
+        result = client.scan(**kwargs)
+        total += result['Count']
+        if 'LastEvaluatedKey' not in result:
+            return total
+        kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test hors ligne de l'ingestion asynchrone (file locale + DynamoDB Local)")
+    parser.add_argument('--endpoint', default='http://localhost:8000', help='Endpoint DynamoDB Local')
+    parser.add_argument('--table', default='local-sensor-data', help='Table créée (recréée) pour le test')
+    parser.add_argument('--readings', type=int, default=500, help='Nombre de mesures')
+    parser.add_argument('--sensors', type=int, default=5, help='Nombre de capteurs')
+    args = parser.parse_args()
+
+    configure(args)
+    import handler
+    import consumer
+
+    create_table(handler.dynamodb.meta.client, args.table)
+    readings = make_readings(args.readings, args.sensors)
+
+    # Lots de MAX_BATCH_SIZE, chacun envoyé deux fois (retry client)
+    started = time.monotonic()
+    for start in range(0, len(readings), handler.MAX_BATCH_SIZE):
+        body = json.dumps(readings[start:start + handler.MAX_BATCH_SIZE])
+        for _ in range(2):
+            event = {'httpMethod': 'POST', 'path': '/api/sensors/data/batch', 'headers': {'X-User': 'local', 'X-Run-Id': 'local-run'}, 'body': body}
+            result = handler.lambda_handler(event, None)
+            summary = json.loads(result['body'])
+            print(f"POST batch -> {result['statusCode']} queued={summary.get('queued')} rejected={summary.get('rejected')}")
+
+    # Consommation, puis redélivrance de chaque message (at-least-once)
+    delivered = []
+
+    def consume(event, context):
+        delivered.append(event)
+        return consumer.lambda_handler(event, context)
+
+    queue = handler.ingest_queue
+    invocations = queue.drain(consume)
+    for event in list(delivered):
+        consumer.lambda_handler(event, None)
+
+    # Les mesures sans eventTime reçoivent un nouveau timestamp serveur à chaque envoi
+    timed = sum(1 for reading in readings if 'eventTime' in reading)
+    expected = timed + 2 * (len(readings) - timed)
+    stored = count_items(handler.dynamodb.meta.client, args.table)
+    print(
+        f"\n{invocations} invocations du consommateur, {len(queue.dead_letters)} messages en dead letters, "
+        f"{stored} items écrits (attendus : {expected}) en {time.monotonic() - started:.1f}s"
+    )
+    sys.exit(0 if stored == expected and not queue.dead_letters else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Les modules des Lambdas ne sont pas des packages : chaque dossier files/ est
+# ajouté au path (seuls des modules aux noms uniques sont importés, jamais handler.py)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_DIRS = [
+    'infra/modules/shared',
+    'infra/modules/serverless/shared',
+    'infra/modules/serverless/lambda_sensor_api/files',
+    'infra/modules/lambda_download_reports/files',
+]
+
+for module_dir in MODULE_DIRS:
+    sys.path.insert(0, os.path.join(ROOT, module_dir))
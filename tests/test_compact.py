@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from compact import ISO_FORMAT, compact_item, expand_item, packed_update, to_epoch_ms, to_iso
+
+
+def test_whole_second_sorts_before_fractional():
+    whole = datetime(2026, 3, 1, 12, 0, 5).strftime(ISO_FORMAT)
+    fractional = datetime(2026, 3, 1, 12, 0, 5, 100000).strftime(ISO_FORMAT)
+    assert whole == '2026-03-01T12:00:05.000000Z'
+    assert whole < fractional
+
+
+def test_iso_order_matches_chronological_order():
+    times = [
+        datetime(2026, 3, 1, 12, 0, 5, 999999),
+        datetime(2026, 3, 1, 12, 0, 5),
+        datetime(2026, 3, 1, 12, 0, 6),
+        datetime(2026, 3, 1, 12, 0, 5, 1),
+    ]
+    assert sorted(t.strftime(ISO_FORMAT) for t in times) == [t.strftime(ISO_FORMAT) for t in sorted(times)]
+
+
+def test_to_iso_keeps_microseconds_on_whole_seconds():
+    assert to_iso(to_epoch_ms('2026-03-01T12:00:05Z')) == '2026-03-01T12:00:05.000000Z'
+    assert to_iso(to_epoch_ms('2026-03-01T12:00:05.250Z')) == '2026-03-01T12:00:05.250000Z'
+
+
+def test_to_epoch_ms_converts_offsets_to_utc():
+    assert to_epoch_ms('2026-03-01T14:00:00+02:00') == to_epoch_ms('2026-03-01T12:00:00Z')
+
+
+def readings(*timestamps, **extra):
+    return [
+        {'sensorId': 's1', 'timestamp': ts, 'reading': index, 'type': 'temp', 'user': 'u', 'runId': 'r1', **extra}
+        for index, ts in enumerate(timestamps)
+    ]
+
+
+def test_packed_update_offsets_relative_to_bucket_start():
+    update = packed_update(readings('2026-03-01T12:00:05Z', '2026-03-01T12:00:59.500Z'), 60000, 1000)
+    start = to_epoch_ms('2026-03-01T12:00:00Z')
+    assert update['Key'] == {'s': 's1', 't': start}
+    assert update['ExpressionAttributeValues'][':o'] == [5000, 59500]
+    assert update['ExpressionAttributeValues'][':v'] == [0, 1]
+
+
+def test_packed_update_caps_readings_per_item():
+    update = packed_update(readings('2026-03-01T12:00:05Z', '2026-03-01T12:00:06Z'), 60000, 1000)
+    assert 'size(#o) <= :room' in update['ConditionExpression']
+    assert update['ExpressionAttributeValues'][':room'] == 998
+
+
+def test_packed_update_slot_rolls_over_to_next_sort_key():
+    update = packed_update(readings('2026-03-01T12:00:00Z'), 60000, 1000, slot=2)
+    start = to_epoch_ms('2026-03-01T12:00:00Z')
+    assert update['Key']['t'] == start + 2
+    assert update['ExpressionAttributeValues'][':o'] == [-2]
+    item = {'s': 's1', 't': start + 2, 'k': 'temp', 'u': 'u', 'r': 'r1', 'o': [-2], 'v': [7]}
+    assert expand_item(item)[0]['timestamp'] == '2026-03-01T12:00:00.000000Z'
+
+
+def test_packed_update_rejects_known_idempotency_keys():
+    group = readings('2026-03-01T12:00:01Z', '2026-03-01T12:00:02Z')
+    group[0]['idempotencyKey'] = 'a'
+    group[1]['idempotencyKey'] = 'b'
+    update = packed_update(group, 60000, 1000)
+    assert update['UpdateExpression'].endswith(' ADD #i :i')
+    assert 'NOT contains(#i, :i0) AND NOT contains(#i, :i1)' in update['ConditionExpression']
+    assert update['ExpressionAttributeValues'][':i'] == {'a', 'b'}
+
+
+def test_expand_item_filters_and_orders_packed_readings():
+    start = to_epoch_ms('2026-03-01T12:00:00Z')
+    item = {'s': 's1', 't': start, 'k': 'temp', 'u': 'u', 'r': 'r1', 'o': [3000, 1000, 2000], 'v': [3, 1, 2]}
+    expanded = expand_item(item, ts_from=start + 1500, newest_first=True)
+    assert [r['reading'] for r in expanded] == [3, 2]
+
+
+def test_compact_item_maps_v1_attributes():
+    item = readings('2026-03-01T12:00:00.123Z', sequence=4, ttl=99)[0]
+    assert compact_item(item) == {
+        's': 's1', 't': to_epoch_ms('2026-03-01T12:00:00.123Z'), 'v': 0, 'k': 'temp', 'u': 'u', 'r': 'r1', 'q': 4, 'ttl': 99
+    }
@@ -0,0 +1,50 @@
+import pytest
+
+from downsample import Downsampler
+
+
+def reading(sensor_id, timestamp, value):
+    return {'sensorId': sensor_id, 'timestamp': timestamp, 'reading': value}
+
+
+def test_readings_are_aggregated_per_sensor_and_bucket():
+    downsampler = Downsampler('1m')
+    downsampler.add_page([
+        reading('s1', '2026-03-01T12:00:05.000000Z', 1),
+        reading('s1', '2026-03-01T12:00:59.999000Z', 3),
+        reading('s1', '2026-03-01T12:01:00.000000Z', 10),
+        reading('s2', '2026-03-01T12:00:30.000000Z', 7),
+    ])
+    assert downsampler.results() == [
+        {'sensorId': 's1', 'timestamp': '2026-03-01T12:00:00Z', 'count': 2, 'min': 1.0, 'max': 3.0, 'avg': 2.0},
+        {'sensorId': 's1', 'timestamp': '2026-03-01T12:01:00Z', 'count': 1, 'min': 10.0, 'max': 10.0, 'avg': 10.0},
+        {'sensorId': 's2', 'timestamp': '2026-03-01T12:00:00Z', 'count': 1, 'min': 7.0, 'max': 7.0, 'avg': 7.0},
+    ]
+
+
+def test_newest_first_pages_give_the_same_result():
+    page = [
+        reading('s1', '2026-03-01T12:00:01.000000Z', 1),
+        reading('s1', '2026-03-01T12:00:12.000000Z', 2),
+        reading('s1', '2026-03-01T12:00:15.000000Z', 4),
+    ]
+    oldest_first = Downsampler('10s')
+    oldest_first.add_page(page)
+    newest_first = Downsampler('10s')
+    newest_first.add_page(list(reversed(page)))
+    assert newest_first.results() == oldest_first.results()
+    assert [point['count'] for point in oldest_first.results()] == [1, 2]
+
+
+def test_buckets_spanning_pages_are_merged():
+    downsampler = Downsampler('1h')
+    downsampler.add_page([reading('s1', '2026-03-01T12:10:00.000000Z', 5)])
+    downsampler.add_page([reading('s1', '2026-03-01T12:50:00.000000Z', -1)])
+    [point] = downsampler.results()
+    assert point['timestamp'] == '2026-03-01T12:00:00Z'
+    assert (point['count'], point['min'], point['max'], point['avg']) == (2, -1.0, 5.0, 2.0)
+
+
+def test_unknown_bucket_is_rejected():
+    with pytest.raises(ValueError):
+        Downsampler('5m')
@@ -0,0 +1,55 @@
+import base64
+import gzip
+import json
+
+from log_events import RUN_FINISHED, LogMatcher, iter_matches
+
+RUN_ID = '0f8fad5b-d9cb-469f-a165-70867728950e'
+
+
+def subscription_event(payload):
+    """Événement de souscription CloudWatch Logs (JSON gzip + base64)"""
+    data = base64.b64encode(gzip.compress(json.dumps(payload).encode('utf-8'))).decode('ascii')
+    return {'awslogs': {'data': data}}
+
+
+def data_message(*messages):
+    return {
+        'messageType': 'DATA_MESSAGE',
+        'logEvents': [{'id': str(index), 'timestamp': index, 'message': message} for index, message in enumerate(messages)]
+    }
+
+
+def test_run_finished_captures_run_id():
+    match = RUN_FINISHED.search(f"INFO Run {RUN_ID} finished SUCCESS in 12s")
+    assert match.group(1) == RUN_ID
+    assert RUN_FINISHED.search(f"INFO Run {RUN_ID} finished FAILED") is None
+
+
+def test_regex_skipped_without_marker():
+    class FailingRegex:
+        def search(self, message):
+            raise AssertionError('regex evaluated without marker')
+
+    matcher = LogMatcher(r'x', 'marker')
+    matcher.regex = FailingRegex()
+    assert matcher.search('no candidate here') is None
+
+
+def test_iter_matches_yields_matching_events():
+    event = subscription_event(data_message('starting', f"Run {RUN_ID} finished SUCCESS", 'done'))
+    matches = list(iter_matches(event, RUN_FINISHED))
+    assert [(log_event['id'], match.group(1)) for log_event, match in matches] == [('1', RUN_ID)]
+
+
+def test_iter_matches_ignores_control_messages():
+    payload = {'messageType': 'CONTROL_MESSAGE', 'logEvents': [{'id': '0', 'timestamp': 0, 'message': 'finished SUCCESS'}]}
+    assert list(iter_matches(subscription_event(payload), RUN_FINISHED)) == []
+
+
+def test_iter_matches_skips_parsing_without_marker(monkeypatch):
+    def fail(raw):
+        raise AssertionError('payload parsed without marker')
+
+    monkeypatch.setattr('log_events.json.loads', fail)
+    assert list(iter_matches(subscription_event(data_message('starting', 'done')), RUN_FINISHED)) == []
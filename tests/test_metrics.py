@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from metrics import MAX_VALUES_PER_DATUM, MetricBuffer
+
+DIMENSIONS = [{'Name': 'SensorId', 'Value': 'sensor-001'}]
+AT = datetime(2026, 3, 1, 12, 0, 5, 250000)
+
+
+class FakeCloudWatch:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def put_metric_data(self, Namespace, MetricData):
+        if self.fail:
+            raise RuntimeError('throttled')
+        self.calls.append(MetricData)
+
+
+def buffer(cloudwatch, **kwargs):
+    # Fenêtre de temps très longue : seuls les flush explicites ou "buffer plein" envoient
+    return MetricBuffer(cloudwatch, 'Test', flush_interval=3600, **kwargs)
+
+
+def test_values_of_the_same_second_form_one_statistic_set():
+    cloudwatch = FakeCloudWatch()
+    metrics = buffer(cloudwatch)
+    for value in (1, 2, 2, 3):
+        metrics.add('Reading', value, 'None', DIMENSIONS, timestamp=AT)
+    assert metrics.flush() == 1
+
+    [datum] = cloudwatch.calls[0]
+    assert datum['Timestamp'] == AT.replace(microsecond=0)
+    assert dict(zip(datum['Values'], datum['Counts'])) == {1.0: 1.0, 2.0: 2.0, 3.0: 1.0}
+
+
+def test_distinct_dimensions_are_separate_datums():
+    cloudwatch = FakeCloudWatch()
+    metrics = buffer(cloudwatch)
+    metrics.add('Reading', 1, 'None', DIMENSIONS, timestamp=AT)
+    metrics.add('Reading', 1, 'None', [{'Name': 'SensorId', 'Value': 'sensor-002'}], timestamp=AT)
+    metrics.flush()
+    assert len(cloudwatch.calls[0]) == 2
+
+
+def test_datum_is_split_above_the_distinct_values_limit():
+    cloudwatch = FakeCloudWatch()
+    metrics = buffer(cloudwatch)
+    for value in range(MAX_VALUES_PER_DATUM + 1):
+        metrics.add('Reading', value, 'None', DIMENSIONS, timestamp=AT)
+    metrics.flush()
+    assert [len(datum['Values']) for datum in cloudwatch.calls[0]] == [MAX_VALUES_PER_DATUM, 1]
+
+
+def test_full_buffer_is_flushed_automatically():
+    cloudwatch = FakeCloudWatch()
+    metrics = buffer(cloudwatch, max_datums=2)
+    metrics.add('A', 1, 'None', DIMENSIONS, timestamp=AT)
+    assert cloudwatch.calls == []
+    metrics.add('B', 1, 'None', DIMENSIONS, timestamp=AT)
+    assert len(cloudwatch.calls) == 1
+    assert metrics.flush() == 0
+
+
+def test_publish_errors_do_not_propagate():
+    metrics = buffer(FakeCloudWatch(fail=True))
+    metrics.add('Reading', 1, 'None', DIMENSIONS, timestamp=AT)
+    assert metrics.flush() == 0
@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip('botocore')
+
+from report_listing import MAX_RUN_IDS, REPORT_KEY, parse_filters  # noqa: E402
+
+
+def test_no_parameters_select_everything():
+    assert parse_filters({}) == {'from': None, 'to': None, 'run_ids': None, 'max': None}
+
+
+def test_dates_run_ids_and_max_are_parsed():
+    filters = parse_filters({'from': '2026-03-01', 'to': '2026-03-02', 'runIds': ' ABC-1 , abc-2,,', 'max': '5'})
+    assert filters == {
+        'from': date(2026, 3, 1),
+        'to': date(2026, 3, 2),
+        'run_ids': {'abc-1', 'abc-2'},
+        'max': 5
+    }
+
+
+@pytest.mark.parametrize('params', [
+    {'from': '01/03/2026'},
+    {'to': '2026-02-30'},
+    {'from': '2026-03-02', 'to': '2026-03-01'},
+    {'max': '0'},
+    {'max': '-1'},
+    {'max': 'ten'},
+    {'runIds': ','.join(f'run-{index}' for index in range(MAX_RUN_IDS + 1))},
+])
+def test_invalid_parameters_raise_value_error(params):
+    with pytest.raises(ValueError):
+        parse_filters(params)
+
+
+def test_report_key_extracts_date_and_run_id():
+    prefix = 'reports/'
+    for key in ('reports/2026-03-01/run_AbC-1.csv.gz', 'reports/2026-03-01/run_AbC-1_stats.parquet'):
+        assert REPORT_KEY.match(key, len(prefix)).groups() == ('2026-03-01', 'AbC-1')
+    assert REPORT_KEY.match('reports/notes.txt', len(prefix)) is None
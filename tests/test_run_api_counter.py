@@ -0,0 +1,137 @@
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip('boto3')
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+HANDLER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'infra/modules/serverless/lambda_run_api/files/handler.py'
+)
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as patch:
+        yield patch
+
+
+@pytest.fixture(scope='module')
+def run_api(monkeypatch_module):
+    monkeypatch_module.setenv('RUNS_TABLE_NAME', 'runs-test')
+    monkeypatch_module.setenv('AWS_DEFAULT_REGION', 'eu-west-3')
+    spec = importlib.util.spec_from_file_location('run_api_counter_handler', HANDLER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cancelled(*codes):
+    return ClientError({
+        'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+        'CancellationReasons': [{'Code': code} for code in codes]
+    }, 'TransactWriteItems')
+
+
+class FakeClient:
+    """Client DynamoDB dont les TransactWriteItems échouent selon `errors` (None = succès)"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def transact_write_items(self, TransactItems):
+        self.calls += 1
+        error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise error
+
+
+@pytest.fixture
+def no_backoff(run_api, monkeypatch):
+    monkeypatch.setattr(run_api, 'conflict_backoff', lambda attempt: None)
+
+
+def test_transaction_conflict_is_retried(run_api, monkeypatch, no_backoff):
+    fake = FakeClient([cancelled('TransactionConflict', 'None'), cancelled('None', 'TransactionConflict')])
+    monkeypatch.setattr(run_api, 'client', fake)
+    run_api.transact_write([])
+    assert fake.calls == 3
+
+
+def test_persistent_conflict_raises_busy(run_api, monkeypatch, no_backoff):
+    fake = FakeClient([cancelled('TransactionConflict')] * run_api.TRANSACT_MAX_ATTEMPTS)
+    monkeypatch.setattr(run_api, 'client', fake)
+    with pytest.raises(run_api.TransactionBusy):
+        run_api.transact_write([])
+    assert fake.calls == run_api.TRANSACT_MAX_ATTEMPTS
+
+
+def test_failed_condition_is_not_retried(run_api, monkeypatch, no_backoff):
+    fake = FakeClient([cancelled('ConditionalCheckFailed', 'TransactionConflict')])
+    monkeypatch.setattr(run_api, 'client', fake)
+    with pytest.raises(ClientError):
+        run_api.transact_write([])
+    assert fake.calls == 1
+
+
+def test_finish_returns_503_when_conflicts_persist(run_api, monkeypatch, no_backoff):
+    class FakeTable:
+        def get_item(self, Key):
+            return {'Item': {'id': Key['id'], 'status': 'RUNNING'}}
+
+    monkeypatch.setattr(run_api, 'table', FakeTable())
+    monkeypatch.setattr(run_api, 'client', FakeClient([cancelled('None', 'TransactionConflict')] * run_api.TRANSACT_MAX_ATTEMPTS))
+    assert run_api.finish_run('run-1', {'body': '{}'})['statusCode'] == 503
+
+
+def conditional_check_failed():
+    return ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}}, 'UpdateItem')
+
+
+class FakeCounterTable:
+    """Item __running_counter__ en mémoire, écritures conditionnelles comprises"""
+
+    def __init__(self, running_count):
+        self.running_count = running_count
+        self.writes = []
+
+    def get_item(self, Key, ConsistentRead=False):
+        if self.running_count is None:
+            return {}
+        return {'Item': {'id': Key['id'], 'runningCount': self.running_count}}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression, ExpressionAttributeValues):
+        if self.running_count != ExpressionAttributeValues[':current']:
+            raise conditional_check_failed()
+        self.running_count = ExpressionAttributeValues[':clamped']
+        self.writes.append(self.running_count)
+
+
+class FailingDecrementClient:
+    def update_item(self, **kwargs):
+        raise conditional_check_failed()
+
+
+@pytest.mark.parametrize('running_count, released, expected', [(2, 5, 0), (0, 1, 0)])
+def test_release_clamps_a_desynchronized_counter(run_api, monkeypatch, no_backoff, running_count, released, expected):
+    fake_table = FakeCounterTable(running_count)
+    monkeypatch.setattr(run_api, 'table', fake_table)
+    monkeypatch.setattr(run_api, 'client', FailingDecrementClient())
+    run_api.release_running_slots(released)
+    assert fake_table.running_count == expected
+
+
+def test_release_never_recounts_from_the_index(run_api, monkeypatch, no_backoff):
+    def fail(status):
+        raise AssertionError('counter recomputed from the GSI')
+
+    fake_table = FakeCounterTable(None)
+    monkeypatch.setattr(run_api, 'table', fake_table)
+    monkeypatch.setattr(run_api, 'client', FailingDecrementClient())
+    monkeypatch.setattr(run_api, 'count_runs_by_status', fail)
+    run_api.release_running_slots(3)
+    assert fake_table.writes == []
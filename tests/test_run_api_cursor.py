@@ -0,0 +1,73 @@
+import base64
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip('boto3')
+
+HANDLER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'infra/modules/serverless/lambda_run_api/files/handler.py'
+)
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as patch:
+        yield patch
+
+
+@pytest.fixture(scope='module')
+def run_api(monkeypatch_module):
+    monkeypatch_module.setenv('RUNS_TABLE_NAME', 'runs-test')
+    monkeypatch_module.setenv('AWS_DEFAULT_REGION', 'eu-west-3')
+    monkeypatch_module.setenv('CURSOR_SECRET', 'test-secret')
+    # Plusieurs Lambdas ont un handler.py : chargé sous un nom propre au test
+    spec = importlib.util.spec_from_file_location('run_api_handler', HANDLER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_cursor_round_trip(run_api):
+    payload = {'s': '2026-03-01T12:00:00Z', 'i': 'run-1', 'u': None, 'st': 'RUNNING'}
+    assert run_api.decode_cursor(run_api.encode_cursor(payload)) == payload
+
+
+def test_tampered_cursor_is_rejected(run_api):
+    token = run_api.encode_cursor({'s': '2026-03-01T12:00:00Z', 'i': 'run-1', 'u': None, 'st': None})
+    data, signature = token.split('.')
+    forged = base64.urlsafe_b64encode(json.dumps({'s': '9999', 'i': 'x'}).encode()).decode().rstrip('=')
+    assert run_api.decode_cursor(f"{forged}.{signature}") is None
+    assert run_api.decode_cursor(data) is None
+    assert run_api.decode_cursor('not-a-cursor') is None
+
+
+def test_cursor_signed_with_another_secret_is_rejected(run_api, monkeypatch):
+    token = run_api.encode_cursor({'s': '2026-03-01T12:00:00Z', 'i': 'run-1'})
+    monkeypatch.setattr(run_api, 'CURSOR_SECRET', b'other-secret')
+    assert run_api.decode_cursor(token) is None
+
+
+def test_cursor_requires_position(run_api):
+    assert run_api.decode_cursor(run_api.encode_cursor({'i': 'run-1'})) is None
+
+
+class FakeTable:
+    def __init__(self, items):
+        self.items = items
+
+    def get_item(self, Key):
+        item = self.items.get(Key['id'])
+        return {'Item': item} if item else {}
+
+
+def test_legacy_last_key_resumes_after_its_run(run_api, monkeypatch):
+    monkeypatch.setattr(run_api, 'table', FakeTable({'run-1': {'id': 'run-1', 'startedAt': '2026-03-01T12:00:00Z'}}))
+    legacy = base64.b64encode(json.dumps({'id': 'run-1'}).encode()).decode()
+    assert run_api.legacy_position(legacy) == ('2026-03-01T12:00:00Z', 'run-1')
+    missing = base64.b64encode(json.dumps({'id': 'run-2'}).encode()).decode()
+    assert run_api.legacy_position(missing) is None
+    assert run_api.legacy_position('%%%') is None
@@ -0,0 +1,83 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+
+from s3_stream import S3StreamWriter
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.parts = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+        return {'ETag': '"put"'}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.parts[Key] = []
+        return {'UploadId': 'upload-1'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.parts[Key].append(Body)
+        return {'ETag': f'"part{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        assert [p['PartNumber'] for p in MultipartUpload['Parts']] == list(range(1, len(self.parts[Key]) + 1))
+        self.objects[Key] = b''.join(self.parts[Key])
+        return {'ETag': '"multipart"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(Key)
+
+
+def test_small_object_uses_a_single_put():
+    s3 = FakeS3()
+    with S3StreamWriter(s3, 'bucket', 'small.csv', 'text/csv') as writer:
+        writer.write(b'a,b\r\n')
+    assert s3.objects['small.csv'] == b'a,b\r\n'
+    assert s3.parts == {}
+    assert writer.etag == '"put"'
+    assert writer.bytes_written == 5
+
+
+def test_large_object_is_split_in_fixed_size_parts():
+    s3 = FakeS3()
+    with S3StreamWriter(s3, 'bucket', 'large.bin', 'application/octet-stream', part_size=10) as writer:
+        for _ in range(5):
+            writer.write(b'0123456')
+    assert [len(part) for part in s3.parts['large.bin']] == [10, 10, 10, 5]
+    assert s3.objects['large.bin'] == b'0123456' * 5
+    assert writer.etag == '"multipart"'
+
+
+def test_gzip_output_and_content_type():
+    s3 = FakeS3()
+    with S3StreamWriter(s3, 'bucket', 'data.csv.gz', 'text/csv', compress=True) as writer:
+        writer.write(b'x' * 1000)
+    assert writer.content_type == 'application/gzip'
+    assert gzip.decompress(s3.objects['data.csv.gz']) == b'x' * 1000
+    assert writer.bytes_written == len(s3.objects['data.csv.gz'])
+
+
+def test_error_aborts_the_multipart_upload():
+    s3 = FakeS3()
+    with pytest.raises(RuntimeError):
+        with S3StreamWriter(s3, 'bucket', 'failed.bin', 'application/octet-stream', part_size=4) as writer:
+            writer.write(b'12345678')
+            raise RuntimeError('source failed')
+    assert s3.aborted == ['failed.bin']
+    assert 'failed.bin' not in s3.objects
+
+
+def test_zipfile_can_stream_into_the_writer():
+    s3 = FakeS3()
+    with S3StreamWriter(s3, 'bucket', 'reports.zip', 'application/zip', part_size=64) as sink:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            with zip_file.open('run_1.csv', 'w') as entry:
+                entry.write(b'id,value\r\n' * 100)
+    with zipfile.ZipFile(io.BytesIO(s3.objects['reports.zip'])) as archive:
+        assert archive.read('run_1.csv') == b'id,value\r\n' * 100
@@ -0,0 +1,128 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip('boto3')
+
+from boto3.dynamodb.types import TypeSerializer  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+HANDLER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'infra/modules/serverless/lambda_sensor_api/files/handler.py'
+)
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as patch:
+        yield patch
+
+
+@pytest.fixture(scope='module')
+def sensor_api(monkeypatch_module):
+    monkeypatch_module.setenv('SENSOR_DATA_TABLE_NAME', 'sensor-data-test')
+    monkeypatch_module.setenv('AWS_DEFAULT_REGION', 'eu-west-3')
+    # Plusieurs Lambdas ont un handler.py : chargé sous un nom propre au test
+    spec = importlib.util.spec_from_file_location('sensor_api_handler', HANDLER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize('reading', [21.5, -3, '7.25'])
+def test_valid_reading(sensor_api, reading):
+    assert sensor_api.validate_reading({'sensorId': 's1', 'type': 'temperature', 'reading': reading}) is None
+
+
+@pytest.mark.parametrize('reading', [float('nan'), float('inf'), float('-inf'), 'NaN', 'Infinity'])
+def test_non_finite_reading_is_rejected(sensor_api, reading):
+    error = sensor_api.validate_reading({'sensorId': 's1', 'type': 'temperature', 'reading': reading})
+    assert error == 'reading must be a finite number'
+
+
+def test_non_finite_reading_is_invalid_in_batch(sensor_api, monkeypatch):
+    monkeypatch.setattr(sensor_api, 'write_sensor_items', lambda items, conditional=False: ['OK'] * len(items))
+    monkeypatch.setattr(sensor_api, 'publish_batch_metrics', lambda items: None)
+    body = '[{"sensorId": "s1", "type": "t", "reading": NaN}, {"sensorId": "s1", "type": "t", "reading": 1.5}]'
+    result = sensor_api.ingest_sensor_data_batch({'body': body, 'headers': {}})
+    body = json.loads(result['body'])
+    assert result['statusCode'] == 200
+    assert body['accepted'] == 1
+    assert body['results'][0] == {'index': 0, 'status': 'INVALID', 'error': 'reading must be a finite number'}
+
+
+class FakeConditionalClient:
+    """put_item conditionnel sur un dict (items au format v1), item existant renvoyé en AttributeValue"""
+
+    def __init__(self, items):
+        self.items = dict(items)
+
+    def put_item(self, TableName, Item, ConditionExpression, ExpressionAttributeNames, ReturnValuesOnConditionCheckFailure):
+        key = (Item['sensorId'], Item['timestamp'])
+        if key in self.items:
+            existing = {name: TypeSerializer().serialize(value) for name, value in self.items[key].items()}
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}, 'Item': existing}, 'PutItem')
+        self.items[key] = dict(Item)
+
+
+@pytest.fixture
+def timed_reading(sensor_api):
+    def build(reading, **extra):
+        entry = {'sensorId': 's1', 'type': 'temperature', 'reading': reading, 'eventTime': '2026-03-01T12:00:00Z', **extra}
+        return sensor_api.build_item(entry, '2026-03-01T12:00:00.000000Z', 'alice', 'run-1', None)
+    return build
+
+
+@pytest.fixture
+def fake_client(sensor_api, monkeypatch):
+    client = FakeConditionalClient({})
+    monkeypatch.setattr(sensor_api.dynamodb.meta, 'client', client)
+    return client
+
+
+def test_retry_without_key_is_a_duplicate(sensor_api, fake_client, timed_reading):
+    assert sensor_api.put_item_once(timed_reading(21.5)) == 'OK'
+    assert sensor_api.put_item_once(timed_reading(21.5)) == 'DUPLICATE'
+    assert len(fake_client.items) == 1
+
+
+def test_different_reading_at_same_instant_is_shifted(sensor_api, fake_client, timed_reading):
+    assert sensor_api.put_item_once(timed_reading(21.5)) == 'OK'
+    other = timed_reading(22)
+    assert sensor_api.put_item_once(other) == 'OK'
+    assert other['timestamp'] == '2026-03-01T12:00:00.000001Z'
+
+
+def test_keyed_reading_is_not_matched_by_payload(sensor_api, fake_client, timed_reading):
+    assert sensor_api.put_item_once(timed_reading(21.5, sequence=1)) == 'OK'
+    assert sensor_api.put_item_once(timed_reading(21.5, sequence=2)) == 'OK'
+    assert sensor_api.put_item_once(timed_reading(21.5, sequence=1)) == 'DUPLICATE'
+    assert sensor_api.put_item_once(timed_reading(21.5)) == 'OK'
+    assert len(fake_client.items) == 3
+
+
+class FakeQueryClient:
+    """Client bas niveau qui enregistre les tables interrogées (une page vide par Query)"""
+
+    def __init__(self):
+        self.tables = []
+
+    def query(self, **kwargs):
+        self.tables.append(kwargs['TableName'])
+        return {'Items': []}
+
+
+@pytest.mark.parametrize('compact_reads, expected', [
+    (False, ['sensor-data-test']),
+    (True, ['sensor-data-test', 'sensor-data-v2-test']),
+])
+def test_compact_table_is_queried_only_when_enabled(sensor_api, monkeypatch, compact_reads, expected):
+    client = FakeQueryClient()
+    monkeypatch.setattr(sensor_api, 'dynamodb_client', client)
+    monkeypatch.setattr(sensor_api, 'COMPACT_TABLE_NAME', 'sensor-data-v2-test')
+    monkeypatch.setattr(sensor_api, 'COMPACT_READS', compact_reads)
+    assert list(sensor_api.iter_sensor_pages(sensor_id='s1')) == [[]] * len(expected)
+    assert client.tables == expected
@@ -0,0 +1,49 @@
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('botocore')
+
+from botocore.exceptions import ClientError  # noqa: E402
+from zip_archive import build_archive, prefetch_objects  # noqa: E402
+
+
+class FakeS3:
+    """Bucket en mémoire : get_object des rapports, put_object de l'archive"""
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'missing'}}, 'GetObject')
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+        return {'ETag': '"archive"'}
+
+
+def report(key, size):
+    return {'Key': key, 'Size': size, 'ETag': '"e"', 'LastModified': datetime(2026, 3, 1, 12, 0)}
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_missing_report_is_skipped(workers):
+    s3 = FakeS3({'reports/2026-03-01/run_a.csv': b'a,b\r\n'})
+    objects = [report('reports/2026-03-01/run_a.csv', 5), report('reports/2026-03-01/run_gone.csv', 7)]
+    entries = prefetch_objects(s3, 'bucket', objects, workers, 2)
+    build_archive(s3, 'bucket', entries, 'archives/test.zip')
+    with zipfile.ZipFile(io.BytesIO(s3.objects['archives/test.zip'])) as archive:
+        assert archive.namelist() == ['reports/2026-03-01/run_a.csv']
+
+
+def test_other_errors_are_raised():
+    class DeniedS3(FakeS3):
+        def get_object(self, Bucket, Key):
+            raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'GetObject')
+
+    with pytest.raises(ClientError):
+        list(prefetch_objects(DeniedS3({}), 'bucket', [report('reports/2026-03-01/run_a.csv', 5)], 1, 1))